@@ -3,7 +3,8 @@ Example Agent Templates
 =======================
 Copy and customize these agent configurations for different use cases.
 Replace the get_agent_input_schema() and execute_agent_task() functions
-in main.py with these examples.
+in main.py with these examples, or select one without code changes by
+setting AGENT_TEMPLATE to a key of TEMPLATES (e.g. AGENT_TEMPLATE=code_review).
 """
 
 # =============================================================================
@@ -322,6 +323,19 @@ For each customer interaction:
 Always maintain a professional, helpful tone while being efficient and thorough."""
 
 
+# =============================================================================
+# Template registry (AGENT_TEMPLATE=<key>): schema function + system prompt
+# =============================================================================
+
+TEMPLATES = {
+    "content_writer": (content_writer_schema, CONTENT_WRITER_PROMPT),
+    "code_review": (code_review_schema, CODE_REVIEW_PROMPT),
+    "research_assistant": (research_assistant_schema, RESEARCH_ASSISTANT_PROMPT),
+    "data_analysis": (data_analysis_schema, DATA_ANALYSIS_PROMPT),
+    "customer_support": (customer_support_schema, CUSTOMER_SUPPORT_PROMPT),
+}
+
+
 # =============================================================================
 # How to use these templates:
 # =============================================================================
@@ -0,0 +1,164 @@
+"""
+Usage & Latency Analytics
+=========================
+Answers capacity questions (tokens per job, cost per template or tenant,
+queue wait versus run time) without scanning the job store.
+
+Every finished job, completed or failed, leaves one compact sample in the job
+backend (ANALYTICS_BUFFER_SIZE samples, oldest dropped first), so the API tier
+sees the samples of every worker. /analytics aggregates the samples of the
+last `window` seconds, optionally grouped by template, model, tenant or
+status:
+
+- stage latencies with p50/p90/p99: queue wait (enqueued → started), time to
+  first token (started → first model answer), run time (started → finished)
+  and end-to-end time (created → finished)
+- prompt/completion tokens and cost, as totals, per-job averages and
+  percentiles
+
+Cost is computed per model call from MODEL_PRICES: USD per million prompt and
+completion tokens, e.g. {"gpt-4o-mini": [0.15, 0.6]}. The built-in list
+prices below are a starting point; models without a price cost 0.
+"""
+
+import os
+import json
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from hedging import percentile
+
+ANALYTICS_BUFFER_SIZE = int(os.getenv("ANALYTICS_BUFFER_SIZE", 10000))
+# Default /analytics window in seconds
+ANALYTICS_WINDOW = float(os.getenv("ANALYTICS_WINDOW", 3600))
+
+# USD per 1M (prompt, completion) tokens
+_DEFAULT_PRICES: Dict[str, List[float]] = {
+    "gpt-4o": [2.5, 10.0],
+    "gpt-4o-mini": [0.15, 0.6],
+    "gpt-4-turbo": [10.0, 30.0],
+    "claude-sonnet-4-20250514": [3.0, 15.0],
+    "claude-3-5-sonnet-20241022": [3.0, 15.0],
+}
+MODEL_PRICES: Dict[str, List[float]] = {
+    **_DEFAULT_PRICES,
+    **json.loads(os.getenv("MODEL_PRICES", "") or "{}"),
+}
+
+GROUP_BY = ("template", "model", "tenant", "status")
+_STAGES = ("queue_wait", "first_token", "run_time", "total")
+_PERCENTILES = (50, 90, 99)
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of one model call."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _elapsed(start: Optional[float], end: Optional[float]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return max(end - start, 0.0)
+
+
+class JobSample(NamedTuple):
+    job_id: str
+    finished_at: float
+    template: str
+    model: str
+    tenant: str
+    status: str
+    queue_wait: Optional[float]
+    first_token: Optional[float]
+    run_time: Optional[float]
+    total: Optional[float]
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+
+
+class Analytics:
+    """Finished-job samples, stored in the job backend, with windowed aggregates."""
+
+    def __init__(self, backend: Any, size: int = ANALYTICS_BUFFER_SIZE):
+        self.backend = backend
+        self.size = size
+
+    async def record(self, job: Any, template: str) -> None:
+        """Add a finished job (JobRecord or dict with epoch timestamps)."""
+        started = job.get("started_at")
+        finished = job.get("completed_at") or time.time()
+        sample = JobSample(
+            job_id=job["job_id"],
+            finished_at=finished,
+            template=template,
+            model=job.get("model") or "",
+            tenant=job.get("tenant") or "",
+            status=str(getattr(job["status"], "value", job["status"])),
+            queue_wait=_elapsed(job.get("enqueued_at"), started),
+            first_token=_elapsed(started, job.get("first_token_at")),
+            run_time=_elapsed(started, finished),
+            total=_elapsed(job.get("created_at"), finished),
+            prompt_tokens=job.get("prompt_tokens") or 0,
+            completion_tokens=job.get("completion_tokens") or 0,
+            cost_usd=job.get("cost_usd") or 0.0,
+        )
+        await self.backend.add_sample(sample._asdict(), self.size)
+
+    async def summary(self, window: float = ANALYTICS_WINDOW, group_by: Optional[str] = None) -> Dict[str, Any]:
+        """Aggregates of the last `window` seconds; `group_by` is one of GROUP_BY."""
+        recent = [JobSample(**s) for s in await self.backend.samples(time.time() - window)]
+        recorded, buffered = await self.backend.sample_counts()
+
+        result: Dict[str, Any] = {
+            "window_seconds": window,
+            "recorded": recorded,
+            "buffered": buffered,
+            "overall": _aggregate(recent, window),
+        }
+        if group_by:
+            groups: Dict[str, List[JobSample]] = {}
+            for sample in recent:
+                groups.setdefault(getattr(sample, group_by), []).append(sample)
+            result["group_by"] = group_by
+            result["groups"] = {key: _aggregate(items, window) for key, items in sorted(groups.items())}
+        return result
+
+
+def _distribution(values: List[float], digits: int = 3) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    stats = {f"p{p}": round(percentile(values, p), digits) for p in _PERCENTILES}
+    stats["avg"] = round(sum(values) / len(values), digits)
+    stats["max"] = round(max(values), digits)
+    return stats
+
+
+def _aggregate(samples: List[JobSample], window: float) -> Dict[str, Any]:
+    jobs = len(samples)
+    failed = sum(1 for s in samples if s.status == "failed")
+    prompt = sum(s.prompt_tokens for s in samples)
+    completion = sum(s.completion_tokens for s in samples)
+    cost = sum(s.cost_usd for s in samples)
+    return {
+        "jobs": jobs,
+        "failed": failed,
+        "error_rate": round(failed / jobs, 4) if jobs else 0.0,
+        "jobs_per_minute": round(jobs / window * 60, 3) if window else None,
+        "latency_seconds": {
+            stage: _distribution([v for s in samples if (v := getattr(s, stage)) is not None])
+            for stage in _STAGES
+        },
+        "tokens": {
+            "prompt": prompt,
+            "completion": completion,
+            "avg_per_job": round((prompt + completion) / jobs, 1) if jobs else 0.0,
+            "per_job": _distribution([s.prompt_tokens + s.completion_tokens for s in samples], 0),
+        },
+        "cost_usd": {
+            "total": round(cost, 6),
+            "avg_per_job": round(cost / jobs, 6) if jobs else 0.0,
+            "per_job": _distribution([s.cost_usd for s in samples], 6),
+        },
+    }
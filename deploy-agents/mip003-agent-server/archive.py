@@ -0,0 +1,356 @@
+"""
+Job Archive
+===========
+Finished jobs do not need to stay in the live job store forever, but their
+history is still wanted for billing and quality review. With ARCHIVE_DIR
+set, a background task moves completed and failed jobs that finished more
+than ARCHIVE_AFTER_SECONDS ago into compressed columnar files and deletes
+them (and their result blobs) from the store.
+
+Layout (Hive-style partitions, pruned by directory name on queries):
+
+    ARCHIVE_DIR/date=2026-10-19/status=completed/part-1792368000000-4242-0.parquet
+
+- ARCHIVE_FORMAT=parquet (default): per-row-group min/max statistics let
+  filters on template, tenant and completion time skip row groups; rows are
+  sorted by template, tenant and completion time to make them selective
+- ARCHIVE_FORMAT=arrow: Arrow IPC files, faster to write and read back
+  whole, but filtered only by partition
+- ARCHIVE_COMPRESSION: zstd (default), lz4, snappy, gzip, none
+
+Files are written to a staging directory and moved into place, so a crash
+never leaves a partial file behind. A crash after the move but before the
+jobs are deleted archives them again on the next run (at least once).
+
+Query with GET /archive (admin) or from the command line:
+
+    python -m archive --status failed --since 2026-10-01 --template research
+    python -m archive --since 2026-10-01 --until 2026-11-01 --group-by tenant
+
+Needs `pyarrow`; without it archiving stays off.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = ds = None
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "")
+ARCHIVE_AFTER_SECONDS = float(os.getenv("ARCHIVE_AFTER_SECONDS", 7 * 24 * 3600))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", 600))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 5000))
+ARCHIVE_FORMAT = os.getenv("ARCHIVE_FORMAT", "parquet").lower()
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd").lower()
+
+_ROWS_PER_GROUP = 8192
+_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+_DATASET_FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+_TIME_COLUMNS = ("created_at", "started_at", "completed_at")
+# Columns summed per group by aggregate_archive()
+_TOTALS = ("prompt_tokens", "completion_tokens", "cost_usd")
+ARCHIVE_GROUP_BY = ("date", "status", "template", "tenant", "model")
+
+
+def _schema():
+    ts = pa.timestamp("ms", tz="UTC")
+    return pa.schema([
+        ("job_id", pa.string()),
+        ("tenant", pa.string()),
+        ("template", pa.string()),
+        ("model", pa.string()),
+        ("created_at", ts),
+        ("started_at", ts),
+        ("completed_at", ts),
+        ("attempts", pa.int32()),
+        ("prompt_tokens", pa.int64()),
+        ("completion_tokens", pa.int64()),
+        ("cost_usd", pa.float64()),
+        ("result_size", pa.int64()),
+        ("error", pa.string()),
+        ("input_data", pa.string()),  # JSON
+        ("result", pa.string()),
+        ("date", pa.string()),
+        ("status", pa.string()),
+    ])
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([("date", pa.string()), ("status", pa.string())]), flavor="hive")
+
+
+def _ms(value: Any) -> Optional[int]:
+    return int(value * 1000) if isinstance(value, (int, float)) else None
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, default=str)
+
+
+def parse_time(value: Any) -> Optional[float]:
+    """Epoch seconds from epoch seconds or an ISO date/datetime (UTC when naive)."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        parsed = datetime.fromisoformat(str(value))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+
+def _day(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+# =============================================================================
+# Writing
+# =============================================================================
+
+def write_archive(directory: str, rows: List[Dict[str, Any]], fmt: str = ARCHIVE_FORMAT,
+                  compression: str = ARCHIVE_COMPRESSION) -> int:
+    """Write archive rows into their day/status partitions; returns the number of files."""
+    if fmt not in _EXTENSIONS:
+        raise ValueError(f"ARCHIVE_FORMAT must be parquet or arrow, not {fmt!r}")
+    rows = sorted(rows, key=lambda r: (r["template"] or "", r["tenant"] or "", r["completed_at"] or 0))
+    table = pa.Table.from_pylist(rows, schema=_schema())
+    codec = None if compression == "none" else compression
+    file_format = ds.ParquetFileFormat() if fmt == "parquet" else ds.IpcFileFormat()
+    if fmt == "parquet":
+        options = file_format.make_write_options(compression=codec)
+    else:
+        # IPC supports lz4 and zstd only
+        options = file_format.make_write_options(compression=codec if codec in (None, "lz4", "zstd") else "zstd")
+
+    # Dot-prefixed, so queries never see the staging files
+    stamp = f"{int(time.time() * 1000)}-{os.getpid()}"
+    staging = os.path.join(directory, f".staging-{stamp}")
+    written: List[str] = []
+    try:
+        ds.write_dataset(
+            table, staging,
+            format=file_format,
+            file_options=options,
+            partitioning=_partitioning(),
+            basename_template=f"part-{stamp}-{{i}}.{_EXTENSIONS[fmt]}",
+            max_rows_per_group=_ROWS_PER_GROUP,
+            min_rows_per_group=min(_ROWS_PER_GROUP, len(rows)),
+            file_visitor=lambda f: written.append(f.path),
+        )
+        for path in written:
+            target = os.path.join(directory, os.path.relpath(path, staging))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return len(written)
+
+
+class Archiver:
+    """Background task moving old finished jobs from the job store to the archive."""
+
+    def __init__(self, job_backend, result_store, directory: str = ARCHIVE_DIR):
+        self.job_backend = job_backend
+        self.result_store = result_store
+        self.directory = directory
+        self.runs = 0
+        self.archived = 0
+        self.files = 0
+        self.last_run: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                # With a shared store one process archives per interval
+                if await self.job_backend.try_lock("archiver", ARCHIVE_INTERVAL * 0.9):
+                    archived = await self.archive_once()
+                    if archived:
+                        print(f"🗄️  Archived {archived} finished jobs to {self.directory}")
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Warning: job archiving failed: {e}")
+            await asyncio.sleep(ARCHIVE_INTERVAL)
+
+    async def archive_once(self, older_than: float = ARCHIVE_AFTER_SECONDS) -> int:
+        """Archive every job finished more than `older_than` seconds ago, in batches."""
+        cutoff = time.time() - older_than
+        total = 0
+        while True:
+            jobs = await self.job_backend.archivable_jobs(cutoff, ARCHIVE_BATCH_SIZE)
+            if not jobs:
+                break
+            rows = [await self._row(job) for job in jobs]
+            self.files += await asyncio.to_thread(write_archive, self.directory, rows)
+            # Only once the files are in place: a failed write leaves the jobs live
+            await self.job_backend.delete_jobs([row["job_id"] for row in rows])
+            for job in jobs:
+                if job.get("result_ref"):
+                    await self.result_store.delete(job["result_ref"])
+            total += len(jobs)
+            if len(jobs) < ARCHIVE_BATCH_SIZE:
+                break
+        self.runs += 1
+        self.archived += total
+        self.last_run = time.time()
+        return total
+
+    async def _row(self, job) -> Dict[str, Any]:
+        result = job.get("result")
+        if result is None and job.get("result_ref"):
+            # Larger results live only in the result store
+            chunks = [chunk async for chunk in self.result_store.read(job["result_ref"])]
+            result = b"".join(chunks).decode("utf-8", errors="replace")
+        finished = job.get("completed_at") or job.get("created_at")
+        return {
+            "job_id": job["job_id"],
+            "tenant": job.get("tenant"),
+            # As submitted; jobs stored before templates were recorded have none
+            "template": job.get("template"),
+            "model": job.get("model"),
+            **{name: _ms(job.get(name)) for name in _TIME_COLUMNS},
+            "attempts": job.get("attempts"),
+            "prompt_tokens": job.get("prompt_tokens"),
+            "completion_tokens": job.get("completion_tokens"),
+            "cost_usd": job.get("cost_usd"),
+            "result_size": job.get("result_size"),
+            "error": _text(job.get("error")),
+            "input_data": _text(job.get("input_data")),
+            "result": _text(result),
+            "date": _day(finished),
+            "status": getattr(job["status"], "value", job["status"]),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "format": ARCHIVE_FORMAT,
+            "runs": self.runs,
+            "archived": self.archived,
+            "files": self.files,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
+
+
+def create_archiver(job_backend, result_store) -> Optional[Archiver]:
+    if not ARCHIVE_DIR:
+        return None
+    if pa is None:
+        print("Warning: ARCHIVE_DIR is set but pyarrow is not installed; job archiving is off")
+        return None
+    print(f"🗄️  Archiving jobs finished over {ARCHIVE_AFTER_SECONDS / 86400:g} day(s) ago to {ARCHIVE_DIR}")
+    return Archiver(job_backend, result_store)
+
+
+# =============================================================================
+# Querying
+# =============================================================================
+
+def _dataset(directory: str, fmt: str):
+    return ds.dataset(directory, format=_DATASET_FORMATS[fmt], partitioning=_partitioning())
+
+
+def build_filter(status: Optional[str] = None, template: Optional[str] = None,
+                 tenant: Optional[str] = None, since: Any = None, until: Any = None):
+    """Filter expression; status and the day bounds prune partitions, the rest row groups."""
+    conditions = []
+    if status:
+        conditions.append(ds.field("status") == status)
+    if template:
+        conditions.append(ds.field("template") == template)
+    if tenant:
+        conditions.append(ds.field("tenant") == tenant)
+    ts = pa.timestamp("ms", tz="UTC")
+    since, until = parse_time(since), parse_time(until)
+    if since is not None:
+        conditions.append(ds.field("date") >= _day(since))
+        conditions.append(ds.field("completed_at") >= pa.scalar(_ms(since), ts))
+    if until is not None:
+        conditions.append(ds.field("date") <= _day(until))
+        conditions.append(ds.field("completed_at") < pa.scalar(_ms(until), ts))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _jsonable(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+
+
+def query_archive(directory: str = ARCHIVE_DIR, limit: int = 100,
+                  columns: Optional[List[str]] = None, fmt: str = ARCHIVE_FORMAT,
+                  **filters) -> List[Dict[str, Any]]:
+    """Up to `limit` archived jobs matching `filters` (see build_filter), in file order."""
+    if not os.path.isdir(directory):
+        return []
+    scanner = _dataset(directory, fmt).scanner(filter=build_filter(**filters), columns=columns)
+    rows: List[Dict[str, Any]] = []
+    for batch in scanner.to_batches():
+        rows.extend(_jsonable(row) for row in batch.to_pylist()[:limit - len(rows)])
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def aggregate_archive(directory: str = ARCHIVE_DIR, group_by: str = "tenant",
+                      fmt: str = ARCHIVE_FORMAT, **filters) -> List[Dict[str, Any]]:
+    """Jobs and summed tokens and cost per `group_by` value (billing)."""
+    if group_by not in ARCHIVE_GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(ARCHIVE_GROUP_BY)}")
+    if not os.path.isdir(directory):
+        return []
+    table = _dataset(directory, fmt).to_table(filter=build_filter(**filters), columns=[group_by, *_TOTALS])
+    totals = table.group_by(group_by).aggregate(
+        [(group_by, "count")] + [(name, "sum") for name in _TOTALS]
+    )
+    groups = []
+    for row in totals.to_pylist():
+        groups.append({
+            group_by: row[group_by],
+            "jobs": row[f"{group_by}_count"],
+            **{name: round(row[f"{name}_sum"] or 0, 6) for name in _TOTALS},
+        })
+    return sorted(groups, key=lambda g: g["cost_usd"], reverse=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query archived jobs")
+    parser.add_argument("--dir", default=ARCHIVE_DIR or "data/archive")
+    parser.add_argument("--format", default=ARCHIVE_FORMAT, choices=sorted(_EXTENSIONS))
+    parser.add_argument("--status", choices=["completed", "failed"])
+    parser.add_argument("--template")
+    parser.add_argument("--tenant")
+    parser.add_argument("--since", help="Completed at or after (ISO date/datetime or epoch seconds)")
+    parser.add_argument("--until", help="Completed before (ISO date/datetime or epoch seconds)")
+    parser.add_argument("--columns", help="Comma-separated columns to print")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--group-by", choices=ARCHIVE_GROUP_BY, help="Print jobs, tokens and cost per group instead")
+    args = parser.parse_args()
+    if pa is None:
+        sys.exit("Querying the archive needs `pip install pyarrow`")
+
+    filters = {"status": args.status, "template": args.template, "tenant": args.tenant,
+               "since": args.since, "until": args.until}
+    if args.group_by:
+        rows = aggregate_archive(args.dir, args.group_by, args.format, **filters)
+    else:
+        columns = args.columns.split(",") if args.columns else None
+        rows = query_archive(args.dir, args.limit, columns, args.format, **filters)
+    for row in rows:
+        print(json.dumps(row, default=str))
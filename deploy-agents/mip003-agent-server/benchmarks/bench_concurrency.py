@@ -0,0 +1,107 @@
+"""
+Adaptive Concurrency Simulation
+===============================
+Drives AdaptiveLimiter against a simulated provider whose capacity changes
+over time. Up to `capacity` calls run at the base latency; beyond that the
+provider queues them and latency grows in proportion. With --errors, calls
+made while it is overloaded also fail now and then. Prints the limit and
+throughput per phase next to a static limit.
+
+    python benchmarks/bench_concurrency.py [--phase-seconds 5] [--static 8]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from concurrency import AdaptiveLimiter  # noqa: E402
+
+BASE_LATENCY = 0.05
+CALLERS = 96
+PHASES = [16, 6, 32, 12]  # provider capacity (calls at base latency) per phase
+
+
+class Provider:
+    def __init__(self, errors: bool):
+        self.capacity = PHASES[0]
+        self.inflight = 0
+        self.errors = errors
+
+    async def call(self) -> None:
+        self.inflight += 1
+        try:
+            overload = self.inflight / self.capacity
+            await asyncio.sleep(BASE_LATENCY * max(1.0, overload) * random.uniform(0.9, 1.1))
+            if self.errors and overload > 1.5 and random.random() < 0.1:
+                raise RuntimeError("overloaded")
+        finally:
+            self.inflight -= 1
+
+
+class StaticLimiter:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.limit = limit
+
+    async def acquire(self) -> None:
+        await self.semaphore.acquire()
+
+    def release(self, latency: float, ok: bool = True) -> None:
+        self.semaphore.release()
+
+
+async def simulate(limiter, phase_seconds: float, errors: bool):
+    provider = Provider(errors)
+    completed = [0]
+    latencies = []
+    stop = asyncio.Event()
+
+    async def caller():
+        while not stop.is_set():
+            await limiter.acquire()
+            started = time.monotonic()
+            try:
+                await provider.call()
+            except RuntimeError:
+                limiter.release(time.monotonic() - started, ok=False)
+                continue
+            latency = time.monotonic() - started
+            limiter.release(latency)
+            completed[0] += 1
+            latencies.append(latency)
+
+    tasks = [asyncio.create_task(caller()) for _ in range(CALLERS)]
+    rows = []
+    for capacity in PHASES:
+        provider.capacity = capacity
+        completed[0], latencies[:] = 0, []
+        await asyncio.sleep(phase_seconds)
+        avg = sum(latencies) / len(latencies) if latencies else 0.0
+        rows.append((capacity, limiter.limit, completed[0] / phase_seconds, avg))
+    stop.set()
+    await asyncio.gather(*tasks)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate adaptive vs. static concurrency limits")
+    parser.add_argument("--phase-seconds", type=float, default=5.0)
+    parser.add_argument("--static", type=int, default=8, help="Static limit to compare against")
+    parser.add_argument("--errors", action="store_true", help="Overloaded provider fails some calls")
+    args = parser.parse_args()
+
+    ideal = 1 / BASE_LATENCY
+    for label, limiter in [("adaptive", AdaptiveLimiter("sim")), (f"static {args.static}", StaticLimiter(args.static))]:
+        print(f"{label}:")
+        for capacity, limit, throughput, avg in asyncio.run(simulate(limiter, args.phase_seconds, args.errors)):
+            print(f"  capacity {capacity:3d}  limit {limit:3d}  {throughput:7.1f} calls/s "
+                  f"(max {capacity * ideal:5.0f})  avg latency {avg * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Job Event Log Benchmark
+=======================
+Appends the events of a typical job lifecycle (create, running, progress,
+completed) for N jobs with each JOB_LOG_FSYNC mode, next to fsyncing a JSONL
+file per event, then times rebuilding the jobs from the log on startup.
+
+    python benchmarks/bench_event_log.py [--jobs 20000] [--dir /tmp/bench-log]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from event_log import EventLog  # noqa: E402
+
+
+def lifecycle(i: int):
+    job_id = f"job-{i:08d}"
+    now = time.time()
+    yield job_id, {"job_id": job_id, "status": "queued", "created_at": now, "tenant": "bench",
+                   "input_data": {"task": "Summarise the attached report", "context": "x" * 400}}
+    yield job_id, {"status": "running", "run_id": "r1", "started_at": now}
+    yield job_id, {"progress": 0.5}
+    yield job_id, {"status": "completed", "progress": 1.0, "result_ref": f"results/{job_id}", "completed_at": now}
+
+
+def bench_log(directory: str, jobs: int, fsync: str) -> float:
+    shutil.rmtree(directory, ignore_errors=True)
+    log = EventLog(directory, fsync=fsync)
+    log.open(lambda job_id, fields: None)
+    started = time.perf_counter()
+    for i in range(jobs):
+        for job_id, fields in lifecycle(i):
+            log.append(job_id, fields)
+    elapsed = time.perf_counter() - started
+    log.close()
+    return elapsed
+
+
+def bench_jsonl_fsync(directory: str, jobs: int) -> float:
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    started = time.perf_counter()
+    with open(os.path.join(directory, "jobs.journal"), "a", encoding="utf-8") as f:
+        for i in range(jobs):
+            for job_id, fields in lifecycle(i):
+                f.write(json.dumps({"job_id": job_id, "fields": fields}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the segmented job event log")
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--dir", default="/tmp/bench-job-log")
+    args = parser.parse_args()
+
+    events = args.jobs * 4
+    # fsync per event is slow on most disks; measure it on a tenth of the jobs
+    few = max(args.jobs // 10, 1)
+    rows = [
+        ("event log, fsync off", bench_log(args.dir, args.jobs, "off"), events),
+        ("event log, fsync batch", bench_log(args.dir, args.jobs, "batch"), events),
+        ("event log, fsync always", bench_log(args.dir, few, "always"), few * 4),
+        ("jsonl, fsync per event", bench_jsonl_fsync(args.dir + "-jsonl", few), few * 4),
+    ]
+    for label, elapsed, count in rows:
+        print(f"  {label:<26} {count / elapsed:10.0f} events/s  ({elapsed * 1e6 / count:7.1f} us/event)")
+
+    bench_log(args.dir, args.jobs, "batch")
+    jobs = {}
+
+    def apply(job_id, fields):
+        if job_id in jobs:
+            jobs[job_id].update(fields)
+        else:
+            jobs[job_id] = dict(fields)
+
+    log = EventLog(args.dir)
+    replayed = log.open(apply)
+    log.close()
+    print(f"  rebuild: {len(jobs)} jobs from {replayed} events in {log.rebuild_seconds * 1000:.0f} ms")
+    shutil.rmtree(args.dir, ignore_errors=True)
+    shutil.rmtree(args.dir + "-jsonl", ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
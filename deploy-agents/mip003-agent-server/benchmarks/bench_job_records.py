@@ -0,0 +1,89 @@
+"""
+Job Record Memory Benchmark
+===========================
+Retained memory per job for the previous dict-per-job layout versus
+JobRecord, with and without packed payloads (JOB_PACK_PAYLOADS).
+
+    python benchmarks/bench_job_records.py [--jobs 100000]
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import job_record  # noqa: E402
+from job_record import JobRecord  # noqa: E402
+
+RESULT = "Summary of the requested analysis. " * 30  # ~1 KB inline result
+
+
+def job_fields(i: int, completed: bool) -> dict:
+    """The fields /start_job and a finished execution write for a job."""
+    return {
+        "job_id": str(uuid.uuid4()),
+        "status": "completed" if completed else "queued",
+        "input_data": {
+            "task": f"Write a short product description for item {i}",
+            "context": "Audience: small business owners. Keep it friendly.",
+            "max_tokens": 1000,
+        },
+        "payment_id": None,
+        "tenant": f"tenant-{i % 50}",
+        "result": f"{RESULT}(job {i})" if completed else None,
+        "error": None,
+        "progress": 1.0 if completed else 0.0,
+        "created_at": time.time(),
+        "enqueued_at": time.time(),
+        "completed_at": time.time() if completed else None,
+        "run_id": uuid.uuid4().hex,
+        "attempts": 1,
+    }
+
+
+def legacy_layout(fields: dict) -> dict:
+    """The dict layout with ISO timestamp strings, as stored before JobRecord."""
+    job = dict(fields)
+    job["created_at"] = datetime.utcnow().isoformat()
+    if job["completed_at"] is not None:
+        job["completed_at"] = datetime.utcnow().isoformat()
+    return job
+
+
+def measure(build, count: int) -> float:
+    """Bytes retained per job by `count` jobs built with `build`."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = {}
+    for i in range(count):
+        job = build(job_fields(i, completed=i % 2 == 0))
+        store[job["job_id"]] = job
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark job record memory footprint")
+    parser.add_argument("--jobs", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{args.jobs:,} jobs (half completed with a ~1 KB inline result)\n")
+    layouts = [("dict (ISO timestamps)", legacy_layout, False),
+               ("JobRecord", JobRecord.from_fields, False),
+               ("JobRecord + packed payloads", JobRecord.from_fields, True)]
+    baseline = None
+    for label, build, packed in layouts:
+        job_record.JOB_PACK_PAYLOADS = packed
+        per_job = measure(build, args.jobs)
+        baseline = baseline or per_job
+        print(f"  {label:<28} {per_job:8,.0f} bytes/job  ({per_job / baseline:5.1%})")
+
+
+if __name__ == "__main__":
+    main()
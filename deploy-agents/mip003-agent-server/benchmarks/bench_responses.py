@@ -0,0 +1,87 @@
+"""
+Response Encoding Benchmark
+===========================
+Measures JSON serialisation (stdlib json vs orjson) and compression
+(gzip/brotli/zstd) on JobStatusResponse-shaped payloads of different sizes.
+
+    python benchmarks/bench_responses.py [--iterations 2000]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from compression import Compressor, available_encodings  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SAMPLE_PARAGRAPH = (
+    "The quarterly analysis shows steady growth across all regions, with the "
+    "strongest gains in subscription revenue and a modest decline in churn. "
+)
+
+
+def status_payload(result_chars: int) -> dict:
+    """A /status response body with a result of roughly `result_chars`."""
+    job_id = str(uuid.uuid4())
+    result = (SAMPLE_PARAGRAPH * (result_chars // len(SAMPLE_PARAGRAPH) + 1))[:result_chars]
+    return {
+        "job_id": job_id,
+        "status": "completed",
+        "result": result or None,
+        "result_size": len(result),
+        "result_url": f"/result?job_id={job_id}",
+        "error": None,
+        "created_at": datetime.utcnow().isoformat(),
+        "updated_at": datetime.utcnow().isoformat(),
+        "progress": 100,
+    }
+
+
+def timed(fn, iterations: int) -> float:
+    """Mean microseconds per call."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialisation and compression")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"orjson: {'installed' if orjson else 'not installed'}")
+    print(f"encodings: {', '.join(available_encodings())}\n")
+
+    for label, size in (("empty result", 0), ("2 KB result", 2_000), ("16 KB result", 16_000), ("64 KB result", 64_000)):
+        payload = status_payload(size)
+        body = json.dumps(payload).encode()
+        iterations = max(args.iterations * 2_000 // max(len(body), 2_000), 50)
+
+        print(f"== {label} ({len(body):,} bytes JSON) ==")
+        print(f"  json.dumps     {timed(lambda: json.dumps(payload).encode(), iterations):9.1f} us")
+        if orjson:
+            print(f"  orjson.dumps   {timed(lambda: orjson.dumps(payload), iterations):9.1f} us")
+
+        for encoding in available_encodings():
+            def run(encoding=encoding):
+                c = Compressor(encoding)
+                return c.compress(body) + c.flush()
+            compressed = run()
+            ratio = len(compressed) / len(body)
+            print(f"  {encoding:<6} {len(compressed):>9,} bytes ({ratio:5.1%})  {timed(run, iterations):9.1f} us")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Map-Reduce Chunking
+===================
+Inputs too large for one agent call (a dataset for data_analysis, a code
+base for code_review) are split into chunks, each chunk is analysed by its
+own agent call (map), and the partial analyses are merged by a final call
+(reduce). Partials that are still too large together are merged in rounds.
+
+Splitting follows the input's structure:
+- tabular data keeps its header row and repeats it in every chunk
+- code and text are cut at blank-line block boundaries (functions, classes,
+  paragraphs), falling back to line and then character boundaries for
+  blocks that are larger than a chunk on their own
+
+Sizes are in characters (CHUNK_SIZE_CHARS, ~4 characters per token).
+"""
+
+import os
+from typing import Dict, List, Optional
+
+CHUNKING_ENABLED = os.getenv("CHUNKING_ENABLED", "true").lower() == "true"
+# Inputs whose chunked field exceeds this many characters are map-reduced
+CHUNK_THRESHOLD_CHARS = int(os.getenv("CHUNK_THRESHOLD_CHARS", 48000))
+CHUNK_SIZE_CHARS = int(os.getenv("CHUNK_SIZE_CHARS", 24000))
+# Chunk analyses running at once for one job
+CHUNK_CONCURRENCY = int(os.getenv("CHUNK_CONCURRENCY", 4))
+
+# The free-text field each template may receive in bulk (background fields
+# such as the general template's `context` are trimmed to the token budget
+# instead, see tokens.py)
+CHUNKED_FIELDS: Dict[str, str] = {
+    "data_analysis": "data",
+    "code_review": "code",
+}
+
+
+def chunked_field(template: str, input_data: Dict) -> Optional[str]:
+    """The field to map-reduce for this job, or None to run it in one call."""
+    field = CHUNKED_FIELDS.get(template)
+    if not CHUNKING_ENABLED or field is None:
+        return None
+    value = input_data.get(field)
+    if isinstance(value, str) and len(value) > CHUNK_THRESHOLD_CHARS:
+        return field
+    return None
+
+
+def _looks_tabular(lines: List[str]) -> bool:
+    if len(lines) < 3:
+        return False
+    for sep in (",", "\t", ";", "|"):
+        count = lines[0].count(sep)
+        if count and all(line.count(sep) == count for line in lines[1:4]):
+            return True
+    return False
+
+
+def _hard_split(text: str, size: int) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _pack(pieces: List[str], size: int, prefix: str = "") -> List[str]:
+    """Greedily pack pieces (each ending in its separator) into chunks of ~`size` characters."""
+    chunks, current, length = [], [], len(prefix)
+    for piece in pieces:
+        if current and length + len(piece) > size:
+            chunks.append(prefix + "".join(current).rstrip("\n"))
+            current, length = [], len(prefix)
+        current.append(piece)
+        length += len(piece)
+    if current:
+        chunks.append(prefix + "".join(current).rstrip("\n"))
+    return chunks
+
+
+def split_text(text: str, size: int = CHUNK_SIZE_CHARS) -> List[str]:
+    """Split `text` into chunks of at most ~`size` characters along its structure."""
+    if len(text) <= size:
+        return [text]
+
+    lines = text.splitlines()
+    if _looks_tabular(lines):
+        header = lines[0] + "\n"
+        return _pack([line + "\n" for line in lines[1:]], size, prefix=header)
+
+    pieces: List[str] = []
+    for block in text.split("\n\n"):
+        if len(block) <= size:
+            pieces.append(block + "\n\n")
+            continue
+        for line in block.splitlines():
+            pieces.extend(_hard_split(line, size) if len(line) > size else [line + "\n"])
+        pieces[-1] += "\n"
+    return _pack(pieces, size)
+
+
+def map_instructions(label: str, index: int, total: int) -> str:
+    return (
+        f"## Chunk\nThis request contains part {index} of {total} of the {label}. "
+        "Analyse only this part and report your findings concisely; the findings "
+        "for all parts will be combined afterwards."
+    )
+
+
+def reduce_prompt(request: str, label: str, partials: List[str]) -> str:
+    sections = "\n\n".join(
+        f"### Findings for part {i} of {len(partials)}\n{partial}"
+        for i, partial in enumerate(partials, 1)
+    )
+    return (
+        f"{request}\n\n## Partial Analyses\nThe {label} was too large to process at once "
+        f"and was analysed in {len(partials)} parts. Combine the findings below into "
+        "one complete response to the request, removing duplicates and resolving "
+        f"overlaps between parts.\n\n{sections}"
+    )
+
+
+def reduce_batches(partials: List[str], size: int = CHUNK_THRESHOLD_CHARS) -> List[List[str]]:
+    """
+    Group partials so that each reduce call stays within `size` characters.
+    A single batch means the partials can be merged in one final call.
+    """
+    batches, current, length = [], [], 0
+    for partial in partials:
+        if current and length + len(partial) > size:
+            batches.append(current)
+            current, length = [], 0
+        current.append(partial)
+        length += len(partial)
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,203 @@
+"""
+Response Compression
+====================
+Content-encoding negotiation, incremental compressors and an ASGI middleware
+that compresses every compressible response above a size threshold.
+
+gzip is always available; brotli and zstd are used when the `brotli` /
+`zstandard` packages are installed. Streaming responses are compressed chunk
+by chunk (each chunk is flushed, so streamed output still arrives promptly).
+Server-sent events, partial content and already-encoded responses are passed
+through untouched.
+"""
+
+import os
+import zlib
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+
+# Server preference order when the client weighs encodings equally
+_PREFERENCE = ("br", "zstd", "gzip")
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+_NEVER_COMPRESS = ("text/event-stream",)
+
+
+def available_encodings():
+    installed = {"br": brotli is not None, "zstd": zstandard is not None, "gzip": True}
+    return tuple(e for e in _PREFERENCE if installed[e])
+
+
+def parse_accept_encoding(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def identity_refused(accepted: Dict[str, float]) -> bool:
+    """True when the client rules out uncompressed bodies (identity;q=0 or *;q=0)."""
+    return accepted.get("identity", accepted.get("*", 1.0)) <= 0
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Return the supported encoding with the highest q-value the client accepts."""
+    accepted = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class Compressor:
+    """Incremental compressor: feed chunks with compress(), end with flush()."""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+        elif encoding == "br" and brotli is not None:
+            self._obj = brotli.Compressor(quality=5 if level is None else level)
+        elif encoding == "zstd" and zstandard is not None:
+            self._obj = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def sync(self) -> bytes:
+        """Emit everything buffered so far without ending the stream."""
+        if self.encoding == "gzip":
+            return self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._obj.flush()
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    compressor = Compressor(encoding)
+    return compressor.compress(data) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with the negotiated encoding."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        # A client refusing identity gets even small bodies compressed
+        minimum_size = 0 if identity_refused(parse_accept_encoding(accept)) else self.minimum_size
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or b"content-encoding" in headers
+                    or b"content-range" in headers
+                    or content_type.startswith(_NEVER_COMPRESS)
+                    or not content_type.startswith(_COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                return await send(message)
+            if passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < minimum_size:
+                    # Small, complete body: not worth compressing
+                    await send(start_message)
+                    return await send(message)
+
+                compressor = Compressor(encoding)
+                headers = []
+                vary = []
+                for k, v in start_message.get("headers", []):
+                    if k.lower() == b"content-length":
+                        continue
+                    if k.lower() == b"vary":
+                        # Merged into a single Vary below rather than repeated
+                        vary.extend(f.strip() for f in v.split(b",") if f.strip())
+                        continue
+                    if k.lower() == b"etag" and not v.startswith(b"W/"):
+                        v = b"W/" + v  # Encoded bytes differ from the identity entity
+                    headers.append((k, v))
+                headers.append((b"content-encoding", encoding.encode()))
+                if not {b"accept-encoding", b"*"} & {f.lower() for f in vary}:
+                    vary.append(b"Accept-Encoding")
+                headers.append((b"vary", b", ".join(vary)))
+                if not more_body:
+                    body = compressor.compress(body) + compressor.flush()
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start_message, "headers": headers})
+                    return await send({"type": "http.response.body", "body": body})
+                await send({**start_message, "headers": headers})
+
+            if more_body:
+                out = compressor.compress(body) + compressor.sync()
+                if out:
+                    await send({"type": "http.response.body", "body": out, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.compress(body) + compressor.flush()})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,178 @@
+"""
+Adaptive Concurrency Limits
+===========================
+Bounds the agent calls running at once per model with a limit that follows
+the provider's capacity instead of a fixed number (gradient algorithm, after
+Netflix's concurrency-limits Gradient2):
+
+- the limit is updated once per window of `limit` finished calls (about one
+  round trip), so each change is judged on calls made under it
+- the window's average latency is compared with a long-term average (over
+  ADAPTIVE_LONG_WINDOW windows, mostly of windows without inflated
+  latency) of the model's normal latency:
+  gradient = clamp(ADAPTIVE_TOLERANCE * long / short, 0.5, 1), which is 1
+  while latency stays flat and lower as it inflates
+- new limit = limit * gradient + sqrt(limit), smoothed, so a flat latency
+  lets the limit grow by ~sqrt(limit) per window and an inflating one
+  shrinks it (down to ~4, where limit / 2 + sqrt(limit) == limit)
+- a window with errors or timeouts cuts the limit multiplicatively
+  (ADAPTIVE_BACKOFF) instead
+- the limit only grows while at least half of it is in use, so an idle
+  model does not build up a limit it has never been tested at
+
+Calls over the limit wait for a slot. The limit stays within
+[ADAPTIVE_MIN_LIMIT, ADAPTIVE_MAX_LIMIT]; its recent changes are kept for
+/concurrency. Chunked jobs and hedges make several calls per job, so set
+WORKER_CONCURRENCY to the most jobs a process may hold and let the limiter
+decide how many calls run.
+"""
+
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+from scaling import Ewma
+
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+ADAPTIVE_INITIAL_LIMIT = int(os.getenv("ADAPTIVE_INITIAL_LIMIT", 8))
+ADAPTIVE_MIN_LIMIT = int(os.getenv("ADAPTIVE_MIN_LIMIT", 1))
+ADAPTIVE_MAX_LIMIT = int(os.getenv("ADAPTIVE_MAX_LIMIT", 64))
+# Latency may grow this much over the long-term average before the limit shrinks
+ADAPTIVE_TOLERANCE = float(os.getenv("ADAPTIVE_TOLERANCE", 1.5))
+# Factor applied to the limit on an error or timeout
+ADAPTIVE_BACKOFF = float(os.getenv("ADAPTIVE_BACKOFF", 0.9))
+ADAPTIVE_SMOOTHING = float(os.getenv("ADAPTIVE_SMOOTHING", 0.2))
+# Windows averaged by the long-term latency
+ADAPTIVE_LONG_WINDOW = int(os.getenv("ADAPTIVE_LONG_WINDOW", 20))
+
+_HISTORY = 200
+
+
+class AdaptiveLimiter:
+    """Gradient concurrency limit for the calls to one model."""
+
+    def __init__(self, name: str, initial: int = ADAPTIVE_INITIAL_LIMIT):
+        self.name = name
+        self.estimate = float(min(max(initial, ADAPTIVE_MIN_LIMIT), ADAPTIVE_MAX_LIMIT))
+        self.inflight = 0
+        self.short_latency = Ewma(alpha=1.0)  # Last window's average
+        self.long_latency = Ewma(alpha=1 / ADAPTIVE_LONG_WINDOW)
+        # Current window: latency sum, calls, peak in-flight, errors
+        self._window = [0.0, 0, 0, 0]
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.history: Deque[Tuple[float, int]] = deque([(time.time(), self.limit)], maxlen=_HISTORY)
+        self.calls = 0
+        self.dropped = 0
+        self.waited = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self.estimate)
+
+    async def acquire(self) -> None:
+        if self.inflight < self.limit and not self.waiters:
+            self.inflight += 1
+            return
+        self.waited += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as it was cancelled: pass it on
+                self.inflight -= 1
+                self._wake()
+            elif waiter in self.waiters:
+                self.waiters.remove(waiter)
+            raise
+
+    def release(self, latency: float, ok: bool = True, sample: bool = True) -> None:
+        """Free a slot; `sample=False` for calls that say nothing about the model (cancelled)."""
+        window = self._window
+        window[2] = max(window[2], self.inflight)
+        self.inflight -= 1
+        if sample:
+            self.calls += 1
+            window[1] += 1
+            if ok:
+                window[0] += latency
+            else:
+                self.dropped += 1
+                window[3] += 1
+            if window[1] >= self.limit:
+                self._update(*window)
+                self._window = [0.0, 0, 0, 0]
+        self._wake()
+
+    def _update(self, total: float, calls: int, peak: int, errors: int) -> None:
+        """Adjust the limit at the end of a window."""
+        if errors:
+            self._set(self.estimate * ADAPTIVE_BACKOFF)
+            return
+        short = total / calls
+        if short <= 0:
+            return
+        self.short_latency.add(short)
+        long = self.long_latency.get(short)
+        if short <= ADAPTIVE_TOLERANCE * long:
+            self.long_latency.add(short)
+        else:
+            # Inflated windows barely move the baseline, or the limit would
+            # settle wherever the overload has dragged it; a provider that
+            # became slower for good is still learned, just slowly
+            self.long_latency.value = long + (short - long) * self.long_latency.alpha / 10
+        gradient = max(0.5, min(1.0, ADAPTIVE_TOLERANCE * long / short))
+        target = self.estimate * gradient + math.sqrt(self.estimate)
+        if target > self.estimate and peak < self.estimate / 2:
+            return  # Not using the limit we have; no evidence for a higher one
+        self._set(self.estimate * (1 - ADAPTIVE_SMOOTHING) + target * ADAPTIVE_SMOOTHING)
+
+    def _set(self, estimate: float) -> None:
+        previous = self.limit
+        self.estimate = min(max(estimate, ADAPTIVE_MIN_LIMIT), ADAPTIVE_MAX_LIMIT)
+        if self.limit != previous:
+            self.history.append((time.time(), self.limit))
+
+    def _wake(self) -> None:
+        while self.waiters and self.inflight < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "inflight": self.inflight,
+            "waiting": len(self.waiters),
+            "calls": self.calls,
+            "dropped": self.dropped,
+            "waited": self.waited,
+            "short_latency_seconds": round(self.short_latency.get(), 3),
+            "long_latency_seconds": round(self.long_latency.get(), 3),
+        }
+
+
+class ConcurrencyLimits:
+    """One adaptive limiter per model."""
+
+    def __init__(self, enabled: bool = ADAPTIVE_CONCURRENCY):
+        self.enabled = enabled
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+
+    def get(self, model: str) -> AdaptiveLimiter:
+        if model not in self.limiters:
+            self.limiters[model] = AdaptiveLimiter(model)
+        return self.limiters[model]
+
+    def stats(self, history: bool = False) -> Dict[str, Any]:
+        models = {}
+        for model, limiter in self.limiters.items():
+            models[model] = limiter.stats()
+            if history:
+                models[model]["history"] = [[round(t, 3), limit] for t, limit in limiter.history]
+        return {"enabled": self.enabled, "models": models}
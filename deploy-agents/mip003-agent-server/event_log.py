@@ -0,0 +1,359 @@
+"""
+Segmented Job Event Log
+=======================
+Durable job state for the memory backend without an external database:
+every job change (creation, status, progress, result, error) is appended to
+a log on local disk, and the in-memory job store is rebuilt from it on
+startup.
+
+Files in JOB_LOG_DIR:
+- segment-00000042.log   events in append order; a new segment is started
+                         once the current one reaches JOB_LOG_SEGMENT_BYTES
+- snapshot-00000041.log  the state of every job as of the end of segment 41
+
+Every record is a 4-byte length, a 4-byte CRC32 and a JSON payload
+{"j": job_id, "t": time, "f": changed fields}; "f" is null for a deleted
+(archived) job. A record torn by a crash fails its length or checksum and
+is cut off on startup.
+
+- Writes: one write(2) per event, so a process crash loses nothing. fsync
+  is batched (JOB_LOG_FSYNC=batch): a background thread syncs at most every
+  JOB_LOG_FSYNC_INTERVAL seconds, bounding what a power loss can take;
+  `always` syncs every event, `off` leaves it to the OS.
+- Reads: files are memory-mapped, and an index of packed (file, offset)
+  positions per job serves a job's history without scanning.
+- Compaction: once JOB_LOG_COMPACT_SEGMENTS segments are sealed, the current
+  state is written as a snapshot and the files it covers are deleted. A
+  job's history before a compaction collapses into its snapshot entry.
+- Startup: load the newest snapshot, replay the segments after it.
+"""
+
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import threading
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+JOB_LOG_DIR = os.getenv("JOB_LOG_DIR", "")
+JOB_LOG_SEGMENT_BYTES = int(os.getenv("JOB_LOG_SEGMENT_BYTES", 64 * 1024 * 1024))
+JOB_LOG_FSYNC = os.getenv("JOB_LOG_FSYNC", "batch").lower()
+JOB_LOG_FSYNC_INTERVAL = float(os.getenv("JOB_LOG_FSYNC_INTERVAL", 0.05))
+JOB_LOG_COMPACT_SEGMENTS = int(os.getenv("JOB_LOG_COMPACT_SEGMENTS", 8))
+
+_HEADER = struct.Struct("<II")  # payload length, crc32
+# An index position packs (file id << 40) | offset. File ids are 2 * seq for
+# segments and 2 * seq + 1 for snapshots, so they sort in replay order.
+_OFFSET_BITS = 40
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+
+Apply = Callable[[str, Optional[Dict[str, Any]]], None]
+
+
+def encode(job_id: str, fields: Optional[Dict[str, Any]]) -> bytes:
+    payload = json.dumps({"j": job_id, "t": time.time(), "f": fields},
+                         separators=(",", ":"), default=str).encode()
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def scan(view) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """Yield (offset, end, event) for each intact record; stops at a torn tail."""
+    offset, size = 0, len(view)
+    while offset + _HEADER.size <= size:
+        length, crc = _HEADER.unpack_from(view, offset)
+        start = offset + _HEADER.size
+        payload = view[start:start + length]
+        if length == 0 or len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        yield offset, start + length, json.loads(payload)
+        offset = start + length
+
+
+def _sync_dir(path: str) -> None:
+    """Make a rename or unlink in `path` durable."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class EventLog:
+    """Append-only segmented log of job events with a per-job position index."""
+
+    def __init__(self, directory: str, segment_bytes: int = JOB_LOG_SEGMENT_BYTES,
+                 fsync: str = JOB_LOG_FSYNC):
+        if fsync not in ("batch", "always", "off"):
+            raise ValueError(f"JOB_LOG_FSYNC must be batch, always or off, not {fsync!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.index: Dict[str, array] = {}
+        self._paths: Dict[int, str] = {}
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._seq = 0
+        self._size = 0
+        self._dirty = False
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.appended = 0
+        self.fsyncs = 0
+        self.compactions = 0
+        self.rebuild_seconds = 0.0
+
+    def _path(self, kind: str, seq: int) -> str:
+        return os.path.join(self.directory, f"{kind}-{seq:08d}.log")
+
+    def _list(self, kind: str) -> List[int]:
+        return sorted(
+            int(name[len(kind) + 1:-4]) for name in os.listdir(self.directory)
+            if name.startswith(kind + "-") and name.endswith(".log")
+        )
+
+    # -- startup -------------------------------------------------------------
+
+    def open(self, apply: Apply) -> int:
+        """Feed the newest snapshot and every later event to `apply`, then open for appends."""
+        started = time.perf_counter()
+        snapshots = self._list("snapshot")
+        base = snapshots[-1] if snapshots else -1
+        # Leftovers of a compaction interrupted before its cleanup
+        for seq in snapshots[:-1]:
+            os.remove(self._path("snapshot", seq))
+        segments = []
+        for seq in self._list("segment"):
+            if seq <= base:
+                os.remove(self._path("segment", seq))
+            else:
+                segments.append(seq)
+
+        events = 0
+        if base >= 0:
+            self._paths[2 * base + 1] = self._path("snapshot", base)
+        for seq in segments:
+            self._paths[2 * seq] = self._path("segment", seq)
+        for file_id in sorted(self._paths):
+            events += self._load(file_id, apply)
+
+        self._seq = segments[-1] if segments else base + 1
+        self._open_segment()
+        if self.fsync == "batch":
+            self._flusher = threading.Thread(target=self._flush_loop, name="job-log-fsync", daemon=True)
+            self._flusher.start()
+        self.rebuild_seconds = time.perf_counter() - started
+        return events
+
+    def _load(self, file_id: int, apply: Apply) -> int:
+        path = self._paths[file_id]
+        view = self._map(file_id)
+        events, end = 0, 0
+        if view is not None:
+            for offset, end, event in scan(view):
+                apply(event["j"], event["f"])
+                if event["f"] is None:
+                    self.index.pop(event["j"], None)
+                else:
+                    self._remember(event["j"], file_id, offset)
+                events += 1
+        size = os.path.getsize(path)
+        if end < size:
+            print(f"⚠️  Job log {os.path.basename(path)}: dropping {size - end} bytes of torn tail")
+            self._unmap(file_id)
+            os.truncate(path, end)
+        return events
+
+    def _remember(self, job_id: str, file_id: int, offset: int) -> None:
+        positions = self.index.get(job_id)
+        if positions is None:
+            positions = self.index[job_id] = array("Q")
+        positions.append((file_id << _OFFSET_BITS) | offset)
+
+    # -- writes --------------------------------------------------------------
+
+    def _open_segment(self) -> None:
+        path = self._path("segment", self._seq)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._size = os.fstat(self._fd).st_size
+        self._paths[2 * self._seq] = path
+
+    def append(self, job_id: str, fields: Dict[str, Any]) -> None:
+        offset = self._write(encode(job_id, fields))
+        self._remember(job_id, 2 * self._seq, offset)
+
+    def delete(self, job_id: str) -> None:
+        """Record that a job is gone; its history goes with it."""
+        self._write(encode(job_id, None))
+        self.index.pop(job_id, None)
+
+    def _write(self, record: bytes) -> int:
+        with self._lock:
+            if self._size and self._size + len(record) > self.segment_bytes:
+                self._roll()
+            offset = self._size
+            os.write(self._fd, record)
+            self._size += len(record)
+            if self.fsync == "always":
+                os.fsync(self._fd)
+                self.fsyncs += 1
+            else:
+                self._dirty = True
+        self.appended += 1
+        return offset
+
+    def _roll(self) -> None:
+        if self.fsync != "off":
+            os.fsync(self._fd)
+        os.close(self._fd)
+        self._dirty = False
+        self._unmap(2 * self._seq)  # Mapped again at its final size when read
+        self._seq += 1
+        self._open_segment()
+
+    def roll(self) -> int:
+        """Seal the active segment and return its sequence number."""
+        with self._lock:
+            sealed = self._seq
+            self._roll()
+        return sealed
+
+    def sync(self) -> None:
+        with self._lock:
+            os.fsync(self._fd)
+            self._dirty = False
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(JOB_LOG_FSYNC_INTERVAL):
+            with self._lock:
+                if not self._dirty:
+                    continue
+                # Sync a duplicate outside the lock so appends never wait on
+                # the disk, and a segment roll can close the original meanwhile
+                fd, self._dirty = os.dup(self._fd), False
+            try:
+                os.fsync(fd)
+                self.fsyncs += 1
+            finally:
+                os.close(fd)
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            if self._fd is not None:
+                if self._dirty and self.fsync != "off":
+                    os.fsync(self._fd)
+                os.close(self._fd)
+                self._fd = None
+        for file_id in list(self._maps):
+            self._unmap(file_id)
+
+    # -- reads ---------------------------------------------------------------
+
+    def _map(self, file_id: int) -> Optional[mmap.mmap]:
+        view = self._maps.get(file_id)
+        if view is None:
+            with open(self._paths[file_id], "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                view = self._maps[file_id] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return view
+
+    def _unmap(self, file_id: int) -> None:
+        view = self._maps.pop(file_id, None)
+        if view is not None:
+            view.close()
+
+    def _read(self, position: int) -> Dict[str, Any]:
+        file_id, offset = position >> _OFFSET_BITS, position & _OFFSET_MASK
+        view = self._map(file_id)
+        if view is None or offset + _HEADER.size > len(view):
+            self._unmap(file_id)  # The active segment grew past its mapping
+            view = self._map(file_id)
+        length, _ = _HEADER.unpack_from(view, offset)
+        start = offset + _HEADER.size
+        if start + length > len(view):
+            self._unmap(file_id)
+            view = self._map(file_id)
+        return json.loads(view[start:start + length])
+
+    def history(self, job_id: str) -> Optional[List[Dict[str, Any]]]:
+        """A job's events, oldest first; the first is its snapshot after a compaction."""
+        positions = self.index.get(job_id)
+        if positions is None:
+            return None
+        events = []
+        for position in positions:
+            event = self._read(position)
+            snapshot = bool((position >> _OFFSET_BITS) & 1)
+            events.append({"time": event["t"], "fields": event["f"], "snapshot": snapshot})
+        return events
+
+    # -- compaction ----------------------------------------------------------
+
+    @property
+    def sealed_segments(self) -> int:
+        return sum(1 for file_id in self._paths if not file_id & 1) - 1
+
+    @property
+    def needs_compaction(self) -> bool:
+        return 0 < JOB_LOG_COMPACT_SEGMENTS <= self.sealed_segments
+
+    def write_snapshot(self, sealed: int, states: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Write every job's state as of the end of segment `sealed` (blocking,
+        run it in a thread). Returns each job's offset in the snapshot.
+        """
+        path = self._path("snapshot", sealed)
+        offsets: Dict[str, int] = {}
+        with open(path + ".tmp", "wb") as f:
+            for job_id, fields in states.items():
+                offsets[job_id] = f.tell()
+                f.write(encode(job_id, fields))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        _sync_dir(self.directory)
+        return offsets
+
+    def finish_compaction(self, sealed: int, offsets: Dict[str, int]) -> None:
+        """Point the index at the snapshot and delete the files it replaces."""
+        snapshot_id = 2 * sealed + 1
+        obsolete = [file_id for file_id in self._paths if file_id < snapshot_id]
+        self._paths[snapshot_id] = self._path("snapshot", sealed)
+
+        boundary = snapshot_id << _OFFSET_BITS
+        for job_id in list(self.index):
+            later = array("Q", (p for p in self.index[job_id] if p >= boundary))
+            offset = offsets.get(job_id)
+            if offset is not None:
+                later.insert(0, boundary | offset)
+            if later:
+                self.index[job_id] = later
+            else:
+                del self.index[job_id]
+
+        for file_id in obsolete:
+            self._unmap(file_id)
+            os.remove(self._paths.pop(file_id))
+        _sync_dir(self.directory)
+        self.compactions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "fsync": self.fsync,
+            "segments": self.sealed_segments + 1,
+            "active_segment_bytes": self._size,
+            "events_appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "compactions": self.compactions,
+            "indexed_jobs": len(self.index),
+            "rebuild_seconds": round(self.rebuild_seconds, 3),
+        }
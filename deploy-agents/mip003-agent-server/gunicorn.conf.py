@@ -0,0 +1,63 @@
+"""
+Gunicorn Configuration - Multi-Worker Production Mode
+=====================================================
+Pre-forks one Uvicorn worker per available CPU so a single container uses all
+of its cores:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Each worker binds at once and warms the agent in the background (/ready
+reports 503 until it is warm). With PRELOAD_AGENT=true the app and the agent
+are instead loaded once in the master before forking and shared
+copy-on-write, at the cost of a slower start. Workers only share
+jobs through a shared store, so more than one worker requires
+JOB_BACKEND=redis; with the memory backend the worker count is forced to 1.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def available_cpus() -> int:
+    """CPUs this container may use, honouring cgroup quotas and CPU affinity."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return max(cpus, 1)
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", 0)) or available_cpus()
+
+if workers > 1 and os.getenv("JOB_BACKEND", "memory") != "redis":
+    print(
+        f"Warning: {workers} workers need a shared job store (JOB_BACKEND=redis); "
+        "falling back to 1 worker"
+    )
+    workers = 1
+
+# Opt-in: import the app and build the agent once in the master before forking
+preload_app = os.getenv("PRELOAD_AGENT", "false").lower() == "true"
+
+# Let the lifespan drain finish before the master kills a worker
+graceful_timeout = int(float(os.getenv("SHUTDOWN_GRACE_SECONDS", 120))) + 15
+timeout = 60
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
@@ -0,0 +1,138 @@
+"""
+Hedged Requests
+===============
+Cuts tail latency: when a model call is still running after the
+HEDGE_PERCENTILE of that model's recent latencies, a duplicate call is
+started on an alternate model (the next untried one in the routing chain)
+and the first successful answer wins. The loser's task is cancelled. A model
+that already failed as a hedge is not called again further down the chain.
+
+Hedges cost extra LLM spend, so they are rationed by a budget: every primary
+call earns HEDGE_BUDGET_RATIO hedge credits (capped at HEDGE_BUDGET_BURST),
+and each hedge spends one. With the default ratio of 0.1, at most ~10% of
+calls are duplicated.
+
+Note: Swarms' agent.run is synchronous and runs in a worker thread, which
+cannot be interrupted. Cancelling the loser frees the job immediately, but the
+losing thread finishes its LLM call in the background.
+"""
+
+import os
+import math
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 95))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 2))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", 200))
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", 0.1))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", 5))
+
+
+def percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class HedgeBudget:
+    """Hedge credits earned per primary call and spent per hedge."""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.credits = burst
+
+    def earn(self) -> None:
+        self.credits = min(self.burst, self.credits + self.ratio)
+
+    def spend(self) -> bool:
+        if self.credits >= 1:
+            self.credits -= 1
+            return True
+        return False
+
+
+class Hedger:
+    """Runs a call, hedging it on an alternate once it is slower than usual."""
+
+    def __init__(self, enabled: bool = HEDGE_ENABLED):
+        self.enabled = enabled
+        self.budget = HedgeBudget()
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.budget_denied = 0
+
+    def observe(self, model: str, latency: float) -> None:
+        """Record the latency of a successful call on `model`."""
+        self.latencies.setdefault(model, deque(maxlen=HEDGE_WINDOW)).append(latency)
+
+    def delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a call on `model` (None: not enough data)."""
+        samples = self.latencies.get(model)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, percentile(samples, HEDGE_PERCENTILE))
+
+    async def run(
+        self,
+        model: str,
+        primary: Callable[[], Awaitable[Any]],
+        alternate_model: Optional[str] = None,
+        alternate: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Tuple[Any, str]:
+        """Return (result, model that produced it)."""
+        self.calls += 1
+        if self.enabled:
+            self.budget.earn()
+        delay = self.delay(model) if self.enabled and alternate is not None else None
+        if delay is None:
+            return await primary(), model
+
+        first = asyncio.create_task(primary())
+        tasks = {first: model}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self.budget.spend():
+                self.hedged += 1
+                print(f"🔀 {model} slower than {delay:.1f}s, hedging on {alternate_model}")
+                tasks[asyncio.create_task(alternate())] = alternate_model
+            elif not done:
+                self.budget_denied += 1
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            if task is first:
+                                self.primary_wins += 1
+                            else:
+                                self.hedge_wins += 1
+                        return task.result(), tasks[task]
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "budget_denied": self.budget_denied,
+            "budget_credits": round(self.budget.credits, 2),
+            "hedge_delay_seconds": {
+                model: round(d, 2) for model in self.latencies if (d := self.delay(model)) is not None
+            },
+        }
@@ -0,0 +1,173 @@
+"""
+Shared Outbound HTTP Client
+===========================
+One pooled httpx.AsyncClient per process for every outbound call (tool
+integrations, webhooks), instead of a connection setup per request.
+
+- keep-alive connections reused across requests, HTTP/2 when `h2` is
+  installed (`pip install httpx[http2]`)
+- a global connection cap plus a per-host cap (HTTP_MAX_CONNECTIONS_PER_HOST),
+  so one slow upstream cannot take every connection
+- connect/read/write/pool timeouts
+- counters of requests vs. newly opened connections (reuse ratio)
+
+The client is created on first use and closed by the application lifespan.
+Routes receive it with `Depends(get_http_client)`; synchronous tool code
+running in an agent thread calls `http_pool.request_sync(...)`, which runs
+the request on the event loop's shared pool.
+"""
+
+import os
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "true").lower() == "true" and HTTP2_AVAILABLE
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body stream that frees the per-host slot once closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """Adds per-host concurrency limits and connection metrics to a transport."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host: int):
+        self._transport = transport
+        self._per_host = per_host
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.connections_opened = 0
+        self.errors = 0
+        self.by_host: Dict[str, int] = defaultdict(int)
+
+    async def _trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.netloc.decode("ascii")
+        slot = self._slots.setdefault(host, asyncio.Semaphore(self._per_host))
+        await slot.acquire()
+        self.requests += 1
+        self.by_host[host] += 1
+        request.extensions = {**request.extensions, "trace": self._trace}
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.errors += 1
+            slot.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, slot.release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class HttpClientPool:
+    """Lazily created, process-wide pooled AsyncClient."""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transport: Optional[PooledTransport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            )
+            self._transport = PooledTransport(
+                httpx.AsyncHTTPTransport(limits=limits, http2=HTTP_HTTP2, retries=1),
+                per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+            )
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=httpx.Timeout(
+                    HTTP_READ_TIMEOUT,
+                    connect=HTTP_CONNECT_TIMEOUT,
+                    pool=HTTP_CONNECT_TIMEOUT,
+                ),
+                headers={"User-Agent": "mip003-agent-server"},
+            )
+            self._loop = asyncio.get_running_loop()
+        return self._client
+
+    async def start(self) -> None:
+        """Create the client on the running loop (needed before request_sync)."""
+        self.client
+
+    def request_sync(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Make a request on the shared pool from a worker thread (e.g. a tool
+        called inside agent.run). The body is read before returning.
+        """
+        if self._loop is None:
+            raise RuntimeError("HTTP client pool is not started")
+
+        async def call():
+            response = await self.client.request(method, url, **kwargs)
+            await response.aread()
+            return response
+
+        return asyncio.run_coroutine_threadsafe(call(), self._loop).result()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        transport = self._transport
+        if transport is None:
+            return {"requests": 0, "connections_opened": 0, "errors": 0, "reuse_ratio": 0.0, "http2": HTTP_HTTP2}
+        reused = max(transport.requests - transport.connections_opened, 0)
+        return {
+            "requests": transport.requests,
+            "connections_opened": transport.connections_opened,
+            "errors": transport.errors,
+            "reuse_ratio": round(reused / transport.requests, 3) if transport.requests else 0.0,
+            "http2": HTTP_HTTP2,
+        }
+
+
+http_pool = HttpClientPool()
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    """FastAPI dependency: the shared outbound HTTP client."""
+    return http_pool.client
@@ -0,0 +1,840 @@
+"""
+Job Backends
+============
+Storage + queueing for jobs, behind one async interface so the API and the
+workers do not care where jobs live.
+
+- MemoryJobBackend: single process, JobRecords in a dict (default, zero setup).
+                    With JOB_LOG_DIR set, every change is appended to a
+                    segmented event log and replayed on startup (event_log.py).
+- RedisJobBackend:  shared by any number of API replicas and worker processes
+                    (enable AOF persistence on the server for durability)
+
+Select with JOB_BACKEND=memory|redis and REDIS_URL. The Redis backend accepts
+an injected client, so it can run against fakeredis in development.
+
+Redis layout (all keys under REDIS_PREFIX, default "mip003:"):
+- job:{job_id}       hash, one JSON-encoded value per job field
+- jobs               zset of job ids scored by creation time
+- arrivals           counter of jobs ever created (arrival rate for scaling)
+- queue:{tenant}     list of queued job ids for a tenant
+- active             list of tenants with queued jobs (DRR turn order)
+- deficit / running  hashes of DRR credit / running jobs per tenant
+- processing         zset of claimed job ids scored by visibility deadline
+- owner              hash of claimed job id -> tenant
+- idem:{tenant}:{h}  job id for an idempotency key (sha256 prefix), expires
+- usage:{tenant}     hash of usage counters, tenants listed in `usage`
+- samples            zset of finished-job analytics samples (JSON) by finish time,
+                     `samples:recorded` counts every sample ever added
+- lock:{name}        short-lived lock held by one process (e.g. the archiver)
+- worker:{id}        heartbeat of a live worker (expires), ids listed in `workers`
+- events             pub/sub channel of job status changes
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from tenancy import TenantRegistry
+from job_queue import FairShareQueue
+from job_record import JobRecord, to_timestamp
+from event_log import JOB_LOG_DIR, EventLog
+
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "mip003:")
+
+# Seconds a dequeued job stays invisible before another worker may reclaim it
+# (workers extend it with every heartbeat while the job is still running)
+VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", 60))
+DEQUEUE_POLL_INTERVAL = float(os.getenv("JOB_DEQUEUE_POLL_INTERVAL", 0.25))
+
+# Journal of earlier versions, imported into JOB_LOG_DIR once
+JOB_JOURNAL_PATH = os.getenv("JOB_JOURNAL_PATH", "")
+
+# Seconds an idempotency key keeps mapping to the job it created
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", 24 * 3600))
+
+UNFINISHED_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("completed", "failed")
+
+# Fields whose change is broadcast to subscribers
+_EVENT_FIELDS = ("status", "progress", "error")
+
+
+class MemoryJobBackend:
+    """In-process backend: a dict of jobs plus the fair-share asyncio queue."""
+
+    shared = False
+
+    def __init__(self, registry: TenantRegistry, log_dir: str = JOB_LOG_DIR):
+        self.jobs: Dict[str, JobRecord] = {}
+        self.usage: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.queue = FairShareQueue(registry)
+        self.workers: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._claimed: Set[str] = set()
+        # (tenant, key) -> (expiry, job_id), in expiry order (the TTL is fixed)
+        self._idempotency: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._subscribers: List[asyncio.Queue] = []
+        self.arrivals = 0
+        self._samples: Deque[Dict[str, Any]] = deque()
+        self._samples_recorded = 0
+        self._log_dir = log_dir
+        self._events: Optional[EventLog] = None
+        self._compaction: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """
+        Open the event log in the process that serves jobs. Not done at
+        construction: under gunicorn's preload the app is imported in the
+        master, and the fsync thread would not survive the fork.
+        """
+        if self._log_dir and self._events is None:
+            self._open_log(self._log_dir)
+
+    async def close(self):
+        if self._compaction is not None:
+            await self._compaction
+        if self._events is not None:
+            self._events.close()
+
+    # -- event log -----------------------------------------------------------
+
+    def _apply(self, job_id: str, fields: Optional[Dict[str, Any]]) -> None:
+        job = self.jobs.get(job_id)
+        if fields is None:
+            self.jobs.pop(job_id, None)  # Deleted (archived)
+        elif job is None:
+            self.jobs[job_id] = JobRecord.from_fields(fields)
+        else:
+            job.update(fields)
+
+    def _open_log(self, directory: str) -> None:
+        """Rebuild the jobs and the idempotency index from the event log."""
+        self._events = EventLog(directory)
+        events = self._events.open(self._apply)
+        if JOB_JOURNAL_PATH and os.path.exists(JOB_JOURNAL_PATH):
+            self._import_journal(JOB_JOURNAL_PATH)
+
+        cutoff = time.time() - IDEMPOTENCY_TTL
+        keyed = [j for j in self.jobs.values() if j.idempotency_key and (j.created_at or 0) > cutoff]
+        for job in sorted(keyed, key=lambda j: j.created_at):
+            self._idempotency[(job.tenant, job.idempotency_key)] = (job.created_at + IDEMPOTENCY_TTL, job.job_id)
+        print(f"📒 Job log {directory}: {len(self.jobs)} jobs from {events} events "
+              f"in {self._events.rebuild_seconds * 1000:.0f} ms")
+
+    def _import_journal(self, path: str) -> None:
+        """Carry the JSONL journal of earlier versions over into the event log, once."""
+        imported = set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn final write from a crash: ignore the tail
+                self._apply(entry["job_id"], entry["fields"])
+                imported.add(entry["job_id"])
+        for job_id in imported:
+            self._events.append(job_id, self.jobs[job_id].to_fields())
+        self._events.sync()
+        os.replace(path, path + ".migrated")
+        print(f"📒 Imported {len(imported)} jobs from {path} (renamed to {path}.migrated)")
+
+    def _log(self, job_id: str, fields: Dict[str, Any]) -> None:
+        if self._events is None:
+            return
+        self._events.append(job_id, fields)
+        if self._events.needs_compaction and self._compaction is None:
+            self._compaction = asyncio.get_running_loop().create_task(self._compact())
+
+    async def _compact(self) -> None:
+        """Snapshot every job and drop the segments the snapshot covers."""
+        try:
+            # Sealing and copying happen in one step on the loop, so the
+            # snapshot holds exactly the events of the sealed segments
+            sealed = self._events.roll()
+            states = {job_id: job.to_fields() for job_id, job in self.jobs.items()}
+            offsets = await asyncio.to_thread(self._events.write_snapshot, sealed, states)
+            self._events.finish_compaction(sealed, offsets)
+            for job_id in states.keys() - self.jobs.keys():
+                self._events.index.pop(job_id, None)  # Deleted while the snapshot was written
+        except Exception as e:
+            print(f"⚠️  Job log compaction failed: {e}")
+        finally:
+            self._compaction = None
+
+    def job_history(self, job_id: str) -> Optional[List[Dict[str, Any]]]:
+        """A job's recorded events (None without an event log or for unknown jobs)."""
+        return self._events.history(job_id) if self._events is not None else None
+
+    def log_stats(self) -> Optional[Dict[str, Any]]:
+        return self._events.stats() if self._events is not None else None
+
+    # -- job records ---------------------------------------------------------
+
+    async def create_job(self, job: Dict[str, Any]) -> None:
+        self._log(job["job_id"], job)
+        self.jobs[job["job_id"]] = JobRecord.from_fields(job)
+        self.arrivals += 1
+
+    async def get_job(self, job_id: str) -> Optional[JobRecord]:
+        return self.jobs.get(job_id)
+
+    async def update_job(self, job_id: str, guard_run_id: Optional[str] = None, **fields) -> bool:
+        """
+        Apply `fields` to a job. With `guard_run_id`, the update only applies
+        while the job is still owned by that execution attempt.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        if guard_run_id is not None and job.get("run_id") != guard_run_id:
+            return False
+        self._log(job_id, fields)
+        job.update(fields)
+        if any(f in fields for f in _EVENT_FIELDS):
+            self._publish(job_id, job)
+        return True
+
+    async def orphaned_jobs(self, older_than: float = 0) -> List[JobRecord]:
+        """Unfinished jobs that no queue or worker holds (after a restart: all of them)."""
+        held = self.queue.queued_ids() | self._claimed
+        return [
+            job for job in self.jobs.values()
+            if job.status in UNFINISHED_STATUSES and job.job_id not in held
+        ]
+
+    async def list_jobs(self, limit: int, status: Optional[str] = None) -> Tuple[List[JobRecord], int]:
+        jobs = list(self.jobs.values())
+        if status:
+            jobs = [j for j in jobs if j.status == status]
+        jobs.sort(key=lambda x: x.created_at or 0, reverse=True)
+        return jobs[:limit], len(jobs)
+
+    async def stats(self) -> Dict[str, int]:
+        running = sum(1 for j in self.jobs.values() if j.status == "running")
+        return {"total": len(self.jobs), "running": running, "queued": self.queue.qsize(),
+                "arrivals": self.arrivals}
+
+    async def archivable_jobs(self, finished_before: float, limit: int) -> List[JobRecord]:
+        """Up to `limit` completed or failed jobs that finished before `finished_before`."""
+        jobs = []
+        for job in self.jobs.values():
+            if job.status in FINISHED_STATUSES and (job.completed_at or job.created_at or 0) < finished_before:
+                jobs.append(job)
+                if len(jobs) >= limit:
+                    break
+        return jobs
+
+    async def delete_jobs(self, job_ids: List[str]) -> None:
+        for job_id in job_ids:
+            if self.jobs.pop(job_id, None) is not None and self._events is not None:
+                self._events.delete(job_id)
+
+    async def try_lock(self, name: str, ttl: float) -> bool:
+        return True  # Single process: nothing to coordinate with
+
+    # -- idempotency ---------------------------------------------------------
+
+    async def find_idempotent_job(self, tenant: str, key: str) -> Optional[str]:
+        """The job id a tenant's idempotency key created, if it has not expired."""
+        now = time.time()
+        while self._idempotency:
+            _, (expiry, _) = next(iter(self._idempotency.items()))
+            if expiry > now:
+                break
+            self._idempotency.popitem(last=False)
+        entry = self._idempotency.get((tenant, key))
+        return entry[1] if entry else None
+
+    async def claim_idempotency_key(self, tenant: str, key: str, job_id: str) -> Optional[str]:
+        """Map a key to `job_id`; if it already maps to a job, return that job id instead."""
+        existing = await self.find_idempotent_job(tenant, key)
+        if existing is not None:
+            return existing
+        self._idempotency[(tenant, key)] = (time.time() + IDEMPOTENCY_TTL, job_id)
+        return None
+
+    async def release_idempotency_key(self, tenant: str, key: str, job_id: str) -> None:
+        """Forget a key's claim, if it still maps to `job_id` (its job was never created)."""
+        entry = self._idempotency.get((tenant, key))
+        if entry is not None and entry[1] == job_id:
+            del self._idempotency[(tenant, key)]
+
+    # -- queue ---------------------------------------------------------------
+
+    async def enqueue(self, tenant: str, job_id: str) -> None:
+        await self.queue.put(tenant, job_id)
+
+    async def dequeue(self) -> Tuple[str, str]:
+        tenant, job_id = await self.queue.get()
+        self._claimed.add(job_id)
+        return tenant, job_id
+
+    async def ack(self, tenant: str, job_id: str) -> None:
+        self._claimed.discard(job_id)
+        await self.queue.task_done(tenant)
+
+    async def release(self, tenant: str, job_id: str) -> None:
+        """Give a claimed job back to the head of its tenant's queue."""
+        await self.ack(tenant, job_id)
+        await self.queue.put(tenant, job_id, front=True)
+
+    async def extend(self, job_id: str) -> None:
+        pass  # Jobs never leave the process, nothing can reclaim them
+
+    async def requeue_expired(self) -> List[str]:
+        return []
+
+    async def pending(self, tenant: str) -> int:
+        return self.queue.pending(tenant)
+
+    async def running(self, tenant: str) -> int:
+        return self.queue.running(tenant)
+
+    # -- usage ---------------------------------------------------------------
+
+    async def incr_usage(self, tenant: str, counter: str, amount: float = 1) -> None:
+        self.usage[tenant][counter] += amount
+
+    async def get_usage(self, tenant: str) -> Dict[str, float]:
+        return dict(self.usage.get(tenant, {}))
+
+    async def all_usage(self) -> Dict[str, Dict[str, float]]:
+        return {tenant: dict(counters) for tenant, counters in self.usage.items()}
+
+    # -- analytics samples ---------------------------------------------------
+
+    async def add_sample(self, sample: Dict[str, Any], keep: int) -> None:
+        self._samples.append(sample)
+        self._samples_recorded += 1
+        while len(self._samples) > keep:
+            self._samples.popleft()
+
+    async def samples(self, since: float) -> List[Dict[str, Any]]:
+        """Samples finished at or after `since`, oldest first."""
+        return [s for s in self._samples if s["finished_at"] >= since]
+
+    async def sample_counts(self) -> Tuple[int, int]:
+        """(samples ever recorded, samples kept)."""
+        return self._samples_recorded, len(self._samples)
+
+    # -- workers -------------------------------------------------------------
+
+    async def heartbeat(self, worker_id: str, info: Dict[str, Any], ttl: float) -> None:
+        self.workers[worker_id] = (time.time() + ttl, info)
+
+    async def list_workers(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        self.workers = {w: v for w, v in self.workers.items() if v[0] > now}
+        return [info for _, info in self.workers.values()]
+
+    # -- notifications -------------------------------------------------------
+
+    def _publish(self, job_id: str, job: JobRecord) -> None:
+        event = {"job_id": job_id, **{f: job.get(f) for f in _EVENT_FIELDS}}
+        for subscriber in self._subscribers:
+            subscriber.put_nowait(event)
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every job status change event until the consumer stops."""
+        subscriber: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                yield await subscriber.get()
+        finally:
+            self._subscribers.remove(subscriber)
+
+
+# =============================================================================
+# Redis
+# =============================================================================
+
+# Append a job to its tenant's queue, activating the tenant for DRR if needed.
+# KEYS: queue:{tenant}, active, deficit   ARGV: job_id, tenant
+_ENQUEUE_LUA = """
+local size = redis.call('RPUSH', KEYS[1], ARGV[1])
+if size == 1 then
+  redis.call('RPUSH', KEYS[2], ARGV[2])
+  redis.call('HSET', KEYS[3], ARGV[2], 0)
+end
+return size
+"""
+
+# Deficit-round-robin dequeue across tenant queues, honouring max_concurrent.
+# KEYS: active, deficit, running, processing, owner
+# ARGV: prefix, default max_concurrent, default weight, quantum, overrides json, deadline
+_DEQUEUE_LUA = """
+local overrides = cjson.decode(ARGV[5])
+local function quota(t)
+  local o = overrides[t] or {}
+  local cap = tonumber(o.max_concurrent or ARGV[2])
+  if cap <= 0 then cap = math.huge end  -- 0: unlimited
+  return cap, math.max(tonumber(o.weight or ARGV[3]), 0.01)
+end
+local function running(t)
+  return tonumber(redis.call('HGET', KEYS[3], t) or '0')
+end
+local function rotate()
+  redis.call('RPUSH', KEYS[1], redis.call('LPOP', KEYS[1]))
+end
+
+local eligible = false
+for _, t in ipairs(redis.call('LRANGE', KEYS[1], 0, -1)) do
+  if running(t) < quota(t) then eligible = true break end
+end
+if not eligible then return false end
+
+local quantum = tonumber(ARGV[4])
+for _ = 1, 10000 do
+  local t = redis.call('LINDEX', KEYS[1], 0)
+  local cap, weight = quota(t)
+  if running(t) >= cap then
+    rotate()
+  else
+    local deficit = tonumber(redis.call('HGET', KEYS[2], t) or '0')
+    if deficit < 1 then deficit = deficit + quantum * weight end
+    if deficit < 1 then
+      redis.call('HSET', KEYS[2], t, deficit)
+      rotate()
+    else
+      deficit = deficit - 1
+      local qkey = ARGV[1] .. 'queue:' .. t
+      local job = redis.call('LPOP', qkey)
+      if redis.call('LLEN', qkey) == 0 then
+        redis.call('LPOP', KEYS[1])
+        redis.call('HDEL', KEYS[2], t)
+      else
+        redis.call('HSET', KEYS[2], t, deficit)
+        if deficit < 1 then rotate() end
+      end
+      if job then
+        redis.call('HINCRBY', KEYS[3], t, 1)
+        redis.call('ZADD', KEYS[4], ARGV[6], job)
+        redis.call('HSET', KEYS[5], job, t)
+        return {t, job}
+      end
+    end
+  end
+end
+return false
+"""
+
+# Conditionally update a job hash.
+# KEYS: job:{id}   ARGV: expected run_id (JSON, "" = unconditional), field, value, ...
+_UPDATE_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+if ARGV[1] ~= '' and redis.call('HGET', KEYS[1], 'run_id') ~= ARGV[1] then return 0 end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+return 1
+"""
+
+# Release a claimed job.  KEYS: processing, owner, running   ARGV: job_id
+_ACK_LUA = """
+local t = redis.call('HGET', KEYS[2], ARGV[1])
+if not t then return 0 end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+if redis.call('HINCRBY', KEYS[3], t, -1) <= 0 then redis.call('HDEL', KEYS[3], t) end
+return 1
+"""
+
+# Give a claimed job back to the head of its tenant's queue.
+# KEYS: processing, owner, running, active, deficit   ARGV: prefix, job_id
+_RELEASE_LUA = """
+local t = redis.call('HGET', KEYS[2], ARGV[2])
+if not t then return 0 end
+redis.call('ZREM', KEYS[1], ARGV[2])
+redis.call('HDEL', KEYS[2], ARGV[2])
+if redis.call('HINCRBY', KEYS[3], t, -1) <= 0 then redis.call('HDEL', KEYS[3], t) end
+if redis.call('LPUSH', ARGV[1] .. 'queue:' .. t, ARGV[2]) == 1 then
+  redis.call('RPUSH', KEYS[4], t)
+  redis.call('HSET', KEYS[5], t, 0)
+end
+return 1
+"""
+
+# Delete a key only while it holds the expected value.  KEYS: key   ARGV: value
+_DELETE_IF_EQUAL_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+# Put claimed jobs whose visibility deadline passed back at the head of their
+# queue, marked queued again. Jobs that finished but were never acked only
+# give their slot back: they must not run twice.
+# KEYS: processing, owner, running, active, deficit   ARGV: prefix, now
+_REQUEUE_EXPIRED_LUA = """
+local requeued = {}
+for _, job in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])) do
+  local t = redis.call('HGET', KEYS[2], job)
+  redis.call('ZREM', KEYS[1], job)
+  redis.call('HDEL', KEYS[2], job)
+  if t then
+    if redis.call('HINCRBY', KEYS[3], t, -1) <= 0 then redis.call('HDEL', KEYS[3], t) end
+    local key = ARGV[1] .. 'job:' .. job
+    local status = redis.call('HGET', key, 'status')
+    if status == '"queued"' or status == '"running"' then
+      redis.call('HSET', key, 'status', '"queued"', 'progress', '0.0')
+      if redis.call('LPUSH', ARGV[1] .. 'queue:' .. t, job) == 1 then
+        redis.call('RPUSH', KEYS[4], t)
+        redis.call('HSET', KEYS[5], t, 0)
+      end
+      table.insert(requeued, job)
+    end
+  end
+end
+return requeued
+"""
+
+
+class RedisJobBackend:
+    """Redis backend: shared job space for many API replicas and workers."""
+
+    shared = True
+
+    def __init__(self, registry: TenantRegistry, client=None, url: str = REDIS_URL,
+                 prefix: str = REDIS_PREFIX):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("JOB_BACKEND=redis requires `pip install redis`") from e
+            client = redis.from_url(url, decode_responses=True)
+
+        self.redis = client
+        self.registry = registry
+        self.prefix = prefix
+        self.channel = prefix + "events"
+        self._update = client.register_script(_UPDATE_LUA)
+        self._enqueue = client.register_script(_ENQUEUE_LUA)
+        self._dequeue = client.register_script(_DEQUEUE_LUA)
+        self._ack = client.register_script(_ACK_LUA)
+        self._release = client.register_script(_RELEASE_LUA)
+        self._requeue_expired = client.register_script(_REQUEUE_EXPIRED_LUA)
+        self._delete_if_equal = client.register_script(_DELETE_IF_EQUAL_LUA)
+
+    def _key(self, *parts: str) -> str:
+        return self.prefix + ":".join(parts)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        await self.redis.aclose()
+
+    # -- job records ---------------------------------------------------------
+
+    @staticmethod
+    def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+        return {k: json.dumps(v, default=str) for k, v in fields.items()}
+
+    @staticmethod
+    def _decode(raw: Dict[str, str]) -> Dict[str, Any]:
+        return {k: json.loads(v) for k, v in raw.items()}
+
+    async def create_job(self, job: Dict[str, Any]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key("job", job["job_id"]), mapping=self._encode(job))
+            pipe.zadd(self._key("jobs"), {job["job_id"]: time.time()})
+            pipe.incr(self._key("arrivals"))
+            await pipe.execute()
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.hgetall(self._key("job", job_id))
+        return self._decode(raw) if raw else None
+
+    async def update_job(self, job_id: str, guard_run_id: Optional[str] = None, **fields) -> bool:
+        """
+        Apply `fields` to a job. With `guard_run_id`, the update only applies
+        while the job is still owned by that execution attempt.
+        """
+        guard = json.dumps(guard_run_id) if guard_run_id is not None else ""
+        args = [guard]
+        for name, value in self._encode(fields).items():
+            args += [name, value]
+        if not await self._update(keys=[self._key("job", job_id)], args=args):
+            return False
+        if any(f in fields for f in _EVENT_FIELDS):
+            event = {"job_id": job_id, **{f: fields[f] for f in _EVENT_FIELDS if f in fields}}
+            await self.redis.publish(self.channel, json.dumps(event, default=str))
+        return True
+
+    async def orphaned_jobs(self, older_than: float = 0) -> List[Dict[str, Any]]:
+        """
+        Unfinished jobs created more than `older_than` seconds ago that sit in
+        no tenant queue and are claimed by no worker, e.g. because the process
+        that accepted them died between storing and enqueueing.
+        """
+        orphans, start, page = [], 0, 500
+        cutoff = time.time() - older_than
+        while True:
+            ids = await self.redis.zrangebyscore(self._key("jobs"), "-inf", cutoff, start=start, num=page)
+            if not ids:
+                return orphans
+            for job_id in ids:
+                job = await self.get_job(job_id)
+                if not job or job["status"] not in UNFINISHED_STATUSES:
+                    continue
+                if await self.redis.zscore(self._key("processing"), job_id) is not None:
+                    continue
+                if await self.redis.lpos(self._key("queue", job["tenant"]), job_id) is not None:
+                    continue
+                orphans.append(job)
+            start += page
+
+    async def list_jobs(self, limit: int, status: Optional[str] = None) -> Tuple[List[Dict], int]:
+        if not status:
+            ids = await self.redis.zrevrange(self._key("jobs"), 0, limit - 1)
+            jobs = [job for job in [await self.get_job(i) for i in ids] if job]
+            return jobs, await self.redis.zcard(self._key("jobs"))
+
+        # Filtered listing walks the index in pages; /jobs is a debugging aid
+        matched, total, start, page = [], 0, 0, 200
+        while True:
+            ids = await self.redis.zrevrange(self._key("jobs"), start, start + page - 1)
+            if not ids:
+                return matched, total
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for i in ids:
+                    pipe.hget(self._key("job", i), "status")
+                statuses = await pipe.execute()
+            for job_id, raw in zip(ids, statuses):
+                if raw and json.loads(raw) == status:
+                    total += 1
+                    if len(matched) < limit:
+                        matched.append(await self.get_job(job_id))
+            start += page
+
+    async def stats(self) -> Dict[str, int]:
+        running = await self.redis.hvals(self._key("running"))
+        tenants = await self.redis.lrange(self._key("active"), 0, -1)
+        queued = 0
+        for tenant in tenants:
+            queued += await self.redis.llen(self._key("queue", tenant))
+        return {
+            "total": await self.redis.zcard(self._key("jobs")),
+            "running": sum(int(r) for r in running),
+            "queued": queued,
+            "arrivals": int(await self.redis.get(self._key("arrivals")) or 0),
+        }
+
+    async def archivable_jobs(self, finished_before: float, limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` completed or failed jobs that finished before `finished_before`."""
+        jobs, start, page = [], 0, 500
+        while len(jobs) < limit:
+            # Creation precedes completion, so the creation index bounds the scan
+            ids = await self.redis.zrangebyscore(self._key("jobs"), "-inf", finished_before, start=start, num=page)
+            if not ids:
+                break
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for job_id in ids:
+                    pipe.hgetall(self._key("job", job_id))
+                raws = await pipe.execute()
+            for raw in raws:
+                if not raw:
+                    continue
+                job = self._decode(raw)
+                finished = to_timestamp(job.get("completed_at") or job.get("created_at")) or 0
+                if job.get("status") in FINISHED_STATUSES and finished < finished_before:
+                    jobs.append(job)
+                    if len(jobs) >= limit:
+                        break
+            start += page
+        return jobs
+
+    async def delete_jobs(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*[self._key("job", job_id) for job_id in job_ids])
+            pipe.zrem(self._key("jobs"), *job_ids)
+            await pipe.execute()
+
+    async def try_lock(self, name: str, ttl: float) -> bool:
+        """Hold `name` for `ttl` seconds unless another process already does."""
+        return bool(await self.redis.set(self._key("lock", name), 1, nx=True, px=int(ttl * 1000)))
+
+    def job_history(self, job_id: str) -> Optional[List[Dict[str, Any]]]:
+        return None  # Redis keeps only the current state of a job
+
+    def log_stats(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    # -- idempotency ---------------------------------------------------------
+
+    def _idempotency_key(self, tenant: str, key: str) -> str:
+        return self._key("idem", tenant, hashlib.sha256(key.encode()).hexdigest()[:32])
+
+    async def find_idempotent_job(self, tenant: str, key: str) -> Optional[str]:
+        """The job id a tenant's idempotency key created, if it has not expired."""
+        return await self.redis.get(self._idempotency_key(tenant, key))
+
+    async def claim_idempotency_key(self, tenant: str, key: str, job_id: str) -> Optional[str]:
+        """Map a key to `job_id`; if it already maps to a job, return that job id instead."""
+        name = self._idempotency_key(tenant, key)
+        while True:
+            if await self.redis.set(name, job_id, nx=True, ex=int(IDEMPOTENCY_TTL)):
+                return None
+            existing = await self.redis.get(name)
+            if existing is not None:
+                return existing
+            # Expired between SET and GET: try to claim it again
+
+    async def release_idempotency_key(self, tenant: str, key: str, job_id: str) -> None:
+        """Forget a key's claim, if it still maps to `job_id` (its job was never created)."""
+        await self._delete_if_equal(keys=[self._idempotency_key(tenant, key)], args=[job_id])
+
+    # -- queue ---------------------------------------------------------------
+
+    async def enqueue(self, tenant: str, job_id: str) -> None:
+        await self._enqueue(
+            keys=[self._key("queue", tenant), self._key("active"), self._key("deficit")],
+            args=[job_id, tenant],
+        )
+
+    async def try_dequeue(self) -> Optional[Tuple[str, str]]:
+        default = self.registry.default_quota
+        overrides = {
+            t: {"max_concurrent": q.max_concurrent, "weight": q.weight}
+            for t, q in self.registry.overrides.items()
+        }
+        item = await self._dequeue(
+            keys=[self._key("active"), self._key("deficit"), self._key("running"),
+                  self._key("processing"), self._key("owner")],
+            args=[self.prefix, default.max_concurrent, default.weight, 1.0,
+                  json.dumps(overrides), time.time() + VISIBILITY_TIMEOUT],
+        )
+        return (item[0], item[1]) if item else None
+
+    async def dequeue(self) -> Tuple[str, str]:
+        while True:
+            item = await self.try_dequeue()
+            if item is not None:
+                return item
+            await asyncio.sleep(DEQUEUE_POLL_INTERVAL)
+
+    async def ack(self, tenant: str, job_id: str) -> None:
+        await self._ack(
+            keys=[self._key("processing"), self._key("owner"), self._key("running")],
+            args=[job_id],
+        )
+
+    async def release(self, tenant: str, job_id: str) -> None:
+        """Give a claimed job back to the head of its tenant's queue."""
+        await self._release(
+            keys=[self._key("processing"), self._key("owner"), self._key("running"),
+                  self._key("active"), self._key("deficit")],
+            args=[self.prefix, job_id],
+        )
+
+    async def extend(self, job_id: str) -> None:
+        """Push a claimed job's visibility deadline forward (worker heartbeat)."""
+        await self.redis.zadd(
+            self._key("processing"), {job_id: time.time() + VISIBILITY_TIMEOUT}, xx=True
+        )
+
+    async def requeue_expired(self) -> List[str]:
+        """
+        Requeue (and mark queued) the unfinished jobs whose claim lapsed, in
+        one atomic step; returns their ids. Finished jobs are left alone.
+        """
+        requeued = await self._requeue_expired(
+            keys=[self._key("processing"), self._key("owner"), self._key("running"),
+                  self._key("active"), self._key("deficit")],
+            args=[self.prefix, time.time()],
+        )
+        for job_id in requeued:
+            event = {"job_id": job_id, "status": "queued", "progress": 0.0}
+            await self.redis.publish(self.channel, json.dumps(event))
+        return requeued
+
+    async def pending(self, tenant: str) -> int:
+        return await self.redis.llen(self._key("queue", tenant))
+
+    async def running(self, tenant: str) -> int:
+        return int(await self.redis.hget(self._key("running"), tenant) or 0)
+
+    # -- usage ---------------------------------------------------------------
+
+    async def incr_usage(self, tenant: str, counter: str, amount: float = 1) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.sadd(self._key("usage"), tenant)
+            pipe.hincrbyfloat(self._key("usage", tenant), counter, amount)
+            await pipe.execute()
+
+    async def get_usage(self, tenant: str) -> Dict[str, float]:
+        raw = await self.redis.hgetall(self._key("usage", tenant))
+        return {k: float(v) for k, v in raw.items()}
+
+    async def all_usage(self) -> Dict[str, Dict[str, float]]:
+        return {t: await self.get_usage(t) for t in await self.redis.smembers(self._key("usage"))}
+
+    # -- analytics samples ---------------------------------------------------
+
+    async def add_sample(self, sample: Dict[str, Any], keep: int) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self._key("samples"), {json.dumps(sample): sample["finished_at"]})
+            pipe.zremrangebyrank(self._key("samples"), 0, -keep - 1)
+            pipe.incr(self._key("samples:recorded"))
+            await pipe.execute()
+
+    async def samples(self, since: float) -> List[Dict[str, Any]]:
+        """Samples finished at or after `since`, oldest first."""
+        raw = await self.redis.zrangebyscore(self._key("samples"), since, "+inf")
+        return [json.loads(r) for r in raw]
+
+    async def sample_counts(self) -> Tuple[int, int]:
+        """(samples ever recorded, samples kept)."""
+        recorded = await self.redis.get(self._key("samples:recorded"))
+        return int(recorded or 0), await self.redis.zcard(self._key("samples"))
+
+    # -- workers -------------------------------------------------------------
+
+    async def heartbeat(self, worker_id: str, info: Dict[str, Any], ttl: float) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._key("worker", worker_id), json.dumps(info), ex=max(int(ttl), 1))
+            pipe.sadd(self._key("workers"), worker_id)
+            await pipe.execute()
+
+    async def list_workers(self) -> List[Dict[str, Any]]:
+        workers = []
+        for worker_id in await self.redis.smembers(self._key("workers")):
+            raw = await self.redis.get(self._key("worker", worker_id))
+            if raw is None:
+                await self.redis.srem(self._key("workers"), worker_id)
+            else:
+                workers.append(json.loads(raw))
+        return workers
+
+    # -- notifications -------------------------------------------------------
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every job status change event published by any instance."""
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.aclose()
+
+
+def create_job_backend(registry: TenantRegistry):
+    """Build the backend selected by JOB_BACKEND."""
+    if JOB_BACKEND == "redis":
+        return RedisJobBackend(registry)
+    if JOB_BACKEND != "memory":
+        raise ValueError(f"Unknown JOB_BACKEND: {JOB_BACKEND}")
+    log_dir = JOB_LOG_DIR
+    if not log_dir and JOB_JOURNAL_PATH:
+        # Keep durability for deployments configured before the event log
+        log_dir = os.path.join(os.path.dirname(os.path.abspath(JOB_JOURNAL_PATH)), "job-log")
+    return MemoryJobBackend(registry, log_dir)
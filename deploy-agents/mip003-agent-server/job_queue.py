@@ -0,0 +1,115 @@
+"""
+Fair-Share Job Queue
+====================
+An asyncio job queue that schedules across tenants with Deficit Round Robin
+(DRR). Each tenant has its own FIFO; on every turn a tenant earns `quantum *
+weight` credits and may dispatch one job per credit. Tenants already running
+`max_concurrent` jobs are skipped until one of their jobs finishes, so a single
+noisy tenant cannot occupy every worker.
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Set, Tuple
+
+from tenancy import TenantRegistry
+
+
+class FairShareQueue:
+    """Deficit-round-robin queue of job ids, partitioned by tenant."""
+
+    def __init__(self, registry: TenantRegistry, quantum: float = 1.0):
+        self.registry = registry
+        self.quantum = quantum
+        self._queues: Dict[str, Deque[str]] = {}
+        self._active: Deque[str] = deque()  # Tenants with pending jobs, in turn order
+        self._deficit: Dict[str, float] = {}
+        self._running: Dict[str, int] = {}
+        self._cond = asyncio.Condition()
+
+    # -- introspection -------------------------------------------------------
+
+    def qsize(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def pending(self, tenant: str) -> int:
+        return len(self._queues.get(tenant, ()))
+
+    def running(self, tenant: str) -> int:
+        return self._running.get(tenant, 0)
+
+    def queued_ids(self) -> Set[str]:
+        return {job_id for q in self._queues.values() for job_id in q}
+
+    # -- producer / consumer -------------------------------------------------
+
+    async def put(self, tenant: str, job_id: str, front: bool = False) -> None:
+        """Queue a job; `front` puts it ahead of the tenant's other jobs."""
+        async with self._cond:
+            queue = self._queues.get(tenant)
+            if queue is None:
+                queue = self._queues[tenant] = deque()
+            if not queue:
+                self._active.append(tenant)
+                self._deficit[tenant] = 0.0
+            if front:
+                queue.appendleft(job_id)
+            else:
+                queue.append(job_id)
+            self._cond.notify()
+
+    async def get(self) -> Tuple[str, str]:
+        """Wait for the next job the scheduler allows to run."""
+        async with self._cond:
+            while True:
+                item = self._pop_next()
+                if item is not None:
+                    tenant = item[0]
+                    self._running[tenant] = self._running.get(tenant, 0) + 1
+                    return item
+                await self._cond.wait()
+
+    async def task_done(self, tenant: str) -> None:
+        """Release a tenant's concurrency slot once its job has finished."""
+        async with self._cond:
+            running = self._running.get(tenant, 0) - 1
+            if running > 0:
+                self._running[tenant] = running
+            else:
+                self._running.pop(tenant, None)
+            self._cond.notify_all()
+
+    # -- DRR -----------------------------------------------------------------
+
+    def _eligible(self, tenant: str) -> bool:
+        cap = self.registry.quota(tenant).max_concurrent
+        return cap <= 0 or self._running.get(tenant, 0) < cap
+
+    def _pop_next(self):
+        if not any(self._eligible(t) for t in self._active):
+            return None
+
+        while True:
+            tenant = self._active[0]
+            if not self._eligible(tenant):
+                self._active.rotate(-1)
+                continue
+
+            if self._deficit[tenant] < 1:
+                weight = max(self.registry.quota(tenant).weight, 0.01)
+                self._deficit[tenant] += self.quantum * weight
+                if self._deficit[tenant] < 1:
+                    self._active.rotate(-1)
+                    continue
+
+            self._deficit[tenant] -= 1
+            queue = self._queues[tenant]
+            job_id = queue.popleft()
+            if not queue:
+                # Idle tenants do not bank credit (standard DRR)
+                self._active.popleft()
+                del self._queues[tenant]
+                del self._deficit[tenant]
+            elif self._deficit[tenant] < 1:
+                self._active.rotate(-1)
+            return tenant, job_id
@@ -0,0 +1,187 @@
+"""
+Compact Job Records
+===================
+The memory backend keeps every job it has accepted, so the per-job footprint
+decides how many jobs fit in RAM. A JobRecord replaces the dict-per-job
+layout:
+
+- fixed fields live in __slots__ (no per-instance dict)
+- timestamps are epoch-second floats; ISO strings are only produced at the
+  response edge (iso() / public_job())
+- status values are interned, so every record shares one string per status
+- with JOB_PACK_PAYLOADS=true, `input_data` and `result` are held out of the
+  record's object graph as one compressed JSON bytes object each and decoded
+  on access (they are read once per execution and per /status poll)
+
+Records support the read side of the dict interface (job["status"],
+job.get("attempts", 0)), so code handling jobs from the Redis backend, which
+returns plain dicts, handles JobRecords unchanged.
+
+Run `python benchmarks/bench_job_records.py` to compare the layouts.
+"""
+
+import os
+import sys
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+JOB_PACK_PAYLOADS = os.getenv("JOB_PACK_PAYLOADS", "false").lower() == "true"
+
+# One shared string object per known status
+_STATUSES = {s: sys.intern(s) for s in ("queued", "running", "completed", "failed", "waiting_for_input")}
+
+_TIMESTAMPS = ("created_at", "enqueued_at", "started_at", "first_token_at", "completed_at")
+
+
+def to_timestamp(value: Any) -> Optional[float]:
+    """Epoch seconds from a number or an ISO string (older records store those)."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)  # Written with utcnow()
+    return parsed.timestamp()
+
+
+def iso(value: Any) -> Optional[str]:
+    """ISO-8601 UTC string for an epoch timestamp (ISO strings pass through)."""
+    if value is None or isinstance(value, str):
+        return value
+    return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _pack(value: Any) -> Any:
+    if value is None or not JOB_PACK_PAYLOADS:
+        return value
+    return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode(), 1)
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return json.loads(zlib.decompress(value))
+    return value
+
+
+class JobRecord:
+    """One job, stored compactly. Unknown fields go to `extra`."""
+
+    __slots__ = (
+        "job_id", "tenant", "template", "_status", "progress", "created_at", "enqueued_at",
+        "started_at", "first_token_at", "completed_at", "run_id", "attempts",
+        "payment_id", "error", "result_ref", "result_size", "result_sha256",
+        "idempotency_key", "callback_url", "model", "prompt_tokens",
+        "completion_tokens", "cost_usd", "_input_data", "_result", "extra",
+    )
+
+    _FIELDS = tuple(s.lstrip("_") for s in __slots__ if s != "extra")
+    _FIELD_SET = frozenset(_FIELDS)
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.tenant = None
+        self.template = None
+        self._status = _STATUSES["queued"]
+        self.progress = 0.0
+        self.created_at = None
+        self.enqueued_at = None
+        self.started_at = None
+        self.first_token_at = None
+        self.completed_at = None
+        self.run_id = ""
+        self.attempts = 0
+        self.payment_id = None
+        self.error = None
+        self.result_ref = None
+        self.result_size = None
+        self.result_sha256 = None
+        self.idempotency_key = None
+        self.callback_url = None
+        self.model = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.cost_usd = None
+        self._input_data = None
+        self._result = None
+        self.extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any]) -> "JobRecord":
+        record = cls(fields["job_id"])
+        record.update(fields)
+        return record
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: Any) -> None:
+        value = getattr(value, "value", value)  # JobStatus enum member
+        self._status = _STATUSES.get(value) or sys.intern(value)
+
+    @property
+    def input_data(self) -> Any:
+        return _unpack(self._input_data)
+
+    @input_data.setter
+    def input_data(self, value: Any) -> None:
+        self._input_data = _pack(value)
+
+    @property
+    def result(self) -> Any:
+        return _unpack(self._result)
+
+    @result.setter
+    def result(self, value: Any) -> None:
+        self._result = _pack(value)
+
+    def update(self, fields: Dict[str, Any]) -> None:
+        for name, value in fields.items():
+            if name in _TIMESTAMPS:
+                value = to_timestamp(value)
+            if name in self._FIELD_SET:
+                setattr(self, name, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[name] = value
+
+    # -- read-only mapping interface ----------------------------------------
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self._FIELD_SET:
+            return getattr(self, name)
+        if self.extra and name in self.extra:
+            return self.extra[name]
+        raise KeyError(name)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Like dict.get, with unset (None) fields treated as missing."""
+        try:
+            value = self[name]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._FIELD_SET or bool(self.extra and name in self.extra)
+
+    def keys(self) -> Iterator[str]:
+        yield from self._FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def to_fields(self) -> Dict[str, Any]:
+        """All fields as a plain dict with numeric timestamps (event log format)."""
+        return {name: self[name] for name in self.keys()}
+
+
+def public_job(job: Any) -> Dict[str, Any]:
+    """A job (JobRecord or dict) as a JSON-ready dict with ISO timestamps."""
+    fields = job.to_fields() if isinstance(job, JobRecord) else dict(job)
+    for name in _TIMESTAMPS:
+        if name in fields:
+            fields[name] = iso(fields[name])
+    return fields
@@ -15,23 +15,70 @@ Endpoints:
 Based on: https://github.com/masumi-network/masumi-improvement-proposals/blob/main/mips/mip-003.md
 """
 
+import time
+
+# Start of the app import, reported with the warm-up timings
+_IMPORT_STARTED = time.perf_counter()
+
 import os
 import uuid
-import time
+import socket
 import asyncio
+import json
+from dataclasses import asdict
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Tuple
 from enum import Enum
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Local modules read their configuration from the environment, so import after load_dotenv
+from tenancy import TenantRegistry, RateLimiter
+from job_backend import create_job_backend
+from job_record import iso, public_job
+from scaling import ScalingMonitor, AgentPool
+from prompts import compile_template
+from router import MODEL_ATTEMPT_TIMEOUT, ModelRouter
+from hedging import Hedger
+from concurrency import ConcurrencyLimits
+from analytics import ANALYTICS_WINDOW, GROUP_BY, Analytics, call_cost
+from tokens import count_tokens, fit_to_budget, token_budget, warm_up_tokenizer
+from chunking import (
+    CHUNK_CONCURRENCY, chunked_field, map_instructions, reduce_batches, reduce_prompt, split_text,
+)
+from agent_templates import TEMPLATES
+from result_store import RESULT_INLINE_MAX, blob_ref, create_result_store, result_metadata
+from http_client import http_pool
+from webhooks import WebhookDispatcher, validate_callback_url
+from compression import CompressionMiddleware
+from traffic import TrafficCaptureMiddleware, create_traffic_log
+from profiling import TRACEMALLOC_FRAMES, CpuProfiler, LoopLagMonitor, MemoryProfiler
+from archive import ARCHIVE_GROUP_BY, aggregate_archive, create_archiver, query_archive
+
+try:
+    # orjson serialises responses several times faster than the stdlib encoder
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
 # =============================================================================
 # AGENT CONFIGURATION - Customize this section for your agent
 # =============================================================================
@@ -46,6 +93,47 @@ MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 
+# Answer jobs with mock responses instead of calling an LLM (load tests,
+# traffic replay); also used automatically when Swarms is not installed
+MOCK_LLM = os.getenv("MOCK_LLM", "false").lower() == "true"
+MOCK_LLM_LATENCY = float(os.getenv("MOCK_LLM_LATENCY", 2))
+
+# Agent template from agent_templates.TEMPLATES, or "general" for the
+# task/context schema and system prompt defined in this file
+AGENT_TEMPLATE = os.getenv("AGENT_TEMPLATE", "general")
+if AGENT_TEMPLATE != "general" and AGENT_TEMPLATE not in TEMPLATES:
+    raise ValueError(
+        f"Unknown AGENT_TEMPLATE {AGENT_TEMPLATE!r}; "
+        f"valid templates: {', '.join(['general', *TEMPLATES])}"
+    )
+
+GENERAL_SYSTEM_PROMPT = """You are a professional AI assistant.
+You provide helpful, accurate, and well-structured responses.
+Always be thorough and professional in your work."""
+
+# Number of jobs executed concurrently by this process (shared by all tenants)
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", 4))
+
+# Run job workers inside the API process. Set to false when a separate
+# `python -m worker` tier consumes the shared (redis) queue instead.
+EMBEDDED_WORKERS = os.getenv("EMBEDDED_WORKERS", "true").lower() == "true"
+
+WORKER_ID = os.getenv("WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", 10))
+
+# Executions a job may start (incl. retries after crashes) before it is failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+
+# On shutdown, seconds running jobs get to finish before they are handed back
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", 120))
+DRAIN_RETRY_AFTER = int(os.getenv("DRAIN_RETRY_AFTER", 30))
+
+# Token for admin-only endpoints (sent as X-Admin-Token); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Externally reachable base URL, used for absolute links such as webhook result_url
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", f"http://localhost:{os.getenv('PORT', 8000)}").rstrip("/")
+
 # =============================================================================
 # MIP-003 Data Models
 # =============================================================================
@@ -88,6 +176,8 @@ class InputSchemaResponse(BaseModel):
 class StartJobRequest(BaseModel):
     input_data: Dict[str, Any]
     payment_id: Optional[str] = None
+    # POSTed the job's final status and result when it completes or fails
+    callback_url: Optional[str] = None
 
 
 class StartJobResponse(BaseModel):
@@ -103,7 +193,16 @@ class JobStatusResponse(BaseModel):
     error: Optional[str] = None
     progress: Optional[float] = None
     created_at: str
+    started_at: Optional[str] = None
     completed_at: Optional[str] = None
+    # Size of the stored result; large results are omitted from `result`
+    # and served by `result_url` (GET /result) instead
+    result_size: Optional[int] = None
+    result_url: Optional[str] = None
+    # Tokens sent to and generated by the model(s) for this job
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
 
 
 class ProvideInputRequest(BaseModel):
@@ -112,39 +211,386 @@ class ProvideInputRequest(BaseModel):
 
 
 # =============================================================================
-# In-Memory Job Store (Use Redis/PostgreSQL for production)
+# Job Store & Queue (JOB_BACKEND=memory by default, redis for scale-out)
+# =============================================================================
+
+tenants = TenantRegistry.from_env()
+rate_limiter = RateLimiter(tenants)
+
+# Jobs, the fair-share queue and per-tenant usage counters
+# (submitted / rejected / completed / failed / run_seconds) all live here
+job_backend = create_job_backend(tenants)
+
+# Job results as chunked blobs next to the jobs (disk, or Redis when shared)
+result_store = create_result_store(job_backend)
+
+# Moves old finished jobs into columnar files (ARCHIVE_DIR, needs pyarrow)
+archiver = create_archiver(job_backend, result_store)
+
+# Backend-wide arrival rate plus this worker's queue wait and run time, for
+# /scaling and agent pre-warming
+scaling_monitor = ScalingMonitor(job_backend.stats)
+
+# Callback delivery for jobs submitted with a callback_url
+webhooks = WebhookDispatcher()
+
+
+# =============================================================================
+# Tenancy & Fair-Share Scheduling
+# =============================================================================
+
+
+def resolve_tenant(request: Request) -> str:
+    """Identify the calling tenant from the API key or a trusted tenant header."""
+    tenant = tenants.resolve(request.headers)
+    if tenant is None:
+        raise HTTPException(status_code=401, detail="Missing or invalid API key")
+    return tenant
+
+
+# Jobs claimed by this process, kept visible to the queue by heartbeats
+in_flight_jobs: Dict[str, str] = {}
+
+# Set once this process stops accepting new jobs (shutdown or POST /drain)
+draining = asyncio.Event()
+
+# Set on shutdown only: job workers stop pulling from the queue. POST /drain
+# leaves them running, so jobs already queued here still get processed.
+stopping = asyncio.Event()
+
+async def next_job():
+    """Wait for the next job, or return None once the workers are stopping."""
+    dequeue = asyncio.ensure_future(job_backend.dequeue())
+    stop = asyncio.ensure_future(stopping.wait())
+    try:
+        await asyncio.wait({dequeue, stop}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        dequeue.cancel()
+        raise
+    finally:
+        stop.cancel()
+    if not dequeue.done():
+        dequeue.cancel()
+        return None
+    tenant, job_id = dequeue.result()
+    if stopping.is_set():
+        await job_backend.release(tenant, job_id)
+        return None
+    return tenant, job_id
+
+
+async def job_worker(worker_id: int):
+    """Pull jobs from the fair-share queue and execute them until shutdown."""
+    await agent_ready.wait()
+    while True:
+        item = await next_job()
+        if item is None:
+            return
+        tenant, job_id = item
+        in_flight_jobs[job_id] = tenant
+        started = time.monotonic()
+        run_id = None
+        handed_back = False
+        try:
+            job = await job_backend.get_job(job_id)
+            run_id = await claim_job(job) if job is not None else None
+            if run_id is not None:
+                scaling_monitor.job_started(time.time() - job.get("enqueued_at", time.time()))
+                await execute_agent_task(job_id, job["input_data"], run_id=run_id)
+                scaling_monitor.job_finished(time.monotonic() - started)
+                job = await job_backend.get_job(job_id)
+                await job_backend.incr_usage(tenant, JobStatus(job["status"]).value)
+                await analytics.record(job, job.get("template", prompt_template.name))
+                for counter in ("prompt_tokens", "completion_tokens", "cost_usd"):
+                    if job.get(counter):
+                        await job_backend.incr_usage(tenant, counter, job[counter])
+                notify_job_finished(job)
+        except asyncio.CancelledError:
+            # Drain grace period ran out: give the job back instead of failing it
+            await hand_back_job(tenant, job_id, run_id)
+            handed_back = True
+            raise
+        finally:
+            in_flight_jobs.pop(job_id, None)
+            await job_backend.incr_usage(tenant, "run_seconds", time.monotonic() - started)
+            if not handed_back:
+                await job_backend.ack(tenant, job_id)
+
+
+async def hand_back_job(tenant: str, job_id: str, run_id: Optional[str]):
+    """Return an interrupted job to the queue without spending one of its attempts."""
+    if run_id is not None:
+        job = await job_backend.get_job(job_id)
+        await job_backend.update_job(
+            job_id,
+            guard_run_id=run_id,
+            run_id=f"handed-back-{uuid.uuid4().hex}",
+            status=JobStatus.QUEUED,
+            progress=0.0,
+            attempts=max(job.get("attempts", 1) - 1, 0),
+        )
+    await job_backend.release(tenant, job_id)
+    print(f"↩️  Handed job {job_id} back to the queue")
+
+
+async def claim_job(job: Dict[str, Any]) -> Optional[str]:
+    """
+    Take ownership of a dequeued job for one execution attempt.
+
+    Returns the attempt's run_id, or None when the job must not run: it is
+    already finished (duplicate delivery), another attempt claimed it first,
+    or it has used up JOB_MAX_ATTEMPTS. Writes made by an execution are
+    guarded by its run_id, so a superseded attempt can never overwrite the
+    job afterwards.
+    """
+    if job["status"] not in (JobStatus.QUEUED, JobStatus.RUNNING):
+        return None
+
+    attempts = job.get("attempts", 0)
+    if attempts >= JOB_MAX_ATTEMPTS:
+        failed = await job_backend.update_job(
+            job["job_id"],
+            guard_run_id=job.get("run_id", ""),
+            status=JobStatus.FAILED,
+            error=f"Job was interrupted {attempts} times and will not be retried",
+            completed_at=time.time(),
+        )
+        if failed:
+            notify_job_finished(await job_backend.get_job(job["job_id"]))
+        return None
+
+    run_id = uuid.uuid4().hex
+    claimed = await job_backend.update_job(
+        job["job_id"],
+        guard_run_id=job.get("run_id", ""),
+        run_id=run_id,
+        attempts=attempts + 1,
+    )
+    return run_id if claimed else None
+
+
+async def recover_unfinished_jobs():
+    """
+    Requeue jobs a previous process accepted but never finished.
+
+    Queued and running jobs found in the persistent store without a queue
+    entry or a live worker are put back on the queue; the run_id guard makes
+    sure only one recovering process requeues each job. Jobs that already used
+    their attempts are marked failed with a reason instead, so no job (paid or
+    not) silently disappears across a restart.
+    """
+    # With a shared store, leave a grace period for jobs another replica has
+    # stored but not yet enqueued
+    orphans = await job_backend.orphaned_jobs(older_than=60 if job_backend.shared else 0)
+    requeued = failed = 0
+
+    for job in orphans:
+        attempts = job.get("attempts", 0)
+        if attempts >= JOB_MAX_ATTEMPTS:
+            if await job_backend.update_job(
+                job["job_id"],
+                guard_run_id=job.get("run_id", ""),
+                status=JobStatus.FAILED,
+                error=f"Job was interrupted by {attempts} restarts and will not be retried",
+                completed_at=time.time(),
+            ):
+                failed += 1
+                notify_job_finished(await job_backend.get_job(job["job_id"]))
+            continue
+
+        owned = await job_backend.update_job(
+            job["job_id"],
+            guard_run_id=job.get("run_id", ""),
+            run_id=f"recovered-{uuid.uuid4().hex}",
+            status=JobStatus.QUEUED,
+            progress=0.0,
+        )
+        if owned:
+            await job_backend.enqueue(job["tenant"], job["job_id"])
+            requeued += 1
+
+    if orphans:
+        print(f"♻️  Recovered unfinished jobs: {requeued} requeued, {failed} failed")
+
+
+async def worker_heartbeat(role: str, concurrency: int):
+    """
+    Periodically announce this worker, extend the visibility timeout of the
+    jobs it is running, and requeue jobs abandoned by workers that died.
+    """
+    started_at = datetime.utcnow().isoformat()
+    while True:
+        try:
+            for job_id in list(in_flight_jobs):
+                await job_backend.extend(job_id)
+            await job_backend.heartbeat(WORKER_ID, {
+                "worker_id": WORKER_ID,
+                "host": socket.gethostname(),
+                "role": role,
+                "concurrency": concurrency,
+                "in_flight": len(in_flight_jobs),
+                **scaling_monitor.report(),
+                "started_at": started_at,
+                "last_seen": datetime.utcnow().isoformat(),
+            }, ttl=HEARTBEAT_INTERVAL * 3)
+
+            # The backend marks them queued itself, skipping jobs that finished
+            # after their claim lapsed (a blind update here would run them twice)
+            for job_id in await job_backend.requeue_expired():
+                print(f"♻️  Reclaimed job {job_id} from a dead worker")
+        except Exception as e:
+            print(f"Warning: worker heartbeat failed: {e}")
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+
+def notify_job_finished(job: Optional[Dict[str, Any]]):
+    """Queue the webhook of a job that reached a terminal status, if it has one."""
+    if job is None or not job.get("callback_url"):
+        return
+    if job["status"] not in (JobStatus.COMPLETED, JobStatus.FAILED):
+        return
+    webhooks.enqueue(job["callback_url"], {
+        "event": f"job.{JobStatus(job['status']).value}",
+        "job_id": job["job_id"],
+        "status": JobStatus(job["status"]).value,
+        "result": job.get("result"),
+        "result_size": job.get("result_size"),
+        "result_url": f"{PUBLIC_BASE_URL}/result?job_id={job['job_id']}" if job.get("result_ref") else None,
+        "error": job.get("error"),
+        "created_at": iso(job.get("created_at")),
+        "completed_at": iso(job.get("completed_at")),
+    }, job_id=job["job_id"])
+
+
+def start_workers(role: str, concurrency: int) -> List[asyncio.Task]:
+    """Start `concurrency` job workers plus the heartbeat and pre-warm tasks."""
+    webhooks.start()
+    tasks = [
+        asyncio.create_task(job_worker(i), name=f"job-worker-{i}")
+        for i in range(concurrency)
+    ]
+    tasks.append(asyncio.create_task(worker_heartbeat(role, concurrency), name="worker-heartbeat"))
+    tasks.append(asyncio.create_task(prewarm_agents(), name="agent-prewarm"))
+    if archiver is not None:
+        tasks.append(asyncio.create_task(archiver.run(), name="job-archiver"))
+    return tasks
+
+
+async def stop_workers(tasks: List[asyncio.Task], grace: float = SHUTDOWN_GRACE_SECONDS):
+    """
+    Drain the workers: take no new jobs, give running jobs up to `grace`
+    seconds to finish, then hand the rest back to the queue. The heartbeat
+    keeps their claims alive until the very end.
+    """
+    draining.set()
+    stopping.set()
+    job_tasks = [t for t in tasks if t.get_name().startswith("job-worker")]
+    if in_flight_jobs:
+        print(f"⏳ Draining {len(in_flight_jobs)} running job(s), up to {grace:.0f}s")
+    if job_tasks:
+        await asyncio.wait(job_tasks, timeout=grace)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await webhooks.stop()
+
+
+def require_admin(request: Request):
+    """Dependency guarding admin-only endpoints with ADMIN_TOKEN."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+# =============================================================================
+# Agent Warm-Up - Swarms is imported lazily, off the startup path
 # =============================================================================
 
-jobs_store: Dict[str, Dict[str, Any]] = {}
+_agent_class = None  # Swarms Agent class once imported, False if not installed
+agent_warm = False
+agent_ready = asyncio.Event()
+warmup_timings: Dict[str, float] = {}
+
+
+def load_agent_class():
+    """Import the Swarms Agent class once. Returns None if Swarms is not installed."""
+    global _agent_class
+    if MOCK_LLM:
+        return None
+    if _agent_class is None:
+        started = time.perf_counter()
+        try:
+            from swarms import Agent
+            _agent_class = Agent
+        except ImportError:
+            _agent_class = False
+        warmup_timings["import_swarms"] = round(time.perf_counter() - started, 3)
+        print(f"   Imported swarms in {warmup_timings['import_swarms']:.2f}s")
+    return _agent_class or None
+
+
+def warm_up_agent():
+    """Do the heavy imports and build one agent so the first job starts warm."""
+    global agent_warm
+    started = time.perf_counter()
+    # May download tiktoken's vocabulary; offline, tokens are estimated instead
+    exact = warm_up_tokenizer([MODEL_NAME])
+    warmup_timings["tokenizer"] = round(time.perf_counter() - started, 3)
+    print(f"   Tokenizer loaded in {warmup_timings['tokenizer']:.2f}s: "
+          + ("tiktoken" if exact else "estimating from characters"))
+    started = time.perf_counter()
+    agent = create_swarms_agent()
+    warmup_timings["agent_init"] = round(time.perf_counter() - started, 3)
+    state = "ready" if agent else "unavailable (mock mode)"
+    print(f"   Agent warmed up in {warmup_timings['agent_init']:.2f}s: {state}")
+    agent_warm = True
+
+
+async def warm_up_in_background():
+    """Warm the agent in a thread while the server already answers requests."""
+    try:
+        if not agent_warm:
+            await asyncio.to_thread(warm_up_agent)
+    except Exception as e:
+        print(f"Warning: agent warm-up failed: {e}")
+    finally:
+        agent_ready.set()
 
 
 # =============================================================================
 # SWARMS AGENT IMPLEMENTATION - Customize your agent logic here
 # =============================================================================
 
-def create_swarms_agent():
+# Tools handed to every agent: plain functions Swarms calls inside agent.run,
+# in a worker thread. Tools that call out over HTTP should use the shared pool
+# through http_pool.request_sync (see http_client.py) rather than their own
+# client.
+AGENT_TOOLS: List[Callable[..., Any]] = []
+
+
+def create_swarms_agent(model_name: str = MODEL_NAME):
     """
     Create and configure your Swarms agent.
     Customize this function for your specific use case.
     """
     try:
-        from swarms import Agent
+        Agent = load_agent_class()
+        if Agent is None:
+            print("Warning: Swarms not installed. Using mock agent.")
+            return None
         
         agent = Agent(
             agent_name=AGENT_NAME,
             agent_description=AGENT_DESCRIPTION,
-            system_prompt="""You are a professional AI assistant. 
-            You provide helpful, accurate, and well-structured responses.
-            Always be thorough and professional in your work.""",
-            model_name=MODEL_NAME,
+            system_prompt=prompt_template.system_prompt,
+            model_name=model_name,
             max_loops=1,
             dynamic_temperature_enabled=True,
             verbose=False,
+            tools=AGENT_TOOLS or None,
         )
         return agent
-    except ImportError:
-        print("Warning: Swarms not installed. Using mock agent.")
-        return None
     except Exception as e:
         print(f"Warning: Could not initialize Swarms agent: {e}")
         return None
@@ -157,6 +603,10 @@ def get_agent_input_schema() -> List[InputField]:
     
     This schema tells the MIP-003 client what inputs your agent accepts.
     """
+    if AGENT_TEMPLATE != "general":
+        schema_fn, _ = TEMPLATES[AGENT_TEMPLATE]
+        return [InputField(**field) for field in schema_fn()]
+    
     return [
         InputField(
             name="task",
@@ -187,52 +637,302 @@ def get_agent_input_schema() -> List[InputField]:
     ]
 
 
-async def execute_agent_task(job_id: str, input_data: Dict[str, Any]):
+# Token/cost counters and first-answer time of the job being executed; agent
+# calls add to it, including calls made by chunk and hedge tasks of the job
+job_usage: ContextVar[Optional[Dict[str, Any]]] = ContextVar("job_usage", default=None)
+
+
+async def run_on_model(full_prompt: str, model: str):
+    """One agent call on `model`, recorded in the router's and hedger's stats."""
+    # Pre-warmed agents are built for MODEL_NAME
+    agent = (agent_pool.acquire() if model == MODEL_NAME else None) or create_swarms_agent(model)
+    if agent is None:
+        raise RuntimeError(f"Could not create an agent for {model}")
+
+    def call():
+        # Count tokens in the same thread, off the event loop
+        result = agent.run(full_prompt)
+        text = "" if result is None else str(result)
+        prompt_tokens = count_tokens(prompt_template.system_prompt + "\n" + full_prompt, model)
+        return text, prompt_tokens, count_tokens(text, model)
+
+    # Wait for a slot under the model's adaptive concurrency limit
+    limiter = concurrency_limits.get(model) if concurrency_limits.enabled else None
+    if limiter is not None:
+        await limiter.acquire()
+    started = time.monotonic()
+    try:
+        # Run the Swarms agent off the event loop so other jobs keep moving
+        result, prompt_tokens, completion_tokens = await asyncio.wait_for(
+            asyncio.to_thread(call), MODEL_ATTEMPT_TIMEOUT or None
+        )
+    except asyncio.CancelledError:
+        # Lost a hedge or the job was handed back: says nothing about the model
+        if limiter is not None:
+            limiter.release(time.monotonic() - started, sample=False)
+        raise
+    except Exception:
+        model_router.record(model, time.monotonic() - started, ok=False)
+        if limiter is not None:
+            limiter.release(time.monotonic() - started, ok=False)
+        raise
+    latency = time.monotonic() - started
+    if limiter is not None:
+        limiter.release(latency)
+    model_router.record(model, latency, ok=True)
+    hedger.observe(model, latency)
+    usage = job_usage.get()
+    if usage is not None:
+        # agent.run returns the whole answer at once, so its arrival is the first token
+        usage.setdefault("first_token_at", time.time())
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += completion_tokens
+        usage["cost_usd"] += call_cost(model, prompt_tokens, completion_tokens)
+    return result
+
+
+async def run_agent(full_prompt: str, chain: List[str]):
+    """
+    Run the prompt on the first model of `chain` that answers, falling back
+    along the chain on errors and timeouts. Slow calls are hedged on the next
+    model when HEDGE_ENABLED. Returns (result, model); result is None in mock
+    mode (Swarms not installed).
+    """
+    if load_agent_class() is None:
+        return None, chain[0]
+
+    # Models already called, including hedges: one that failed as the hedge
+    # of an earlier entry is not tried again as the next entry of the chain
+    attempted = set()
+
+    def call(model: str):
+        async def attempt():
+            attempted.add(model)
+            return await run_on_model(full_prompt, model)
+        return attempt
+
+    last_error: Optional[Exception] = None
+    for i, model in enumerate(chain):
+        if model in attempted:
+            continue
+        alternate = next((m for m in chain[i + 1:] if m not in attempted and m != model), None)
+        try:
+            return await hedger.run(model, call(model), alternate, call(alternate) if alternate else None)
+        except Exception as e:
+            last_error = e
+            print(f"Warning: model {model} failed ({type(e).__name__}: {e}), trying the next one")
+
+    raise last_error or RuntimeError("No model available")
+
+
+async def run_chunked(job_id: str, run_id: Optional[str], input_data: Dict[str, Any],
+                      field: str, chain: List[str]):
+    """
+    Map-reduce a job whose `field` is too large for one call: analyse the
+    chunks in parallel (progress advances per finished chunk), then merge the
+    partial analyses, in rounds if they do not fit one call.
+    """
+    label = next(lbl for name, lbl, _ in prompt_template.fields if name == field).lower()
+    chunks = split_text(input_data[field])
+    print(f"🧩 Job {job_id}: {field} split into {len(chunks)} chunks")
+    semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+    finished = 0
+    failed = False
+
+    async def analyse(index: int, chunk: str) -> str:
+        nonlocal finished, failed
+        async with semaphore:
+            if failed:
+                # A sibling chunk failed: the job fails anyway, so don't start
+                # another model call (calls in threads outlive cancellation)
+                raise asyncio.CancelledError()
+            prompt = (
+                prompt_template.render({**input_data, field: chunk})
+                + "\n\n" + map_instructions(label, index, len(chunks))
+            )
+            try:
+                result, _ = await run_agent(prompt, chain)
+            except BaseException:
+                failed = True
+                raise
+        finished += 1
+        await job_backend.update_job(
+            job_id, guard_run_id=run_id, progress=round(0.3 + 0.5 * finished / len(chunks), 3)
+        )
+        return f"[Mock analysis of part {index}]" if result is None else str(result)
+
+    async def merge(partials: List[str]):
+        result, model = await run_agent(reduce_prompt(request, label, partials), chain)
+        return f"[Mock merge of {len(partials)} parts]" if result is None else str(result), model
+
+    async def gather_all(coros):
+        tasks = [asyncio.create_task(c) for c in coros]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    partials = await gather_all(analyse(i, chunk) for i, chunk in enumerate(chunks, 1))
+
+    # The request without the bulk field; the partial analyses stand in for it
+    request = prompt_template.render({**input_data, field: "(analysed in parts, see below)"})
+    batches = reduce_batches(partials)
+    while 1 < len(batches) < len(partials):
+        partials = [text for text, _ in await gather_all(merge(batch) for batch in batches)]
+        batches = reduce_batches(partials)
+    result, model = await merge(partials)
+    await job_backend.update_job(job_id, guard_run_id=run_id, progress=0.9, chunks=len(chunks))
+    return result, model
+
+
+async def execute_agent_task(job_id: str, input_data: Dict[str, Any], run_id: Optional[str] = None):
     """
     Execute the agent task. This runs in the background.
     Customize this function with your agent's logic.
+
+    `run_id` identifies the execution attempt; job updates are dropped once
+    another attempt has taken the job over.
     """
+    # Token counts and cost of the model calls made so far, kept on failure too
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+    job_usage.set(usage)
     try:
         # Update job status to running
-        jobs_store[job_id]["status"] = JobStatus.RUNNING
-        jobs_store[job_id]["progress"] = 0.1
-        
-        # Get the task from input
-        task = input_data.get("task", "")
-        context = input_data.get("context", "")
-        output_format = input_data.get("output_format", "detailed")
-        
-        # Build the full prompt
-        full_prompt = task
-        if context:
-            full_prompt = f"Context: {context}\n\nTask: {task}"
-        if output_format:
-            full_prompt += f"\n\nPlease provide the response in {output_format} format."
+        await job_backend.update_job(
+            job_id, guard_run_id=run_id, status=JobStatus.RUNNING, progress=0.1,
+            started_at=time.time(),
+        )
         
-        jobs_store[job_id]["progress"] = 0.3
+        # Build the user message; the template's system prompt is the static prefix
+        full_prompt = prompt_template.render(input_data)
         
-        # Execute with Swarms agent
-        agent = create_swarms_agent()
+        await job_backend.update_job(job_id, guard_run_id=run_id, progress=0.3)
         
-        if agent:
-            # Run the Swarms agent
-            result = agent.run(full_prompt)
-            jobs_store[job_id]["progress"] = 0.9
+        # Execute on the routed model, falling back along the chain
+        chain = model_router.route(prompt_template.name, input_data)
+        field = chunked_field(prompt_template.name, input_data)
+        if field:
+            result, model = await run_chunked(job_id, run_id, input_data, field, chain)
         else:
+            # Fit optional free text (e.g. `context`) into the token budget. All
+            # counting runs off the event loop: the first count loads the tokenizer.
+            def fit_prompt():
+                return fit_to_budget(
+                    input_data,
+                    prompt_template.render,
+                    TRIMMABLE_FIELDS,
+                    token_budget(prompt_template.name, input_data.get("max_tokens")),
+                    chain[0],
+                    count_tokens(prompt_template.system_prompt, chain[0]),
+                )
+
+            input_data, full_prompt, prompt_tokens, trimmed = await asyncio.to_thread(fit_prompt)
+            if trimmed:
+                print(f"✂️  Job {job_id}: trimmed {', '.join(trimmed)} to {prompt_tokens} prompt tokens")
+                await job_backend.update_job(job_id, guard_run_id=run_id, trimmed_fields=trimmed)
+            result, model = await run_agent(full_prompt, chain)
+        
+        if result is None:
             # Fallback mock response for testing
-            await asyncio.sleep(2)  # Simulate processing time
-            result = f"[Mock Response] Processed task: {task}"
+            await asyncio.sleep(MOCK_LLM_LATENCY)  # Simulate processing time
+            result = f"[Mock Response] Processed {prompt_template.name} job on {model}:\n\n{full_prompt}"
+
+            # No model ran: record the usage a real call would have estimated,
+            # so /status, /usage and /analytics are populated in mock mode too
+            def estimate():
+                return (
+                    count_tokens(prompt_template.system_prompt + "\n" + full_prompt, model),
+                    count_tokens(result, model),
+                )
+
+            prompt_tokens, completion_tokens = await asyncio.to_thread(estimate)
+            usage.update(
+                first_token_at=time.time(),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cost_usd=call_cost(model, prompt_tokens, completion_tokens),
+            )
+        await job_backend.update_job(job_id, guard_run_id=run_id, progress=0.9, model=model, **usage)
+        
+        # Store the result as a blob; only small results stay inline
+        data = str(result).encode("utf-8")
+        ref = blob_ref(job_id, run_id)
+        await result_store.save(ref, data)
         
         # Mark as completed
-        jobs_store[job_id]["status"] = JobStatus.COMPLETED
-        jobs_store[job_id]["result"] = str(result)
-        jobs_store[job_id]["progress"] = 1.0
-        jobs_store[job_id]["completed_at"] = datetime.utcnow().isoformat()
+        await job_backend.update_job(
+            job_id,
+            guard_run_id=run_id,
+            status=JobStatus.COMPLETED,
+            result=str(result) if len(data) <= RESULT_INLINE_MAX else None,
+            **result_metadata(data, ref),
+            progress=1.0,
+            completed_at=time.time(),
+        )
         
     except Exception as e:
-        jobs_store[job_id]["status"] = JobStatus.FAILED
-        jobs_store[job_id]["error"] = str(e)
-        jobs_store[job_id]["completed_at"] = datetime.utcnow().isoformat()
+        await job_backend.update_job(
+            job_id,
+            guard_run_id=run_id,
+            status=JobStatus.FAILED,
+            error=str(e),
+            completed_at=time.time(),
+            **usage,
+        )
+
+
+# =============================================================================
+# Preloading (runs once in the gunicorn master with preload_app, then shared
+# copy-on-write by every forked worker)
+# =============================================================================
+
+# Otherwise the agent is warmed in the background after the server is up
+PRELOAD_AGENT = os.getenv("PRELOAD_AGENT", "false").lower() == "true"
+
+INPUT_SCHEMA: List[InputField] = get_agent_input_schema()
+REQUIRED_FIELDS: List[str] = [f.name for f in INPUT_SCHEMA if f.required]
+
+# Optional free-text inputs that may be shortened to fit the token budget
+TRIMMABLE_FIELDS: List[str] = [
+    f.name for f in INPUT_SCHEMA if not f.required and f.type == InputFieldType.STRING
+]
+
+# Compiled once: system prompt (cacheable static prefix) + field-to-prompt mapping
+prompt_template = compile_template(
+    AGENT_TEMPLATE,
+    TEMPLATES[AGENT_TEMPLATE][1] if AGENT_TEMPLATE != "general" else GENERAL_SYSTEM_PROMPT,
+    [field.model_dump(mode="json") for field in INPUT_SCHEMA],
+)
+
+if PRELOAD_AGENT:
+    warm_up_agent()
+
+# Agents built ahead of demand, sized by the recent arrival rate
+agent_pool = AgentPool(create_swarms_agent, scaling_monitor)
+
+# Per-job model choice, fallback chain and per-model health
+model_router = ModelRouter()
+
+# Duplicate slow calls on the next model in the chain (HEDGE_ENABLED)
+hedger = Hedger()
+
+# Per-model adaptive limits on concurrent agent calls (ADAPTIVE_CONCURRENCY)
+concurrency_limits = ConcurrencyLimits()
+
+# Finished-job samples behind /analytics, kept in the job backend
+analytics = Analytics(job_backend)
+
+# On-demand introspection behind /debug (admin)
+cpu_profiler = CpuProfiler()
+memory_profiler = MemoryProfiler()
+loop_monitor = LoopLagMonitor()
+
+
+async def prewarm_agents():
+    await agent_ready.wait()
+    await agent_pool.maintain()
 
 
 # =============================================================================
@@ -244,8 +944,31 @@ async def lifespan(app: FastAPI):
     """Application lifespan events."""
     print(f"🚀 Starting {AGENT_NAME} v{AGENT_VERSION}")
     print(f"   Model: {MODEL_NAME}")
+    print(f"   Template: {prompt_template.name} (prompt prefix {prompt_template.cache_key})")
+    print(f"   Job backend: {type(job_backend).__name__}")
+    warmup_timings["app_import"] = round(_APP_IMPORTED - _IMPORT_STARTED, 3)
+    print(f"   App imported in {warmup_timings['app_import']:.2f}s")
+    await http_pool.start()
+    loop_monitor.start()
+    warmup = asyncio.create_task(warm_up_in_background())
+    await job_backend.start()
+    await recover_unfinished_jobs()
+    workers = []
+    if EMBEDDED_WORKERS:
+        print(f"   Workers: {WORKER_CONCURRENCY}")
+        workers = start_workers("api", WORKER_CONCURRENCY)
+    else:
+        print("   Workers: external (python -m worker)")
     yield
     print(f"👋 Shutting down {AGENT_NAME}")
+    warmup.cancel()
+    await stop_workers(workers)
+    cpu_profiler.stop()
+    await loop_monitor.stop()
+    if traffic_log is not None:
+        traffic_log.close()
+    await http_pool.close()
+    await job_backend.close()
 
 
 app = FastAPI(
@@ -253,8 +976,23 @@ app = FastAPI(
     description=f"MIP-003 Compliant Agent Server - {AGENT_DESCRIPTION}",
     version=AGENT_VERSION,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+# Anonymised request traces for `python -m replay` (TRAFFIC_CAPTURE_PATH)
+traffic_log = create_traffic_log()
+if traffic_log is not None:
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        log=traffic_log,
+        template=prompt_template.name,
+        resolve_tenant=tenants.resolve,
+        value_fields=[f.name for f in INPUT_SCHEMA if f.type != InputFieldType.STRING],
+    )
+
+# Negotiated gzip/brotli/zstd compression of every compressible response
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware for cross-origin requests
 app.add_middleware(
     CORSMiddleware,
@@ -285,6 +1023,11 @@ async def check_availability():
     MIP-003: Check agent availability.
     Returns the agent's status, type, name, and version.
     """
+    if draining.is_set():
+        return AvailabilityResponse(
+            status="unavailable",
+            message=f"{AGENT_NAME} is draining and not accepting new jobs",
+        )
     return AvailabilityResponse()
 
 
@@ -294,42 +1037,119 @@ async def get_input_schema():
     MIP-003: Get the input schema for this agent.
     Describes what inputs the agent accepts.
     """
-    return InputSchemaResponse(input=get_agent_input_schema())
+    return InputSchemaResponse(input=INPUT_SCHEMA)
+
+
+async def replay_start_job(tenant: str, job_id: str, response: Response) -> StartJobResponse:
+    """Answer a retried /start_job with the job its idempotency key created."""
+    job = await job_backend.get_job(job_id)
+    if job is None:
+        # Still being created by a concurrent first attempt, or archived since:
+        # its status is unknown, and starting a second job would break the key
+        raise HTTPException(
+            status_code=409,
+            detail=f"Idempotency key already used for job {job_id}, which is not available; "
+                   "retry shortly or use a new key",
+            headers={"Retry-After": "1"},
+        )
+    await job_backend.incr_usage(tenant, "deduplicated")
+    response.headers["Idempotent-Replayed"] = "true"
+    return StartJobResponse(
+        job_id=job_id,
+        status=job["status"],
+        message="Job already started for this idempotency key",
+    )
 
 
 @app.post("/start_job", response_model=StartJobResponse, tags=["MIP-003"])
-async def start_job(request: StartJobRequest, background_tasks: BackgroundTasks):
+async def start_job(request: StartJobRequest, http_request: Request, response: Response):
     """
     MIP-003: Start a new job with the provided input data.
     Returns a job_id that can be used to check status.
+
+    Retries carrying the same `Idempotency-Key` header (or, without one, the
+    same payment_id) return the job the first request created instead of
+    starting another one.
     """
-    # Validate required fields
-    schema = get_agent_input_schema()
-    required_fields = [f.name for f in schema if f.required]
+    tenant = resolve_tenant(http_request)
+    
+    idempotency_key = http_request.headers.get("Idempotency-Key") or request.payment_id
+    if idempotency_key:
+        if len(idempotency_key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+        existing = await job_backend.find_idempotent_job(tenant, idempotency_key)
+        if existing is not None:
+            return await replay_start_job(tenant, existing, response)
     
-    for field in required_fields:
+    if draining.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="Agent is draining; retry on another instance",
+            headers={"Retry-After": str(DRAIN_RETRY_AFTER)},
+        )
+    
+    # Validate required fields
+    for field in REQUIRED_FIELDS:
         if field not in request.input_data:
             raise HTTPException(
                 status_code=400,
                 detail=f"Missing required field: {field}"
             )
     
+    if request.callback_url:
+        problem = await validate_callback_url(request.callback_url)
+        if problem:
+            raise HTTPException(status_code=400, detail=problem)
+    
+    # Enforce per-tenant quotas before admitting the job
+    quota = tenants.quota(tenant)
+    allowed, retry_after = rate_limiter.check(tenant)
+    if allowed and quota.max_queued and await job_backend.pending(tenant) >= quota.max_queued:
+        allowed, retry_after = False, 1.0
+    if not allowed:
+        await job_backend.incr_usage(tenant, "rejected")
+        raise HTTPException(
+            status_code=429,
+            detail="Tenant quota exceeded",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+    
     # Create job
     job_id = str(uuid.uuid4())
-    jobs_store[job_id] = {
-        "job_id": job_id,
-        "status": JobStatus.QUEUED,
-        "input_data": request.input_data,
-        "payment_id": request.payment_id,
-        "result": None,
-        "error": None,
-        "progress": 0.0,
-        "created_at": datetime.utcnow().isoformat(),
-        "completed_at": None,
-    }
+    if idempotency_key:
+        # Atomic: of two concurrent first attempts only one creates the job
+        existing = await job_backend.claim_idempotency_key(tenant, idempotency_key, job_id)
+        if existing is not None:
+            return await replay_start_job(tenant, existing, response)
+    now = time.time()
+    try:
+        await job_backend.create_job({
+            "job_id": job_id,
+            "status": JobStatus.QUEUED,
+            "input_data": request.input_data,
+            "payment_id": request.payment_id,
+            "tenant": tenant,
+            "template": prompt_template.name,
+            "result": None,
+            "error": None,
+            "progress": 0.0,
+            "created_at": now,
+            "enqueued_at": now,
+            "completed_at": None,
+            "run_id": "",
+            "attempts": 0,
+            "idempotency_key": idempotency_key,
+            "callback_url": request.callback_url,
+        })
+    except BaseException:
+        # Otherwise the key would point at a job that does not exist
+        if idempotency_key:
+            await job_backend.release_idempotency_key(tenant, idempotency_key, job_id)
+        raise
     
-    # Start background task
-    background_tasks.add_task(execute_agent_task, job_id, request.input_data)
+    # Hand off to the fair-share scheduler
+    await job_backend.incr_usage(tenant, "submitted")
+    await job_backend.enqueue(tenant, job_id)
     
     return StartJobResponse(
         job_id=job_id,
@@ -343,21 +1163,141 @@ async def get_status(job_id: str):
     """
     MIP-003: Get the status of a job by job_id.
     """
-    if job_id not in jobs_store:
+    job = await job_backend.get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs_store[job_id]
     return JobStatusResponse(
         job_id=job["job_id"],
         status=job["status"],
         result=job.get("result"),
         error=job.get("error"),
         progress=job.get("progress"),
-        created_at=job["created_at"],
-        completed_at=job.get("completed_at"),
+        created_at=iso(job["created_at"]),
+        started_at=iso(job.get("started_at")),
+        completed_at=iso(job.get("completed_at")),
+        result_size=job.get("result_size"),
+        result_url=f"/result?job_id={job_id}" if job.get("result_ref") else None,
+        prompt_tokens=job.get("prompt_tokens"),
+        completion_tokens=job.get("completion_tokens"),
+        cost_usd=job.get("cost_usd"),
     )
 
 
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=start-end` range. Returns (start, end), or None if
+    the range is unsatisfiable (416). Raises ValueError for headers to ignore
+    (other units, multiple ranges, malformed), which get the full body.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError(f"Unsupported range: {header}")
+    first, _, last = spec.strip().partition("-")
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1  # Suffix range: last N bytes
+    if start < 0 or start > end or start >= size:
+        return None
+    return start, end
+
+
+@app.get("/result", tags=["MIP-003"])
+async def get_result(job_id: str, request: Request):
+    """
+    Stream a completed job's result. Supports HTTP range requests
+    (`Range: bytes=start-end`); full responses are compressed by the
+    compression middleware.
+    """
+    job = await job_backend.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    ref = job.get("result_ref")
+    size = await result_store.size(ref) if ref else None
+    if size is None:
+        raise HTTPException(status_code=404, detail="Job has no stored result")
+
+    etag = f'"{job.get("result_sha256", ref)}"'
+    headers = {"Accept-Ranges": "bytes", "ETag": etag}
+    if request.headers.get("if-none-match") in (etag, "W/" + etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header:
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            range_header = None  # Not a range we serve: send the whole result
+    if range_header:
+        if byte_range is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            result_store.read(ref, start, end),
+            status_code=206,
+            media_type="text/plain; charset=utf-8",
+            headers=headers,
+        )
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(
+        result_store.read(ref), media_type="text/plain; charset=utf-8", headers=headers
+    )
+
+
+@app.get("/status/stream", tags=["MIP-003"])
+async def stream_status(job_id: str):
+    """
+    Server-sent events for a job's status changes, so clients need not poll.
+    Works across instances when JOB_BACKEND=redis (pub/sub).
+    """
+    job = await job_backend.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    terminal = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    async def events():
+        current = {"job_id": job_id, "status": job["status"], "progress": job.get("progress")}
+        yield f"data: {json.dumps(current)}\n\n"
+        if job["status"] in terminal:
+            return
+        async for event in job_backend.subscribe():
+            if event["job_id"] != job_id:
+                continue
+            yield f"data: {json.dumps(event)}\n\n"
+            if event.get("status") in terminal:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/status/history", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_status_history(job_id: str):
+    """
+    Every recorded change of a job, oldest first, read from the event log
+    (memory backend with JOB_LOG_DIR). Changes before the last compaction
+    are merged into one snapshot entry.
+    """
+    job = await job_backend.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    events = job_backend.job_history(job_id)
+    if events is None:
+        raise HTTPException(status_code=501, detail="Job history needs the memory backend with JOB_LOG_DIR")
+    return {
+        "job_id": job_id,
+        "events": [
+            {"time": iso(e["time"]), "snapshot": e["snapshot"], "fields": public_job(e["fields"])}
+            for e in events
+        ],
+    }
+
+
 @app.get("/demo", tags=["MIP-003"])
 async def demo():
     """
@@ -384,11 +1324,10 @@ async def provide_input(request: ProvideInputRequest):
     MIP-003: Provide additional input to a running job.
     Used when the agent needs more information from the user.
     """
-    if request.job_id not in jobs_store:
+    job = await job_backend.get_job(request.job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs_store[request.job_id]
-    
     if job["status"] != JobStatus.WAITING_FOR_INPUT:
         raise HTTPException(
             status_code=400,
@@ -396,8 +1335,11 @@ async def provide_input(request: ProvideInputRequest):
         )
     
     # Store the additional input and continue processing
-    job["additional_input"] = request.input_data
-    job["status"] = JobStatus.RUNNING
+    await job_backend.update_job(
+        request.job_id,
+        additional_input=request.input_data,
+        status=JobStatus.RUNNING,
+    )
     
     return {"message": "Input received", "job_id": request.job_id}
 
@@ -409,28 +1351,278 @@ async def provide_input(request: ProvideInputRequest):
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Detailed health check for monitoring."""
+    stats = await job_backend.stats()
     return {
         "status": "healthy",
         "agent_name": AGENT_NAME,
         "version": AGENT_VERSION,
         "model": MODEL_NAME,
-        "active_jobs": len([j for j in jobs_store.values() if j["status"] == JobStatus.RUNNING]),
-        "total_jobs": len(jobs_store),
+        "template": prompt_template.name,
+        "prompt_cache_key": prompt_template.cache_key,
+        "active_jobs": stats["running"],
+        "total_jobs": stats["total"],
+        "queued_jobs": stats["queued"],
+        "draining": draining.is_set(),
+        "ready": agent_ready.is_set(),
+        "warmup_timings": warmup_timings,
+        "http_client": http_pool.stats(),
+    }
+
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """
+    Readiness probe: 200 once the agent is warmed up and the server is not
+    draining, 503 before that. /health stays the liveness probe.
+    """
+    ready = agent_ready.is_set() and not draining.is_set()
+    body = {"ready": ready, "warm": agent_ready.is_set(), "draining": draining.is_set()}
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+async def scaling_snapshot() -> Dict[str, Any]:
+    stats = await scaling_monitor.refresh()
+    snapshot = scaling_monitor.snapshot(
+        queue_depth=stats["queued"],
+        workers=await job_backend.list_workers(),
+        default_slots_per_replica=WORKER_CONCURRENCY,
+    )
+    snapshot["agent_pool"] = agent_pool.stats()
+    return snapshot
+
+
+@app.get("/scaling", tags=["Health"])
+async def scaling_signals():
+    """
+    Autoscaling signals based on load rather than CPU: queue depth, average
+    queue wait, worker saturation, predicted drain time and desired replicas.
+    """
+    return await scaling_snapshot()
+
+
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Scaling signals in Prometheus text format."""
+    lines = []
+    snapshot = await scaling_snapshot()
+    pool = snapshot.pop("agent_pool")
+    for name, value in snapshot.items():
+        if value is not None:
+            lines.append(f"mip003_{name} {value}")
+    for name, value in pool.items():
+        lines.append(f"mip003_agent_pool_{name} {value}")
+    for model, model_stats in model_router.stats().items():
+        for name, value in model_stats.items():
+            lines.append(f'mip003_model_{name}{{model="{model}"}} {int(value) if isinstance(value, bool) else value}')
+    for name, value in hedger.stats().items():
+        if not isinstance(value, dict):
+            lines.append(f"mip003_hedge_{name} {int(value) if isinstance(value, bool) else value}")
+    for name, value in http_pool.stats().items():
+        lines.append(f"mip003_http_client_{name} {int(value) if isinstance(value, bool) else value}")
+    for model, limiter_stats in concurrency_limits.stats()["models"].items():
+        for name, value in limiter_stats.items():
+            lines.append(f'mip003_concurrency_{name}{{model="{model}"}} {value}')
+    for name, value in loop_monitor.stats().items():
+        lines.append(f"mip003_event_loop_{name} {int(value) if isinstance(value, bool) else value}")
+    for name, value in (job_backend.log_stats() or {}).items():
+        if isinstance(value, (int, float)):
+            lines.append(f"mip003_job_log_{name} {value}")
+    for name, value in (archiver.stats() if archiver is not None else {}).items():
+        if isinstance(value, (int, float)):
+            lines.append(f"mip003_archive_{name} {value}")
+    return PlainTextResponse("\n".join(lines) + "\n")
+
+
+@app.get("/models", tags=["Health"])
+async def get_models():
+    """Routing counts, latency and error rates of the models in the fallback chain."""
+    return {
+        "default": MODEL_NAME,
+        "rules": model_router.rules,
+        "models": model_router.stats(),
+        "hedging": hedger.stats(),
     }
 
 
-@app.get("/jobs", tags=["Admin"])
+@app.get("/concurrency", tags=["Health"])
+async def get_concurrency():
+    """Adaptive concurrency limit per model, with the history of its changes."""
+    return concurrency_limits.stats(history=True)
+
+
+@app.get("/usage", tags=["Tenancy"])
+async def get_usage(http_request: Request):
+    """Usage counters and quota for the calling tenant."""
+    tenant = resolve_tenant(http_request)
+    return {
+        "tenant": tenant,
+        "usage": await job_backend.get_usage(tenant),
+        "quota": asdict(tenants.quota(tenant)),
+        "queued": await job_backend.pending(tenant),
+        "running": await job_backend.running(tenant),
+    }
+
+
+@app.get("/tenants", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def list_tenants():
+    """Per-tenant usage counters (for debugging/admin)."""
+    return {
+        "tenants": {
+            tenant: {
+                "usage": usage,
+                "queued": await job_backend.pending(tenant),
+                "running": await job_backend.running(tenant),
+            }
+            for tenant, usage in (await job_backend.all_usage()).items()
+        }
+    }
+
+
+@app.post("/drain", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def drain():
+    """
+    Stop accepting jobs ahead of a redeploy: /availability turns unavailable,
+    /ready 503 and /start_job answers 503 with Retry-After. Running and
+    already queued jobs are still processed. There is no undrain: restart
+    the process to accept jobs again.
+    """
+    draining.set()
+    stats = await job_backend.stats()
+    return {"draining": True, "running_jobs": len(in_flight_jobs), "queued_jobs": stats["queued"]}
+
+
+@app.get("/workers", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def list_workers():
+    """Live workers that sent a heartbeat recently (for debugging/admin)."""
+    workers = await job_backend.list_workers()
+    return {"workers": workers, "total": len(workers)}
+
+
+@app.get("/webhooks", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_webhooks():
+    """Webhook delivery counters and this process's dead-letter list."""
+    return {"stats": webhooks.stats(), "dead_letters": webhooks.dead_letter_list()}
+
+
+@app.post("/webhooks/redeliver", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def redeliver_webhook(delivery_id: str):
+    """Retry a dead-lettered webhook delivery."""
+    if not webhooks.redeliver(delivery_id):
+        raise HTTPException(status_code=404, detail="Dead letter not found")
+    return {"delivery_id": delivery_id, "status": "queued"}
+
+
+@app.get("/analytics", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_analytics(window: Optional[float] = None, group_by: Optional[str] = None):
+    """
+    Latency percentiles per stage, tokens and cost of the jobs finished (by
+    any worker) in the last `window` seconds, optionally grouped by template,
+    model, tenant or status.
+    """
+    if group_by is not None and group_by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(GROUP_BY)}")
+    return await analytics.summary(window or ANALYTICS_WINDOW, group_by)
+
+
+@app.get("/archive", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_archive(
+    status: Optional[JobStatus] = None,
+    template: Optional[str] = None,
+    tenant: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100,
+    group_by: Optional[str] = None,
+):
+    """
+    Archived jobs completed in [since, until) (ISO or epoch seconds), or with
+    `group_by` their count, tokens and cost per date, status, template,
+    tenant or model. Filters are pushed down to the archive files.
+    """
+    if archiver is None:
+        raise HTTPException(status_code=501, detail="The job archive needs ARCHIVE_DIR and pyarrow")
+    if group_by is not None and group_by not in ARCHIVE_GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(ARCHIVE_GROUP_BY)}")
+    filters = {"status": status.value if status else None, "template": template,
+               "tenant": tenant, "since": since, "until": until}
+    try:
+        if group_by is not None:
+            groups = await asyncio.to_thread(aggregate_archive, archiver.directory, group_by, **filters)
+            return {"group_by": group_by, "groups": groups}
+        jobs = await asyncio.to_thread(query_archive, archiver.directory, limit, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"jobs": jobs, "archiver": archiver.stats()}
+
+
+@app.post("/debug/profile/start", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def start_cpu_profile(interval: Optional[float] = None):
+    """Start sampling the stacks of every thread in this process."""
+    if not cpu_profiler.start(interval):
+        raise HTTPException(status_code=409, detail="A CPU profile is already running")
+    return {"pid": os.getpid(), **cpu_profiler.stats()}
+
+
+@app.post("/debug/profile/stop", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def stop_cpu_profile():
+    """Stop the CPU profile and return its collapsed stacks (flamegraph input)."""
+    await asyncio.to_thread(cpu_profiler.stop)
+    return await get_cpu_profile()
+
+
+@app.get("/debug/profile", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_cpu_profile():
+    """Collapsed stacks of the running or last CPU profile."""
+    stats = cpu_profiler.stats()
+    return PlainTextResponse(
+        cpu_profiler.collapsed(),
+        headers={"X-Profile-Pid": str(os.getpid()), "X-Profile-Samples": str(stats["samples"])},
+    )
+
+
+@app.post("/debug/memory/start", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def start_memory_trace(frames: int = TRACEMALLOC_FRAMES):
+    """Start tracemalloc (slows allocations while it runs) and take a baseline."""
+    await asyncio.to_thread(memory_profiler.start, frames)
+    return {"pid": os.getpid(), "tracing": True}
+
+
+@app.post("/debug/memory/snapshot", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def memory_snapshot(limit: int = 20, group_by: str = "lineno"):
+    """Top allocation sites and their growth since the previous snapshot."""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be one of: lineno, filename, traceback")
+    try:
+        snapshot = await asyncio.to_thread(memory_profiler.snapshot, limit, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    stats = await job_backend.stats()
+    return {"pid": os.getpid(), "jobs": stats["total"], **snapshot}
+
+
+@app.post("/debug/memory/stop", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def stop_memory_trace():
+    """Stop tracemalloc and free its traces."""
+    memory_profiler.stop()
+    return {"pid": os.getpid(), "tracing": False}
+
+
+@app.get("/debug/loop", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_loop_lag():
+    """Event-loop lag measured by the background monitor."""
+    return {"pid": os.getpid(), **loop_monitor.stats()}
+
+
+@app.get("/jobs", tags=["Admin"], dependencies=[Depends(require_admin)])
 async def list_jobs(limit: int = 10, status: Optional[JobStatus] = None):
     """List recent jobs (for debugging/admin)."""
-    jobs = list(jobs_store.values())
-    
-    if status:
-        jobs = [j for j in jobs if j["status"] == status]
-    
-    # Sort by created_at descending
-    jobs.sort(key=lambda x: x["created_at"], reverse=True)
-    
-    return {"jobs": jobs[:limit], "total": len(jobs)}
+    jobs, total = await job_backend.list_jobs(limit, status.value if status else None)
+    return {"jobs": [public_job(job) for job in jobs], "total": total}
+
+
+_APP_IMPORTED = time.perf_counter()
 
 
 # =============================================================================
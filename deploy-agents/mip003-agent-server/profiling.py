@@ -0,0 +1,220 @@
+"""
+On-Demand Profiling
+===================
+Introspection for a server that degrades in production, exposed through the
+admin endpoints under /debug. Nothing runs until it is asked for, except the
+event-loop lag monitor, which wakes up once per LOOP_LAG_INTERVAL.
+
+- CpuProfiler: a background thread samples the stacks of every thread
+  (sys._current_frames) every PROFILE_INTERVAL seconds and counts them in
+  collapsed form ("frame;frame;frame count"), ready for flamegraph.pl or
+  speedscope. Agent calls run in worker threads, so they show up as well.
+  Profiles stop by themselves after PROFILE_MAX_SECONDS.
+- MemoryProfiler: starts tracemalloc on demand and diffs each snapshot
+  against the previous one, by allocating line, to find what keeps growing
+  (e.g. the job store). tracemalloc slows allocations while it traces, so
+  stop it when done.
+- LoopLagMonitor: measures how late a periodic sleep wakes up. Lag means
+  something is blocking the event loop (synchronous I/O, CPU-heavy code).
+
+Each process profiles itself; with several workers the responses carry the
+pid that answered.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from hedging import percentile
+
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.01))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 300))
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", 10))
+LOOP_LAG_MONITOR = os.getenv("LOOP_LAG_MONITOR", "true").lower() == "true"
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.5))
+# Lag above this is logged
+LOOP_LAG_WARN_SECONDS = float(os.getenv("LOOP_LAG_WARN_SECONDS", 0.25))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class CpuProfiler:
+    """Sampling profiler producing collapsed stacks."""
+
+    def __init__(self):
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.interval = PROFILE_INTERVAL
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None) -> bool:
+        """Start a new profile; False if one is already running."""
+        if self.running:
+            return False
+        self.stacks = Counter()
+        self.samples = 0
+        self.interval = interval or PROFILE_INTERVAL
+        self.started_at, self.stopped_at = time.time(), None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="cpu-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            if time.monotonic() > deadline:
+                break
+        self.stopped_at = time.time()
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def stats(self) -> Dict[str, Any]:
+        end = self.stopped_at or time.time()
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "duration_seconds": round(end - self.started_at, 3) if self.started_at else 0.0,
+        }
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots, each diffed against the one before."""
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = TRACEMALLOC_FRAMES) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._previous = self._snapshot()
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._previous = None
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+
+    def snapshot(self, limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        """Top allocation sites and their growth since the previous snapshot."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        current = self._snapshot()
+        previous, self._previous = self._previous, current
+        current_size, peak_size = tracemalloc.get_traced_memory()
+        result: Dict[str, Any] = {
+            "traced_bytes": current_size,
+            "peak_bytes": peak_size,
+            "top": [
+                {"site": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                for stat in current.statistics(group_by)[:limit]
+            ],
+        }
+        if previous is not None:
+            result["growth"] = [
+                {
+                    "site": str(stat.traceback),
+                    "size_bytes": stat.size,
+                    "size_diff_bytes": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in current.compare_to(previous, group_by)[:limit]
+                if stat.size_diff
+            ]
+        return result
+
+
+class LoopLagMonitor:
+    """Background task measuring event-loop scheduling delay."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.lags: Deque[float] = deque(maxlen=max(int(300 / interval), 1))  # ~5 minutes
+        self.max_lag = 0.0
+        self.slow_ticks = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if LOOP_LAG_MONITOR and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > LOOP_LAG_WARN_SECONDS:
+                self.slow_ticks += 1
+                print(f"🐢 Event loop blocked for {lag:.3f}s")
+
+    def current(self) -> float:
+        return self.lags[-1] if self.lags else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        lags: List[float] = list(self.lags)
+        return {
+            "enabled": self._task is not None,
+            "interval_seconds": self.interval,
+            "lag_seconds": round(self.current(), 4),
+            "p50_seconds": round(percentile(lags, 50), 4) if lags else 0.0,
+            "p99_seconds": round(percentile(lags, 99), 4) if lags else 0.0,
+            "max_seconds": round(self.max_lag, 4),
+            "slow_ticks": self.slow_ticks,
+        }
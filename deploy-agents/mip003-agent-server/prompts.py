@@ -0,0 +1,81 @@
+"""
+Prompt Construction Pipeline
+============================
+Compiles an agent template (system prompt + input schema) once into a
+PromptTemplate, then renders each job's input_data with a single pass over the
+precomputed field mapping.
+
+The system prompt is the static prefix of every request: the template's role
+prompt followed by a description of how inputs are laid out. It is
+byte-identical for every job of a template and all per-job content goes in the
+user message after it, which is what provider-side prompt caching keys on
+(OpenAI caches repeated prefixes automatically; Anthropic/LiteLLM caching
+matches the same stable system block). `cache_key` identifies the prefix.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+# Fields that steer generation rather than describe the request
+CONTROL_FIELDS = frozenset({"max_tokens"})
+
+# String fields at least this long (or multi-line) are rendered as blocks
+_BLOCK_THRESHOLD = 80
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    system_prompt: str
+    cache_key: str
+    # (field name, label, is free text) in schema order, control fields removed
+    fields: Tuple[Tuple[str, str, bool], ...]
+
+    def render(self, input_data: Dict[str, Any]) -> str:
+        """Render a job's input_data into the user message."""
+        blocks: List[str] = []
+        params: List[str] = []
+        for name, label, is_text in self.fields:
+            value = input_data.get(name)
+            if value is None or value == "":
+                continue
+            if isinstance(value, bool):
+                value = "yes" if value else "no"
+            text = str(value)
+            if is_text and (len(text) >= _BLOCK_THRESHOLD or "\n" in text):
+                blocks.append(f"## {label}\n{text}")
+            else:
+                params.append(f"- {label}: {text}")
+        if params:
+            blocks.append("## Parameters\n" + "\n".join(params))
+        return "\n\n".join(blocks)
+
+
+def _label(name: str) -> str:
+    return name.replace("_", " ").title()
+
+
+def compile_template(name: str, role_prompt: str, schema: List[Dict[str, Any]]) -> PromptTemplate:
+    """Compile a role prompt and its input schema (list of field dicts)."""
+    fields = tuple(
+        (f["name"], _label(f["name"]), f["type"] == "string")
+        for f in schema
+        if f["name"] not in CONTROL_FIELDS
+    )
+
+    layout = "\n".join(
+        f"- {_label(f['name'])}: {f['description']}"
+        + ("" if f.get("required", True) else " (optional)")
+        for f in schema
+        if f["name"] not in CONTROL_FIELDS
+    )
+    system_prompt = (
+        f"{role_prompt.strip()}\n\n"
+        "Each request is structured in sections named after these inputs:\n"
+        f"{layout}\n\n"
+        "Short inputs are listed under Parameters. Follow them when they apply."
+    )
+
+    cache_key = hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+    return PromptTemplate(name=name, system_prompt=system_prompt, cache_key=cache_key, fields=fields)
@@ -0,0 +1,274 @@
+"""
+Traffic Replay
+==============
+Drives a server with traces recorded by TRAFFIC_CAPTURE_PATH (see
+traffic.py) and reports latency and throughput next to the recording, so a
+capacity change can be checked before it is deployed.
+
+    # Server under test, answering with the mock LLM
+    MOCK_LLM=true MOCK_LLM_LATENCY=2 TRUST_TENANT_HEADER=true uvicorn main:app
+
+    python -m replay traces/traffic-*.jsonl --speed 1       # recorded pace
+    python -m replay traces/traffic-*.jsonl --speed 10      # 10x faster
+    python -m replay traces/traffic-*.jsonl --speed max     # as fast as possible
+
+    # Compare two runs, e.g. before and after a change
+    python -m replay traces.jsonl --speed max --save before.json
+    python -m replay traces.jsonl --speed max --compare before.json
+
+Errors are responses with status >= 400, including the 429s of a server
+whose tenant quotas the replay outruns: a replay at --speed 10 submits ten
+times the recorded rate per tenant. Run the server under test without quotas
+(they are off unless TENANT_* limits, TENANT_QUOTAS or TENANT_API_KEYS are
+set) or raise them accordingly; the report counts the 429s separately.
+Recorded latencies are measured inside the server, replayed ones at the
+client, so compare runs with --save/--compare.
+
+Submissions are rebuilt from the recorded input profile: free-text fields get
+filler text of the recorded length, fixed-domain fields their recorded
+value. Polls of a job wait for its replayed submission and use the new job
+id. Tenants are sent as their hashed id in TENANT_HEADER, so run the server
+under test with TRUST_TENANT_HEADER=true and without TENANT_API_KEYS.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from hedging import percentile
+from tenancy import TENANT_HEADER
+
+_FILLER = "The quick brown fox jumps over the lazy dog. "
+
+
+def load_traces(paths: List[str]) -> List[Dict[str, Any]]:
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    records.sort(key=lambda r: r["t"])
+    return records
+
+
+def filler(length: int) -> str:
+    return (_FILLER * (length // len(_FILLER) + 1))[:length]
+
+
+def rebuild_input(record: Dict[str, Any]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {name: filler(length) for name, length in record.get("f", {}).items()}
+    data.update(record.get("v", {}))
+    return data
+
+
+def summarise(samples: Dict[str, List[float]], errors: Dict[str, int], duration: float) -> Dict[str, Any]:
+    """Per-route and overall latency percentiles (ms) and throughput."""
+    routes = {}
+    every: List[float] = []
+    for route, latencies in sorted(samples.items()):
+        every.extend(latencies)
+        routes[route] = _stats(latencies, errors.get(route, 0), duration)
+    return {
+        "duration_seconds": round(duration, 3),
+        "overall": _stats(every, sum(errors.values()), duration),
+        "routes": routes,
+    }
+
+
+def _stats(latencies: List[float], errors: int, duration: float) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 2) if duration > 0 else 0.0,
+    }
+    for p in (50, 95, 99):
+        stats[f"p{p}_ms"] = round(percentile(latencies, p), 2) if latencies else None
+    return stats
+
+
+def recorded_summary(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for record in records:
+        samples[f"{record['m']} {record['r']}"].append(record["ms"])
+        if record["s"] >= 400:
+            errors[f"{record['m']} {record['r']}"] += 1
+    duration = records[-1]["t"] - records[0]["t"] if len(records) > 1 else 0.0
+    return summarise(samples, errors, duration)
+
+
+class Replayer:
+    def __init__(self, client: httpx.AsyncClient, speed: Optional[float], max_inflight: int, job_timeout: float):
+        self.client = client
+        self.speed = speed
+        self.inflight = asyncio.Semaphore(max_inflight)
+        self.job_timeout = job_timeout
+        self.jobs: Dict[str, Optional[str]] = {}
+        self.known: set = set()
+        self.submitted: Dict[str, asyncio.Event] = defaultdict(asyncio.Event)
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.throttled = 0
+        self.skipped = 0
+
+    async def run(self, records: List[Dict[str, Any]]) -> float:
+        origin = records[0]["t"]
+        self.known = {r["job"] for r in records if r["r"] == "/start_job" and r.get("job")}
+        started = time.monotonic()
+        tasks = []
+        for record in records:
+            if self.speed:
+                delay = (record["t"] - origin) / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await self.inflight.acquire()
+            tasks.append(asyncio.create_task(self._send(record)))
+        await asyncio.gather(*tasks)
+        return time.monotonic() - started
+
+    async def _send(self, record: Dict[str, Any]) -> None:
+        try:
+            await self._send_one(record)
+        finally:
+            self.inflight.release()
+
+    async def _send_one(self, record: Dict[str, Any]) -> None:
+        route, ref = record["r"], record.get("job")
+        headers = {TENANT_HEADER: record["tn"]} if record.get("tn") else {}
+        params: Dict[str, str] = {}
+        body: Optional[Dict[str, Any]] = None
+
+        if route == "/start_job":
+            body = {"input_data": rebuild_input(record)}
+        elif ref is not None:
+            if ref not in self.known:
+                self.skipped += 1  # Submitted before the capture started
+                return
+            # Polls need the replayed job's id; wait for its submission
+            if ref not in self.jobs:
+                try:
+                    await asyncio.wait_for(self.submitted[ref].wait(), self.job_timeout)
+                except asyncio.TimeoutError:
+                    pass
+            job_id = self.jobs.get(ref)
+            if job_id is None:
+                self.skipped += 1
+                return
+            if route == "/provide_input":
+                body = {"job_id": job_id, "input_data": rebuild_input(record)}
+            else:
+                params["job_id"] = job_id
+
+        key = f"{record['m']} {route}"
+        started = time.perf_counter()
+        try:
+            async with self.client.stream(record["m"], route, params=params, json=body, headers=headers) as response:
+                content = await response.aread()
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            content, response, failed = b"", None, True
+        self.samples[key].append((time.perf_counter() - started) * 1000)
+        if failed:
+            self.errors[key] += 1
+            if response is not None and response.status_code == 429:
+                self.throttled += 1
+
+        if route == "/start_job" and ref is not None:
+            job_id = None
+            if response is not None and response.status_code == 200:
+                job_id = json.loads(content).get("job_id")
+            self.jobs[ref] = job_id
+            self.submitted[ref].set()
+
+
+def print_report(label: str, report: Dict[str, Any], baseline: Optional[Dict[str, Any]], baseline_label: str) -> None:
+    def delta(now: Optional[float], before: Optional[float]) -> str:
+        if now is None or not before:
+            return ""
+        return f" ({(now - before) / before:+.0%} vs {baseline_label})"
+
+    print(f"\n{label} ({report['duration_seconds']:.1f}s)")
+    rows = [("overall", report["overall"])] + list(report["routes"].items())
+    base_rows = dict([("overall", baseline["overall"])] + list(baseline["routes"].items())) if baseline else {}
+    for route, stats in rows:
+        before = base_rows.get(route, {})
+        print(f"  {route:<28} {stats['requests']:6d} req  {stats['errors']:4d} err  "
+              f"{stats['throughput_rps']:8.2f} req/s{delta(stats['throughput_rps'], before.get('throughput_rps'))}")
+        if stats["p50_ms"] is not None:
+            print(f"  {'':<28} p50 {stats['p50_ms']:8.1f} ms{delta(stats['p50_ms'], before.get('p50_ms'))}"
+                  f"  p95 {stats['p95_ms']:8.1f} ms{delta(stats['p95_ms'], before.get('p95_ms'))}"
+                  f"  p99 {stats['p99_ms']:8.1f} ms{delta(stats['p99_ms'], before.get('p99_ms'))}")
+
+
+async def main(args) -> None:
+    records = load_traces(args.traces)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        raise SystemExit("No trace records found")
+    speed = None if args.speed == "max" else float(args.speed)
+    recorded = recorded_summary(records)
+    print(f"Replaying {len(records)} requests from {len(args.traces)} file(s) against {args.url} "
+          f"at {'max' if speed is None else f'{speed:g}x'} speed")
+
+    async with httpx.AsyncClient(
+        base_url=args.url,
+        timeout=httpx.Timeout(args.timeout),
+        limits=httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight),
+    ) as client:
+        replayer = Replayer(client, speed, args.max_inflight, args.timeout)
+        duration = await replayer.run(records)
+
+    report = summarise(replayer.samples, replayer.errors, duration)
+    report["skipped"] = replayer.skipped
+    report["throttled"] = replayer.throttled
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    # Recorded latencies are measured in the server, replayed ones at the client
+    print_report("Recorded (server time)", recorded, None, "")
+    print_report("Replay (round trip)", report, recorded, "recorded")
+    if baseline is not None:
+        print_report("Replay vs baseline", report, baseline, args.compare)
+    if replayer.skipped:
+        print(f"\n  {replayer.skipped} request(s) skipped: their job's submission failed or was not captured")
+    if replayer.throttled:
+        print(f"\n  {replayer.throttled} request(s) rejected with 429 and counted as errors: "
+              "run the server under test without tenant quotas or raise them")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved report to {args.save}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured traffic against a server")
+    parser.add_argument("traces", nargs="+", help="JSONL trace files written by TRAFFIC_CAPTURE_PATH")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--speed", default="1", help="Time compression: 1, 10, ... or max")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Requests in flight at once")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N requests")
+    parser.add_argument("--save", help="Write this run's report (JSON) for a later --compare")
+    parser.add_argument("--compare", help="Report from an earlier --save to compare against")
+    args = parser.parse_args()
+    if args.speed != "max":
+        try:
+            if float(args.speed) <= 0:
+                raise ValueError
+        except ValueError:
+            parser.error("--speed must be a positive number or 'max'")
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -0,0 +1,135 @@
+"""
+Result Storage
+==============
+Job results are stored as chunked blobs instead of one string in the job
+record, so large reports neither bloat the job store nor get re-sent with
+every /status poll. Results up to RESULT_INLINE_MAX bytes also stay inline in
+the job record, which keeps plain MIP-003 clients working for typical
+results; larger ones are only available from GET /result.
+
+- FileResultStore:  one file per result under RESULT_STORE_DIR (memory backend)
+- RedisResultStore: a list of RESULT_CHUNK_SIZE chunks per result, shared by
+                    all replicas (redis backend)
+
+Blobs are keyed by job id and execution run id, so a superseded execution
+attempt can never overwrite the result of the attempt that owns the job.
+"""
+
+import os
+import hashlib
+import asyncio
+from typing import AsyncIterator, Dict, Optional
+
+RESULT_STORE_DIR = os.getenv("RESULT_STORE_DIR", "data/results")
+RESULT_CHUNK_SIZE = int(os.getenv("RESULT_CHUNK_SIZE", 64 * 1024))
+RESULT_INLINE_MAX = int(os.getenv("RESULT_INLINE_MAX", 64 * 1024))
+
+
+def blob_ref(job_id: str, run_id: Optional[str]) -> str:
+    return f"{job_id}.{run_id}" if run_id else job_id
+
+
+class FileResultStore:
+    """Results as files on local disk."""
+
+    def __init__(self, root: str = RESULT_STORE_DIR):
+        self.root = root
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.root, ref[:2], ref)
+
+    def _write(self, ref: str, data: bytes) -> None:
+        path = self._path(ref)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            for start in range(0, len(data), RESULT_CHUNK_SIZE):
+                f.write(data[start:start + RESULT_CHUNK_SIZE])
+        os.replace(tmp, path)
+
+    async def save(self, ref: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, ref, data)
+
+    async def size(self, ref: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self._path(ref))
+        except OSError:
+            return None
+
+    async def read(self, ref: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield bytes [start, end] (inclusive) of a result in chunks."""
+        path = self._path(ref)
+        remaining = (end if end is not None else os.path.getsize(path) - 1) - start + 1
+        with open(path, "rb") as f:
+            f.seek(start)
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(RESULT_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    async def delete(self, ref: str) -> None:
+        try:
+            os.remove(self._path(ref))
+        except OSError:
+            pass
+
+
+class RedisResultStore:
+    """Results as a Redis list of fixed-size chunks."""
+
+    def __init__(self, redis, prefix: str):
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, ref: str) -> str:
+        return f"{self.prefix}result:{ref}"
+
+    async def save(self, ref: str, data: bytes) -> None:
+        key = self._key(ref)
+        chunks = [data[i:i + RESULT_CHUNK_SIZE] for i in range(0, len(data), RESULT_CHUNK_SIZE)]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if chunks:
+                # Chunks are raw byte slices; latin-1 maps them 1:1 onto str so
+                # they survive a client created with decode_responses=True
+                pipe.rpush(key, *[c.decode("latin-1") for c in chunks])
+            pipe.set(key + ":size", len(data))
+            await pipe.execute()
+
+    async def size(self, ref: str) -> Optional[int]:
+        size = await self.redis.get(self._key(ref) + ":size")
+        return int(size) if size is not None else None
+
+    async def read(self, ref: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        if end is None:
+            end = (await self.size(ref) or 0) - 1
+        first, last = start // RESULT_CHUNK_SIZE, end // RESULT_CHUNK_SIZE
+        for index in range(first, last + 1):
+            raw = await self.redis.lindex(self._key(ref), index)
+            if raw is None:
+                return
+            chunk = raw.encode("latin-1")
+            lo = start - index * RESULT_CHUNK_SIZE if index == first else 0
+            hi = end - index * RESULT_CHUNK_SIZE + 1 if index == last else len(chunk)
+            yield chunk[lo:hi]
+
+    async def delete(self, ref: str) -> None:
+        await self.redis.delete(self._key(ref), self._key(ref) + ":size")
+
+
+def result_metadata(data: bytes, ref: str) -> Dict[str, object]:
+    """Job record fields describing a stored result."""
+    return {
+        "result_ref": ref,
+        "result_size": len(data),
+        "result_sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def create_result_store(job_backend):
+    """Results live next to the jobs: Redis for the shared backend, disk otherwise."""
+    if getattr(job_backend, "shared", False):
+        return RedisResultStore(job_backend.redis, job_backend.prefix)
+    return FileResultStore()
@@ -0,0 +1,177 @@
+"""
+Model Routing
+=============
+Chooses the model for each job instead of sending everything to MODEL_NAME.
+
+1. Rules pick the preferred model from the template, the input size, the
+   requested max_tokens and the output_format. The built-in rules send short
+   summary/bullet-point jobs to MODEL_FAST and everything else to MODEL_NAME;
+   ROUTING_RULES (JSON) replaces them:
+
+       [{"template": "research_assistant", "model": "gpt-4o"},
+        {"output_format": ["summary", "bullet_points"], "max_input_chars": 8000,
+         "max_tokens": 1000, "model": "gpt-4o-mini"}]
+
+   Every condition of a rule must hold; the first matching rule wins.
+
+2. The preferred model is followed by the rest of the fallback chain
+   (MODEL_NAME, MODEL_FAST, MODEL_FALLBACKS), tried in order when a model
+   errors or exceeds MODEL_ATTEMPT_TIMEOUT.
+
+3. Each model's latency and error rate are tracked as EWMAs. Models that
+   keep failing are benched for MODEL_COOLDOWN seconds and unhealthy models
+   (error rate or latency over their limits) move to the back of the chain,
+   so traffic steers around a struggling provider until it recovers.
+
+Without MODEL_FAST, ROUTING_RULES and MODEL_FALLBACKS every job uses
+MODEL_NAME, as before.
+"""
+
+import os
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from scaling import Ewma
+
+MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
+MODEL_FAST = os.getenv("MODEL_FAST", "")
+MODEL_FALLBACKS = [m.strip() for m in os.getenv("MODEL_FALLBACKS", "").split(",") if m.strip()]
+ROUTING_RULES = os.getenv("ROUTING_RULES", "")
+
+# Inputs up to this many characters count as small for the built-in rules
+ROUTER_SMALL_INPUT_CHARS = int(os.getenv("ROUTER_SMALL_INPUT_CHARS", 8000))
+# Seconds one model may take before the next model in the chain is tried (0: no limit)
+MODEL_ATTEMPT_TIMEOUT = float(os.getenv("MODEL_ATTEMPT_TIMEOUT", 0))
+# Health limits: models beyond them are tried last
+MODEL_MAX_ERROR_RATE = float(os.getenv("MODEL_MAX_ERROR_RATE", 0.5))
+MODEL_SLOW_SECONDS = float(os.getenv("MODEL_SLOW_SECONDS", 120))
+# Consecutive failures that bench a model, and for how long
+MODEL_FAILURE_THRESHOLD = int(os.getenv("MODEL_FAILURE_THRESHOLD", 3))
+MODEL_COOLDOWN = float(os.getenv("MODEL_COOLDOWN", 60))
+
+
+def input_size(input_data: Dict[str, Any]) -> int:
+    """Characters of text in a job's input."""
+    return sum(len(v) for v in input_data.values() if isinstance(v, str))
+
+
+def _default_rules() -> List[Dict[str, Any]]:
+    if not MODEL_FAST:
+        return []
+    return [{
+        "output_format": ["summary", "bullet_points"],
+        "max_input_chars": ROUTER_SMALL_INPUT_CHARS,
+        "max_tokens": 1000,
+        "model": MODEL_FAST,
+    }]
+
+
+def _requested_tokens(input_data: Dict[str, Any]) -> Optional[float]:
+    """The job's max_tokens as a number, or None when missing or not numeric."""
+    try:
+        return float(input_data["max_tokens"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _matches(rule: Dict[str, Any], template: str, input_data: Dict[str, Any], size: int) -> bool:
+    def one_of(key: str, value: Any) -> bool:
+        allowed = rule[key]
+        return value in (allowed if isinstance(allowed, list) else [allowed])
+
+    if "template" in rule and not one_of("template", template):
+        return False
+    if "output_format" in rule and not one_of("output_format", input_data.get("output_format")):
+        return False
+    if "min_input_chars" in rule and size < rule["min_input_chars"]:
+        return False
+    if "max_input_chars" in rule and size > rule["max_input_chars"]:
+        return False
+    # Token conditions never match a job without a numeric max_tokens
+    requested = _requested_tokens(input_data)
+    if "max_tokens" in rule and (requested is None or requested > rule["max_tokens"]):
+        return False
+    if "min_tokens" in rule and (requested is None or requested < rule["min_tokens"]):
+        return False
+    return True
+
+
+class ModelHealth:
+    """Latency / error EWMAs and a failure cooldown for one model."""
+
+    def __init__(self):
+        self.latency = Ewma()
+        self.error_rate = Ewma(alpha=0.1)
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.benched_until = 0.0
+
+    def healthy(self) -> bool:
+        if time.monotonic() < self.benched_until:
+            return False
+        return self.error_rate.get() <= MODEL_MAX_ERROR_RATE and self.latency.get() <= MODEL_SLOW_SECONDS
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "avg_latency_seconds": round(self.latency.get(), 3),
+            "error_rate": round(self.error_rate.get(), 3),
+            "healthy": self.healthy(),
+            "benched_seconds": round(max(self.benched_until - time.monotonic(), 0), 1),
+        }
+
+
+class ModelRouter:
+    """Rule-based model choice plus a health-ordered fallback chain."""
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None):
+        self.rules = rules if rules is not None else (json.loads(ROUTING_RULES) if ROUTING_RULES else _default_rules())
+        chain = [MODEL_NAME, MODEL_FAST, *MODEL_FALLBACKS, *(r["model"] for r in self.rules)]
+        self.models = list(dict.fromkeys(m for m in chain if m))
+        self.health: Dict[str, ModelHealth] = {m: ModelHealth() for m in self.models}
+        self.routed: Dict[str, int] = {m: 0 for m in self.models}
+
+    def select(self, template: str, input_data: Dict[str, Any]) -> str:
+        """The preferred model for a job according to the rules."""
+        size = input_size(input_data)
+        for rule in self.rules:
+            if _matches(rule, template, input_data, size):
+                return rule["model"]
+        return MODEL_NAME
+
+    def route(self, template: str, input_data: Dict[str, Any]) -> List[str]:
+        """Models to try for a job, in order."""
+        preferred = self.select(template, input_data)
+        self.routed[preferred] = self.routed.get(preferred, 0) + 1
+        chain = [preferred] + [m for m in self.models if m != preferred]
+        # Stable: healthy models keep their order ahead of unhealthy ones
+        return sorted(chain, key=lambda m: not self._health(m).healthy())
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        health = self._health(model)
+        health.calls += 1
+        health.latency.add(latency)
+        health.error_rate.add(0.0 if ok else 1.0)
+        if ok:
+            health.consecutive_failures = 0
+            return
+        health.failures += 1
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= MODEL_FAILURE_THRESHOLD:
+            health.benched_until = time.monotonic() + MODEL_COOLDOWN
+            health.consecutive_failures = 0
+            print(f"⚠️  Model {model} benched for {MODEL_COOLDOWN:.0f}s after repeated failures")
+
+    def _health(self, model: str) -> ModelHealth:
+        if model not in self.health:
+            self.health[model] = ModelHealth()
+        return self.health[model]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            model: {"routed": self.routed.get(model, 0), **health.stats()}
+            for model, health in self.health.items()
+        }
@@ -0,0 +1,193 @@
+"""
+Autoscaling Signals & Agent Pre-Warming
+=======================================
+Load signals an autoscaler can act on (instead of CPU), and a small pool of
+pre-built agents that grows ahead of traffic ramps.
+
+- ScalingMonitor turns backend-wide state into queue depth, worker
+  saturation, predicted drain time and a desired replica count. Arrivals come
+  from the backend's job counter (sampled by every process), run time and
+  queue wait from the exponentially weighted averages each worker reports in
+  its heartbeat, so the API tier sees the whole cluster, not itself.
+- AgentPool keeps agents constructed ahead of time. Its target size follows
+  the arrival rate (PREWARM_LOOKAHEAD seconds of expected arrivals), so a
+  ramp is met with warm agents rather than construction on the hot path.
+"""
+
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+PREWARM_MIN = int(os.getenv("PREWARM_MIN", 0))
+PREWARM_MAX = int(os.getenv("PREWARM_MAX", 8))
+PREWARM_LOOKAHEAD = float(os.getenv("PREWARM_LOOKAHEAD", 10))
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", 2))
+
+
+class Ewma:
+    """Exponentially weighted moving average of irregular samples."""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+
+    def add(self, sample: float) -> None:
+        self.value = sample if self.value is None else self.value + self.alpha * (sample - self.value)
+
+    def get(self, default: float = 0.0) -> float:
+        return default if self.value is None else self.value
+
+
+class RateMeter:
+    """Events per second, exponentially decayed with a `half_life` in seconds."""
+
+    def __init__(self, half_life: float = 30.0):
+        self.decay = math.log(2) / half_life
+        self.rate = 0.0
+        self.updated = time.monotonic()
+
+    def _advance(self) -> None:
+        now = time.monotonic()
+        self.rate *= math.exp(-self.decay * (now - self.updated))
+        self.updated = now
+
+    def mark(self, count: int = 1) -> None:
+        self._advance()
+        self.rate += count * self.decay
+
+    def get(self) -> float:
+        self._advance()
+        return self.rate
+
+
+class ScalingMonitor:
+    """Collects queueing statistics and derives autoscaling signals."""
+
+    def __init__(self, stats: Callable[[], Awaitable[Dict[str, int]]]):
+        self._stats = stats
+        self._arrivals_seen: Optional[int] = None
+        self.arrivals = RateMeter()
+        self.completions = RateMeter()
+        self.queue_wait = Ewma()
+        self.run_time = Ewma()
+
+    async def refresh(self) -> Dict[str, int]:
+        """Read the backend stats and fold new arrivals into the arrival rate."""
+        stats = await self._stats()
+        total = stats.get("arrivals", 0)
+        if self._arrivals_seen is not None and total > self._arrivals_seen:
+            self.arrivals.mark(total - self._arrivals_seen)
+        self._arrivals_seen = total
+        return stats
+
+    def job_started(self, queue_wait: float) -> None:
+        self.queue_wait.add(max(queue_wait, 0.0))
+
+    def job_finished(self, run_time: float) -> None:
+        self.completions.mark()
+        self.run_time.add(run_time)
+
+    def report(self) -> Dict[str, float]:
+        """This worker's averages, published in its heartbeat."""
+        return {
+            "avg_run_seconds": round(self.run_time.get(), 3),
+            "avg_queue_wait_seconds": round(self.queue_wait.get(), 3),
+            "completion_rate": round(self.completions.get(), 4),
+        }
+
+    def snapshot(self, queue_depth: int, workers: List[Dict[str, Any]],
+                 default_slots_per_replica: int) -> Dict[str, Any]:
+        """Signals for the cluster described by the live worker heartbeats."""
+        capacity = sum(w.get("concurrency", 0) for w in workers)
+        busy = sum(w.get("in_flight", 0) for w in workers)
+        replicas = len({w.get("host", w.get("worker_id")) for w in workers})
+        slots_per_replica = capacity / replicas if replicas else default_slots_per_replica
+
+        def weighted(field: str, local: Ewma) -> float:
+            reported = [(w[field], w.get("concurrency", 1)) for w in workers if w.get(field)]
+            if not reported:
+                return local.get()
+            return sum(v * c for v, c in reported) / sum(c for _, c in reported)
+
+        avg_run = weighted("avg_run_seconds", self.run_time)
+        arrival_rate = self.arrivals.get()
+
+        # Jobs per second the cluster can finish when every slot is busy
+        throughput = capacity / avg_run if avg_run > 0 else 0.0
+        drain = queue_depth / throughput if throughput > 0 else (0.0 if queue_depth == 0 else None)
+
+        # Little's law: slots needed to keep up with arrivals, plus the backlog
+        needed_slots = arrival_rate * avg_run + (queue_depth / PREWARM_LOOKAHEAD if queue_depth else 0)
+        desired_replicas = max(1, math.ceil(needed_slots / max(slots_per_replica, 1)))
+
+        return {
+            "queue_depth": queue_depth,
+            "avg_queue_wait_seconds": round(weighted("avg_queue_wait_seconds", self.queue_wait), 3),
+            "avg_run_seconds": round(avg_run, 3),
+            "arrival_rate_per_second": round(arrival_rate, 4),
+            "completion_rate_per_second": round(sum(w.get("completion_rate", 0) for w in workers), 4),
+            "busy_workers": busy,
+            "worker_capacity": capacity,
+            "worker_saturation": round(busy / capacity, 3) if capacity else (1.0 if queue_depth else 0.0),
+            "replicas": replicas,
+            "predicted_drain_seconds": round(drain, 1) if drain is not None else None,
+            "desired_replicas": desired_replicas,
+        }
+
+
+class AgentPool:
+    """
+    Agents built ahead of demand. Agents hold conversation state, so each one
+    serves a single job and the pool is topped up in the background.
+    """
+
+    def __init__(self, factory: Callable[[], Any], monitor: ScalingMonitor):
+        self.factory = factory
+        self.monitor = monitor
+        self._agents: Deque[Any] = deque()
+        self.hits = 0
+        self.misses = 0
+        self.built = 0
+
+    def target_size(self) -> int:
+        expected = math.ceil(self.monitor.arrivals.get() * PREWARM_LOOKAHEAD)
+        return max(PREWARM_MIN, min(PREWARM_MAX, expected))
+
+    def acquire(self) -> Optional[Any]:
+        """Take a pre-built agent, or None if the pool is empty."""
+        if self._agents:
+            self.hits += 1
+            return self._agents.popleft()
+        self.misses += 1
+        return None
+
+    async def maintain(self) -> None:
+        """Background task keeping the pool at its target size."""
+        while True:
+            try:
+                await self.monitor.refresh()
+                while len(self._agents) < self.target_size():
+                    agent = await asyncio.to_thread(self.factory)
+                    if agent is None:
+                        break  # Mock mode: nothing to pre-build
+                    self._agents.append(agent)
+                    self.built += 1
+                while len(self._agents) > self.target_size():
+                    self._agents.pop()
+            except Exception as e:
+                print(f"Warning: agent pre-warm failed: {e}")
+            await asyncio.sleep(PREWARM_INTERVAL)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._agents),
+            "target": self.target_size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "built": self.built,
+        }
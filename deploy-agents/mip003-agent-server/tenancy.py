@@ -0,0 +1,191 @@
+"""
+Tenant Identification & Quotas
+==============================
+Resolves which tenant a request belongs to and enforces per-tenant quotas.
+
+Tenants are identified (in order of precedence) by:
+1. The tenant header (TENANT_HEADER, default `X-Tenant-ID`), only with
+   TRUST_TENANT_HEADER=true, i.e. behind a proxy that authenticates callers
+   and sets (and strips) that header itself.
+2. The `X-API-Key` header, mapped through TENANT_API_KEYS ("key:tenant,...").
+   With a mapping configured, requests without a registered key are
+   rejected.
+3. Fallback: the shared "anonymous" tenant. Without a key mapping, keys and
+   headers are not trusted, so a caller cannot mint a fresh tenant (and a
+   fresh rate limit and scheduler share) by changing them.
+
+Quotas are opt-in: until a TENANT_* limit, TENANT_QUOTAS or TENANT_API_KEYS
+is set every limit is 0 (unlimited), so a single-tenant deployment is not
+throttled. Once enabled, unset limits take the defaults below, and
+TENANT_QUOTAS (JSON) overrides them per tenant, e.g.:
+
+    TENANT_QUOTAS='{"acme": {"max_concurrent": 8, "rate_per_minute": 120, "weight": 4}}'
+"""
+
+import os
+import json
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+
+API_KEY_HEADER = "X-API-Key"
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant-ID")
+TRUST_TENANT_HEADER = os.getenv("TRUST_TENANT_HEADER", "false").lower() == "true"
+DEFAULT_TENANT = "anonymous"
+
+
+@dataclass(frozen=True)
+class TenantQuota:
+    """Per-tenant limits; 0 means unlimited."""
+
+    max_concurrent: int = 0       # Jobs of this tenant running at once
+    max_queued: int = 0           # Jobs of this tenant waiting in the queue
+    rate_per_minute: float = 0    # Sustained /start_job admissions
+    burst: int = 0                # Admissions allowed back-to-back
+    weight: float = 1.0           # Share of the scheduler relative to others
+
+
+# Setting any of these switches quotas on
+_QUOTA_ENV = (
+    "TENANT_MAX_CONCURRENT", "TENANT_MAX_QUEUED", "TENANT_RATE_PER_MINUTE",
+    "TENANT_BURST", "TENANT_QUOTAS", "TENANT_API_KEYS",
+)
+# Limits that apply once quotas are on, unless set explicitly
+_ENABLED_DEFAULTS = TenantQuota(max_concurrent=2, max_queued=100, rate_per_minute=30, burst=10)
+
+
+def quotas_enabled() -> bool:
+    return any(os.getenv(name) for name in _QUOTA_ENV)
+
+
+def _default_quota() -> TenantQuota:
+    base = _ENABLED_DEFAULTS if quotas_enabled() else TenantQuota()
+    return TenantQuota(
+        max_concurrent=int(os.getenv("TENANT_MAX_CONCURRENT") or base.max_concurrent),
+        max_queued=int(os.getenv("TENANT_MAX_QUEUED") or base.max_queued),
+        rate_per_minute=float(os.getenv("TENANT_RATE_PER_MINUTE") or base.rate_per_minute),
+        burst=int(os.getenv("TENANT_BURST") or base.burst),
+        weight=float(os.getenv("TENANT_WEIGHT") or base.weight),
+    )
+
+
+def _parse_api_keys(raw: str) -> Dict[str, str]:
+    """Parse "key1:tenant_a,key2:tenant_b" into a key -> tenant mapping."""
+    mapping = {}
+    for pair in raw.split(","):
+        if ":" in pair:
+            key, tenant = pair.split(":", 1)
+            mapping[key.strip()] = tenant.strip()
+    return mapping
+
+
+class TenantRegistry:
+    """Resolves tenants and holds their quota configuration."""
+
+    def __init__(
+        self,
+        default_quota: Optional[TenantQuota] = None,
+        overrides: Optional[Dict[str, TenantQuota]] = None,
+        api_keys: Optional[Dict[str, str]] = None,
+        trust_tenant_header: bool = TRUST_TENANT_HEADER,
+    ):
+        self.default_quota = default_quota or TenantQuota()
+        self.overrides = overrides or {}
+        self.api_keys = api_keys or {}
+        self.trust_tenant_header = trust_tenant_header
+
+    @classmethod
+    def from_env(cls) -> "TenantRegistry":
+        default = _default_quota()
+        overrides = {
+            tenant: replace(default, **values)
+            for tenant, values in json.loads(os.getenv("TENANT_QUOTAS", "{}")).items()
+        }
+        return cls(
+            default_quota=default,
+            overrides=overrides,
+            api_keys=_parse_api_keys(os.getenv("TENANT_API_KEYS", "")),
+        )
+
+    def quota(self, tenant: str) -> TenantQuota:
+        return self.overrides.get(tenant, self.default_quota)
+
+    def resolve(self, headers) -> Optional[str]:
+        """
+        Resolve the tenant for a request's headers. Returns None when a key
+        registry is configured and no registered API key is presented.
+        """
+        if self.trust_tenant_header:
+            tenant = headers.get(TENANT_HEADER)
+            if tenant:
+                return tenant.strip()[:64]
+
+        if self.api_keys:
+            return self.api_keys.get(headers.get(API_KEY_HEADER) or "")
+
+        return DEFAULT_TENANT
+
+
+class TokenBucket:
+    """Classic token bucket used for per-tenant admission rate limits."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> Tuple[bool, float]:
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        if self.rate <= 0:
+            return False, 60.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-tenant admission rate limiting."""
+
+    # Seconds between sweeps for idle buckets
+    EVICT_INTERVAL = 60.0
+
+    def __init__(self, registry: TenantRegistry):
+        self.registry = registry
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._swept = time.monotonic()
+
+    def check(self, tenant: str) -> Tuple[bool, float]:
+        now = time.monotonic()
+        if now - self._swept >= self.EVICT_INTERVAL:
+            self._evict(now)
+        bucket = self._buckets.get(tenant)
+        if bucket is None:
+            quota = self.registry.quota(tenant)
+            if quota.rate_per_minute <= 0:
+                return True, 0.0  # Unlimited
+            bucket = TokenBucket(quota.rate_per_minute / 60.0, max(quota.burst, 1))
+            self._buckets[tenant] = bucket
+        return bucket.take()
+
+    def _evict(self, now: float) -> None:
+        """
+        Drop buckets idle long enough to have refilled: a full bucket is
+        exactly what a new one would be, so nothing is forgotten.
+        """
+        self._swept = now
+        idle = [
+            tenant for tenant, b in self._buckets.items()
+            if b.rate > 0 and (now - b.updated) * b.rate + b.tokens >= b.capacity
+        ]
+        for tenant in idle:
+            del self._buckets[tenant]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
@@ -0,0 +1,28 @@
+import os
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    # No lifespan: these endpoints only read the job store
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("path", ["/jobs", "/tenants", "/workers"])
+def test_admin_endpoints_need_token(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert client.get(path, headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_job_history_needs_token(client):
+    assert client.get("/status/history", params={"job_id": "unknown"}).status_code == 401
+    headers = {"X-Admin-Token": "secret"}
+    assert client.get("/status/history", params={"job_id": "unknown"}, headers=headers).status_code == 404
@@ -0,0 +1,58 @@
+import time
+import asyncio
+
+import pytest
+
+from analytics import Analytics
+from job_backend import MemoryJobBackend, RedisJobBackend
+from tenancy import TenantRegistry
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_backend(kind):
+    if kind == "memory":
+        return MemoryJobBackend(TenantRegistry(), log_dir="")
+    return RedisJobBackend(TenantRegistry(), client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+
+def finished_job(job_id, status, tokens, cost):
+    now = time.time()
+    return {"job_id": job_id, "status": status, "tenant": "acme", "model": "gpt-4o-mini",
+            "created_at": now - 3, "enqueued_at": now - 3, "started_at": now - 2, "completed_at": now,
+            "prompt_tokens": tokens, "completion_tokens": tokens // 2, "cost_usd": cost}
+
+
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+def test_samples_are_shared_through_the_backend(kind):
+    backend = make_backend(kind)
+
+    async def run():
+        # A worker records, the API process (another Analytics instance) reports
+        worker = Analytics(backend)
+        await worker.record(finished_job("j1", "completed", 100, 0.01), "general")
+        await worker.record(finished_job("j2", "failed", 40, 0.004), "general")
+        return await Analytics(backend).summary(window=60, group_by="status")
+
+    summary = asyncio.run(run())
+    assert summary["recorded"] == summary["buffered"] == 2
+    assert summary["overall"]["jobs"] == 2
+    assert summary["overall"]["failed"] == 1
+    failed = summary["groups"]["failed"]
+    assert failed["tokens"]["prompt"] == 40
+    assert failed["cost_usd"]["total"] == 0.004
+
+
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+def test_oldest_samples_are_dropped(kind):
+    backend = make_backend(kind)
+
+    async def run():
+        analytics = Analytics(backend, size=3)
+        for i in range(5):
+            await analytics.record(finished_job(f"j{i}", "completed", 10, 0.0), "general")
+        return await analytics.summary(window=60)
+
+    summary = asyncio.run(run())
+    assert (summary["recorded"], summary["buffered"]) == (5, 3)
+    assert summary["overall"]["jobs"] == 3
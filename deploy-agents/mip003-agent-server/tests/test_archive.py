@@ -0,0 +1,31 @@
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from archive import Archiver, query_archive  # noqa: E402
+from job_backend import MemoryJobBackend  # noqa: E402
+from result_store import FileResultStore  # noqa: E402
+from tenancy import TenantRegistry  # noqa: E402
+
+
+def test_rows_keep_the_template_the_job_was_submitted_with(tmp_path):
+    backend = MemoryJobBackend(TenantRegistry(), log_dir="")
+    archiver = Archiver(backend, FileResultStore(str(tmp_path / "results")), directory=str(tmp_path / "archive"))
+
+    async def run():
+        finished = time.time() - 10
+        for job_id, template in (("j1", "code_review"), ("j2", "research_assistant"), ("j3", None)):
+            await backend.create_job({"job_id": job_id, "status": "completed", "tenant": "acme",
+                                      "template": template, "result": "ok",
+                                      "created_at": finished, "completed_at": finished})
+        return await archiver.archive_once(older_than=0)
+
+    assert asyncio.run(run()) == 3
+    rows = query_archive(str(tmp_path / "archive"), columns=["job_id", "template"])
+    assert {r["job_id"]: r["template"] for r in rows} == {
+        "j1": "code_review", "j2": "research_assistant", "j3": None,
+    }
+    assert backend.jobs == {}
@@ -0,0 +1,138 @@
+import os
+import asyncio
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import pytest  # noqa: E402
+
+import chunking  # noqa: E402
+import main  # noqa: E402
+from agent_templates import TEMPLATES  # noqa: E402
+from chunking import chunked_field, reduce_batches, split_text  # noqa: E402
+from job_backend import MemoryJobBackend  # noqa: E402
+from prompts import compile_template  # noqa: E402
+
+
+def test_short_text_is_one_chunk():
+    assert split_text("hello\n\nworld", size=100) == ["hello\n\nworld"]
+
+
+def test_text_is_cut_at_block_boundaries():
+    blocks = [f"def f{i}():\n    return {i}" for i in range(6)]
+    chunks = split_text("\n\n".join(blocks), size=60)
+
+    assert chunks == ["\n\n".join(blocks[i:i + 2]) for i in range(0, 6, 2)]
+    assert all(len(chunk) <= 60 for chunk in chunks)
+
+
+def test_chunks_do_not_overlap_or_drop_text():
+    text = "\n\n".join(f"paragraph {i} " + "word " * (i % 7) for i in range(40))
+    chunks = split_text(text, size=80)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 80 for chunk in chunks)
+    # Each block lands in exactly one chunk, in order
+    assert "\n\n".join(chunks).split() == text.split()
+
+
+def test_oversized_block_falls_back_to_lines_and_characters():
+    block = "short line\n" + "x" * 25 + "\nlast line"
+    chunks = split_text(block, size=10)
+
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == block.replace("\n", "")
+
+
+def test_tabular_chunks_repeat_the_header():
+    rows = [f"{i},{i * i},row-{i}" for i in range(30)]
+    text = "\n".join(["n,square,label"] + rows)
+    chunks = split_text(text, size=100)
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith("n,square,label\n") for chunk in chunks)
+    assert [line for chunk in chunks for line in chunk.splitlines()[1:]] == rows
+
+
+def test_chunked_field(monkeypatch):
+    monkeypatch.setattr(chunking, "CHUNK_THRESHOLD_CHARS", 10)
+    big, small = "x" * 11, "x" * 10
+
+    assert chunked_field("data_analysis", {"data": big}) == "data"
+    assert chunked_field("code_review", {"code": big}) == "code"
+    assert chunked_field("data_analysis", {"data": small}) is None
+    assert chunked_field("data_analysis", {"data": 12345678901}) is None
+    assert chunked_field("general", {"task": big, "context": big}) is None
+
+    monkeypatch.setattr(chunking, "CHUNKING_ENABLED", False)
+    assert chunked_field("data_analysis", {"data": big}) is None
+
+
+def test_reduce_batches():
+    assert reduce_batches(["aaaa", "bbbb", "cc"], size=10) == [["aaaa", "bbbb", "cc"]]
+    assert reduce_batches(["aaaa", "bbbb", "cccc"], size=10) == [["aaaa", "bbbb"], ["cccc"]]
+    # A partial larger than a batch still gets a batch of its own
+    assert reduce_batches(["a" * 20, "bb", "cc"], size=10) == [["a" * 20], ["bb", "cc"]]
+    assert reduce_batches([], size=10) == []
+
+
+@pytest.fixture
+def chunked_job(monkeypatch):
+    """A data_analysis job whose `data` splits into three chunks, run one at a time."""
+    schema_fn, role = TEMPLATES["data_analysis"]
+    monkeypatch.setattr(main, "prompt_template", compile_template("data_analysis", role, schema_fn()))
+    monkeypatch.setattr(main, "CHUNK_CONCURRENCY", 1)
+    backend = MemoryJobBackend(main.tenants, log_dir="")
+    monkeypatch.setattr(main, "job_backend", backend)
+
+    block = "y" * (chunking.CHUNK_SIZE_CHARS - 10)
+    input_data = {"data": "\n\n".join([block] * 3), "analysis_type": "descriptive"}
+    return backend, input_data
+
+
+def run_job(backend, input_data):
+    async def run():
+        await backend.create_job({"job_id": "j1", "status": main.JobStatus.QUEUED, "run_id": "r1",
+                                  "input_data": input_data, "tenant": "default"})
+        await main.execute_agent_task("j1", input_data, run_id="r1")
+        return await backend.get_job("j1")
+
+    return asyncio.run(run())
+
+
+def test_chunked_job_maps_then_reduces(chunked_job, monkeypatch):
+    backend, input_data = chunked_job
+    prompts = []
+
+    async def run_agent(prompt, chain):
+        prompts.append(prompt)
+        return f"analysis {len(prompts)}", chain[0]
+
+    monkeypatch.setattr(main, "run_agent", run_agent)
+    job = run_job(backend, input_data)
+
+    assert job["status"] == main.JobStatus.COMPLETED
+    assert job["chunks"] == 3
+    assert [f"part {i} of 3" in p for i, p in enumerate(prompts[:3], 1)] == [True] * 3
+    assert "Partial Analyses" in prompts[3] and "analysis 3" in prompts[3]
+    assert job["result"] == "analysis 4"
+
+
+def test_failed_chunk_fails_the_job(chunked_job, monkeypatch):
+    backend, input_data = chunked_job
+    calls = []
+
+    async def run_agent(prompt, chain):
+        calls.append(prompt)
+        if len(calls) == 2:
+            raise RuntimeError("chunk 2 failed")
+        return "partial", chain[0]
+
+    monkeypatch.setattr(main, "run_agent", run_agent)
+    job = run_job(backend, input_data)
+
+    assert job["status"] == main.JobStatus.FAILED
+    assert job["error"] == "chunk 2 failed"
+    # The remaining chunk was cancelled and nothing was merged
+    assert len(calls) == 2
+    assert job.get("chunks") is None
+    assert job["progress"] < 0.9
@@ -0,0 +1,133 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, negotiate
+
+BIG = "x" * 4096
+
+
+@pytest.fixture
+def all_encodings(monkeypatch):
+    monkeypatch.setattr(compression, "available_encodings", lambda: ("br", "zstd", "gzip"))
+
+
+@pytest.mark.parametrize("header,encoding", [
+    (None, None),
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip;q=0.2", "gzip"),
+    ("zstd; level=3; q=0.9, gzip;q=0.8", "zstd"),
+    ("*", "br"),
+    ("*;q=0.5, br;q=0", "zstd"),
+    ("identity", None),
+    ("identity;q=0", None),
+    ("gzip;q=0, identity;q=0", None),
+    ("deflate, gzip;q=abc", None),
+])
+def test_negotiate(all_encodings, header, encoding):
+    assert negotiate(header) == encoding
+
+
+def test_negotiate_skips_encodings_that_are_not_installed(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    monkeypatch.setattr(compression, "zstandard", None)
+    assert negotiate("br, zstd, gzip;q=0.1") == "gzip"
+    assert negotiate("br") is None
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BIG, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/vary")
+    def vary():
+        return PlainTextResponse(BIG, headers={"Vary": "Origin"})
+
+    @app.get("/encoded")
+    def encoded():
+        body = gzip.compress(BIG.encode())
+        return Response(body, media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/image")
+    def image():
+        return Response(b"\0" * 4096, media_type="image/png")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([f"data: {BIG}\n\n"]), media_type="text/event-stream")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(["a" * 100, "b" * 100, "c" * 100]), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def gzip_get(client, path):
+    return client.get(path, headers={"Accept-Encoding": "gzip"})
+
+
+def test_large_response_is_compressed(client):
+    response = gzip_get(client, "/big")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == 'W/"abc"'
+    assert int(response.headers["Content-Length"]) < len(BIG)
+    assert response.text == BIG
+
+
+def test_small_response_is_not_compressed(client):
+    response = gzip_get(client, "/small")
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "tiny"
+
+
+def test_refused_identity_compresses_small_responses(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip, identity;q=0"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.text == "tiny"
+
+
+def test_no_accept_encoding_is_not_compressed(client):
+    response = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+
+
+def test_existing_vary_is_extended(client):
+    response = gzip_get(client, "/vary")
+    assert response.headers.get_list("Vary") == ["Origin, Accept-Encoding"]
+
+
+@pytest.mark.parametrize("path", ["/encoded", "/image", "/events"])
+def test_passthrough(client, path):
+    response = gzip_get(client, path)
+    assert response.headers.get("Vary") is None
+    if path == "/encoded":
+        assert response.text == BIG  # Decoded once by the client, not twice
+    else:
+        assert "Content-Encoding" not in response.headers
+
+
+def test_streaming_response_is_compressed_incrementally(client):
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw) == b"a" * 100 + b"b" * 100 + b"c" * 100
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+import concurrency
+from concurrency import AdaptiveLimiter, ConcurrencyLimits
+
+
+@pytest.fixture(autouse=True)
+def bounds(monkeypatch):
+    monkeypatch.setattr(concurrency, "ADAPTIVE_MIN_LIMIT", 2)
+    monkeypatch.setattr(concurrency, "ADAPTIVE_MAX_LIMIT", 20)
+
+
+async def full_window(limiter, latency, ok=True):
+    """Run one window of calls with the whole limit in use."""
+    n = limiter.limit
+    for _ in range(n):
+        await limiter.acquire()
+    for _ in range(n):
+        limiter.release(latency, ok=ok)
+
+
+def run_windows(limiter, latencies, ok=True):
+    """Limit after each window of `latencies`."""
+    async def run():
+        limits = []
+        for latency in latencies:
+            await full_window(limiter, latency, ok)
+            limits.append(limiter.limit)
+        return limits
+
+    return asyncio.run(run())
+
+
+def test_limit_grows_while_latency_stays_flat():
+    limiter = AdaptiveLimiter("m", initial=4)
+    limits = run_windows(limiter, [1.0] * 15)
+
+    assert limits == sorted(limits)
+    assert limits[-1] > 4
+
+
+def test_limit_never_exceeds_max():
+    limiter = AdaptiveLimiter("m", initial=4)
+    assert max(run_windows(limiter, [1.0] * 100)) == 20
+    assert AdaptiveLimiter("m", initial=500).limit == 20
+
+
+def test_limit_shrinks_when_latency_rises():
+    limiter = AdaptiveLimiter("m", initial=16)
+    run_windows(limiter, [1.0] * 5)
+    before = limiter.limit
+    limits = run_windows(limiter, [4.0] * 5)
+
+    assert limits[-1] < before
+    assert limits == sorted(limits, reverse=True)
+
+
+def test_latency_within_tolerance_does_not_shrink():
+    limiter = AdaptiveLimiter("m", initial=8)
+    run_windows(limiter, [1.0] * 5)
+    before = limiter.limit
+    assert min(run_windows(limiter, [1.4] * 5)) >= before
+
+
+def test_limit_never_drops_below_min():
+    limiter = AdaptiveLimiter("m", initial=8)
+    run_windows(limiter, [1.0] * 3)
+    # Inflated latency alone settles where limit * 0.5 + sqrt(limit) == limit
+    assert min(run_windows(limiter, [50.0] * 40)) == 4
+    assert min(run_windows(limiter, [1.0] * 20, ok=False)) == 2
+    assert AdaptiveLimiter("m", initial=0).limit == 2
+
+
+def test_errors_back_off_multiplicatively(monkeypatch):
+    monkeypatch.setattr(concurrency, "ADAPTIVE_BACKOFF", 0.5)
+    limiter = AdaptiveLimiter("m", initial=16)
+    assert run_windows(limiter, [1.0] * 3, ok=False) == [8, 4, 2]
+    assert limiter.dropped == 28
+
+
+def test_idle_model_does_not_grow():
+    limiter = AdaptiveLimiter("m", initial=8)
+
+    async def run():
+        for _ in range(100):  # One call at a time: peak in-flight stays at 1
+            await limiter.acquire()
+            limiter.release(1.0)
+
+    asyncio.run(run())
+    assert limiter.limit == 8
+
+
+def test_cancelled_calls_are_not_sampled():
+    limiter = AdaptiveLimiter("m", initial=2)
+
+    async def run():
+        for _ in range(10):
+            await limiter.acquire()
+            limiter.release(100.0, sample=False)
+
+    asyncio.run(run())
+    assert (limiter.limit, limiter.calls, limiter.inflight) == (2, 0, 0)
+
+
+def test_calls_over_the_limit_wait_for_a_slot():
+    limiter = AdaptiveLimiter("m", initial=2)
+
+    async def run():
+        await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        cancelled = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done() and len(limiter.waiters) == 2
+
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        limiter.release(1.0)
+        await waiter
+        return limiter.inflight, len(limiter.waiters), limiter.waited
+
+    assert asyncio.run(run()) == (2, 0, 2)
+
+
+def test_one_limiter_per_model():
+    limits = ConcurrencyLimits(enabled=True)
+    assert limits.get("a") is limits.get("a")
+    assert limits.get("a") is not limits.get("b")
+    assert set(limits.stats(history=True)["models"]) == {"a", "b"}
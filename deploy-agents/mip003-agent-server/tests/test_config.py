@@ -0,0 +1,14 @@
+import os
+import sys
+import subprocess
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_unknown_agent_template_fails_at_startup():
+    env = {**os.environ, "AGENT_TEMPLATE": "no-such-template", "MOCK_LLM": "true"}
+    proc = subprocess.run([sys.executable, "-c", "import main"], cwd=SERVER_DIR, env=env,
+                          capture_output=True, text=True, timeout=60)
+    assert proc.returncode != 0
+    assert "Unknown AGENT_TEMPLATE 'no-such-template'" in proc.stderr
+    assert "general, content_writer" in proc.stderr
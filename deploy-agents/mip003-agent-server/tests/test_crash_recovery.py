@@ -0,0 +1,96 @@
+import os
+import asyncio
+
+import pytest
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import main  # noqa: E402
+import job_backend  # noqa: E402
+from job_backend import RedisJobBackend  # noqa: E402
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def test_dead_workers_job_is_requeued_once_with_new_run_id(monkeypatch):
+    backend = RedisJobBackend(main.tenants, client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    monkeypatch.setattr(main, "job_backend", backend)
+    monkeypatch.setattr(main, "HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(main, "in_flight_jobs", {})
+
+    async def scenario():
+        await backend.create_job({"job_id": "j1", "status": main.JobStatus.QUEUED, "tenant": "acme",
+                                  "run_id": "", "attempts": 0, "input_data": {"task": "hi"}})
+        await backend.enqueue("acme", "j1")
+
+        # Worker A claims the job, starts it, then dies: no more heartbeats,
+        # so its claim lapses after the visibility timeout
+        monkeypatch.setattr(job_backend, "VISIBILITY_TIMEOUT", 0.1)
+        assert await backend.try_dequeue() == ("acme", "j1")
+        first_run = await main.claim_job(await backend.get_job("j1"))
+        await backend.update_job("j1", guard_run_id=first_run, status=main.JobStatus.RUNNING)
+        await asyncio.sleep(0.15)
+
+        # Worker B's heartbeats reclaim it; several beats must not requeue it twice
+        monkeypatch.setattr(job_backend, "VISIBILITY_TIMEOUT", 60)
+        requeued = []
+        original = backend.requeue_expired
+
+        async def tracking_requeue_expired():
+            ids = await original()
+            requeued.extend(ids)
+            return ids
+
+        monkeypatch.setattr(backend, "requeue_expired", tracking_requeue_expired)
+        heartbeat = asyncio.create_task(main.worker_heartbeat("worker", 1))
+        await asyncio.sleep(0.3)
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+
+        job = await backend.get_job("j1")
+        assert job["status"] == main.JobStatus.QUEUED
+        assert (await backend.stats())["queued"] == 1
+
+        # Worker B runs it under a new run_id; worker A's late writes are dropped
+        assert await backend.try_dequeue() == ("acme", "j1")
+        assert await backend.try_dequeue() is None
+        second_run = await main.claim_job(job)
+        late_write = await backend.update_job("j1", guard_run_id=first_run, status=main.JobStatus.FAILED)
+        return requeued, first_run, second_run, late_write, await backend.get_job("j1")
+
+    requeued, first_run, second_run, late_write, job = asyncio.run(scenario())
+    assert requeued == ["j1"]
+    assert second_run is not None and second_run != first_run
+    assert job["run_id"] == second_run and job["attempts"] == 2
+    assert late_write is False
+    assert job["status"] == main.JobStatus.QUEUED
+
+
+def test_finished_but_unacked_job_is_not_run_again(monkeypatch):
+    backend = RedisJobBackend(main.tenants, client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    monkeypatch.setattr(main, "job_backend", backend)
+    monkeypatch.setattr(main, "HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(main, "in_flight_jobs", {})
+
+    async def scenario():
+        await backend.create_job({"job_id": "j1", "status": main.JobStatus.QUEUED, "tenant": "acme",
+                                  "run_id": "", "attempts": 0, "input_data": {"task": "hi"}})
+        await backend.enqueue("acme", "j1")
+
+        # The job completes, but the worker's lease lapses before it acks
+        monkeypatch.setattr(job_backend, "VISIBILITY_TIMEOUT", 0.1)
+        await backend.try_dequeue()
+        run_id = await main.claim_job(await backend.get_job("j1"))
+        await backend.update_job("j1", guard_run_id=run_id, status=main.JobStatus.COMPLETED, progress=1.0)
+        await asyncio.sleep(0.15)
+
+        heartbeat = asyncio.create_task(main.worker_heartbeat("worker", 1))
+        await asyncio.sleep(0.2)
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        return await backend.get_job("j1"), await backend.stats(), await backend.try_dequeue()
+
+    job, stats, next_item = asyncio.run(scenario())
+    assert job["status"] == main.JobStatus.COMPLETED and job["progress"] == 1.0
+    assert stats["queued"] == 0 and stats["running"] == 0
+    assert next_item is None
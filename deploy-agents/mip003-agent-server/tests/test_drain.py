@@ -0,0 +1,93 @@
+import os
+import time
+import asyncio
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from job_backend import MemoryJobBackend  # noqa: E402
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Fresh job store and drain state; the agent counts as warm."""
+    backend = MemoryJobBackend(main.tenants, log_dir="")
+    monkeypatch.setattr(main, "job_backend", backend)
+    monkeypatch.setattr(main, "draining", asyncio.Event())
+    monkeypatch.setattr(main, "stopping", asyncio.Event())
+    monkeypatch.setattr(main, "in_flight_jobs", {})
+    ready = asyncio.Event()
+    ready.set()
+    monkeypatch.setattr(main, "agent_ready", ready)
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    return backend
+
+
+async def submit(backend, job_id):
+    now = time.time()
+    await backend.create_job({"job_id": job_id, "status": main.JobStatus.QUEUED, "tenant": "default",
+                              "input_data": {"task": "hi"}, "run_id": "", "attempts": 0,
+                              "created_at": now, "enqueued_at": now})
+    await backend.enqueue("default", job_id)
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not await condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_drained_server_refuses_jobs_with_retry_after(server):
+    client = TestClient(main.app)
+    assert client.post("/drain").status_code == 401
+    assert client.post("/drain", headers={"X-Admin-Token": "secret"}).json()["draining"] is True
+
+    response = client.post("/start_job", json={"input_data": {"task": "hi"}})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(main.DRAIN_RETRY_AFTER)
+    assert client.get("/availability").json()["status"] == "unavailable"
+    assert client.get("/ready").status_code == 503
+
+
+def test_drain_keeps_working_through_the_queue(server, monkeypatch):
+    monkeypatch.setattr(main, "MOCK_LLM_LATENCY", 0)
+
+    async def run():
+        tasks = main.start_workers("api", 1)
+        try:
+            await main.drain()
+            # Queued before the drain took effect: still processed
+            await submit(server, "j1")
+
+            async def finished():
+                job = await server.get_job("j1")
+                return job["status"] == main.JobStatus.COMPLETED
+            await wait_for(finished)
+        finally:
+            await main.stop_workers(tasks, grace=1)
+
+    asyncio.run(run())
+
+
+def test_shutdown_hands_running_jobs_back(server, monkeypatch):
+    monkeypatch.setattr(main, "MOCK_LLM_LATENCY", 30)
+
+    async def run():
+        tasks = main.start_workers("api", 1)
+        await submit(server, "j1")
+
+        async def running():
+            return "j1" in main.in_flight_jobs and (await server.get_job("j1"))["status"] == main.JobStatus.RUNNING
+        await wait_for(running)
+        await main.stop_workers(tasks, grace=0.1)
+        return await server.get_job("j1"), await server.stats()
+
+    job, stats = asyncio.run(run())
+    assert job["status"] == main.JobStatus.QUEUED
+    assert job["attempts"] == 0  # The interrupted attempt is not counted
+    assert job["run_id"].startswith("handed-back-")
+    assert stats["queued"] == 1
@@ -0,0 +1,64 @@
+import time
+import asyncio
+import threading
+
+import event_log
+from event_log import EventLog
+from job_backend import MemoryJobBackend
+from tenancy import TenantRegistry
+
+
+def _flushers():
+    return [t for t in threading.enumerate() if t.name == "job-log-fsync"]
+
+
+def test_batched_append_is_synced(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_log, "JOB_LOG_FSYNC_INTERVAL", 0.01)
+    log = EventLog(str(tmp_path), fsync="batch")
+    log.open(lambda job_id, fields: None)
+    try:
+        log.append("job-1", {"status": "queued"})
+        deadline = time.monotonic() + 2
+        while log.fsyncs == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert log.fsyncs >= 1
+        assert not log._dirty
+    finally:
+        log.close()
+
+
+def test_backend_opens_log_on_start_not_construction(tmp_path):
+    before = len(_flushers())
+    backend = MemoryJobBackend(TenantRegistry(), str(tmp_path))
+    # Constructed at import, possibly in a gunicorn master before fork
+    assert len(_flushers()) == before
+
+    async def scenario():
+        await backend.start()
+        assert len(_flushers()) == before + 1
+        await backend.create_job({"job_id": "job-1", "status": "queued", "created_at": time.time()})
+        await backend.update_job("job-1", status="completed")
+        await backend.close()
+
+    asyncio.run(scenario())
+
+    reopened = MemoryJobBackend(TenantRegistry(), str(tmp_path))
+    asyncio.run(reopened.start())
+    assert reopened.jobs["job-1"].status == "completed"
+    asyncio.run(reopened.close())
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    log = EventLog(str(tmp_path), fsync="off")
+    log.open(lambda job_id, fields: None)
+    log.append("job-1", {"status": "queued"})
+    log.close()
+    segment = next(tmp_path.glob("segment-*.log"))
+    with open(segment, "ab") as f:
+        f.write(b"\x40\x00\x00\x00torn")
+
+    replayed = []
+    log = EventLog(str(tmp_path), fsync="off")
+    log.open(lambda job_id, fields: replayed.append((job_id, fields)))
+    log.close()
+    assert replayed == [("job-1", {"status": "queued"})]
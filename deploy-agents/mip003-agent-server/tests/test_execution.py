@@ -0,0 +1,51 @@
+import os
+import asyncio
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import main  # noqa: E402
+from job_backend import MemoryJobBackend  # noqa: E402
+
+
+def test_failed_job_keeps_spent_usage(monkeypatch):
+    backend = MemoryJobBackend(main.tenants, log_dir="")
+    monkeypatch.setattr(main, "job_backend", backend)
+
+    async def run_agent(prompt, chain):
+        usage = main.job_usage.get()
+        usage["prompt_tokens"] += 120
+        usage["completion_tokens"] += 30
+        usage["cost_usd"] += 0.002
+        raise RuntimeError("model fell over")
+
+    monkeypatch.setattr(main, "run_agent", run_agent)
+
+    async def run():
+        await backend.create_job({"job_id": "j1", "status": main.JobStatus.QUEUED, "run_id": "r1",
+                                  "input_data": {"task": "hi"}, "tenant": "default"})
+        await main.execute_agent_task("j1", {"task": "hi"}, run_id="r1")
+        return await backend.get_job("j1")
+
+    job = asyncio.run(run())
+    assert job["status"] == main.JobStatus.FAILED
+    assert job["error"] == "model fell over"
+    assert (job["prompt_tokens"], job["completion_tokens"], job["cost_usd"]) == (120, 30, 0.002)
+
+
+def test_mock_job_records_estimated_usage(monkeypatch):
+    backend = MemoryJobBackend(main.tenants, log_dir="")
+    monkeypatch.setattr(main, "job_backend", backend)
+    monkeypatch.setattr(main, "MOCK_LLM_LATENCY", 0)
+
+    async def run():
+        await backend.create_job({"job_id": "j1", "status": main.JobStatus.QUEUED, "run_id": "r1",
+                                  "input_data": {"task": "hi"}, "tenant": "default"})
+        await main.execute_agent_task("j1", {"task": "hi"}, run_id="r1")
+        return await backend.get_job("j1")
+
+    job = asyncio.run(run())
+    assert job["status"] == main.JobStatus.COMPLETED
+    assert job["model"] == main.model_router.route(main.prompt_template.name, {"task": "hi"})[0]
+    assert job["prompt_tokens"] > 0 and job["completion_tokens"] > 0
+    assert job["cost_usd"] > 0
+    assert job["first_token_at"] is not None
@@ -0,0 +1,147 @@
+import os
+import asyncio
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import pytest  # noqa: E402
+
+import hedging  # noqa: E402
+import main  # noqa: E402
+from hedging import HedgeBudget, Hedger, percentile  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fast_hedges(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_MIN_SAMPLES", 3)
+    monkeypatch.setattr(hedging, "HEDGE_MIN_DELAY", 0.02)
+
+
+def warmed(hedger, *models):
+    """Give `models` a latency history so calls on them can be hedged."""
+    for model in models:
+        for _ in range(3):
+            hedger.observe(model, 0.01)
+    return hedger
+
+
+def after(seconds, value=None, error=None):
+    async def call():
+        await asyncio.sleep(seconds)
+        if error:
+            raise error
+        return value
+    return call
+
+
+def test_percentile():
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+    assert percentile([5, 1, 4, 2, 3], 95) == 5
+    assert percentile([7], 1) == 7
+
+
+def test_budget_earns_per_call_up_to_burst():
+    budget = HedgeBudget(ratio=0.5, burst=2)
+    assert budget.spend() and budget.spend()
+    assert not budget.spend()
+    budget.earn()
+    assert not budget.spend()
+    budget.earn()
+    assert budget.spend()
+    for _ in range(10):
+        budget.earn()
+    assert budget.credits == 2
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = warmed(Hedger(enabled=True), "a")
+    result = asyncio.run(hedger.run("a", after(0, "A"), "b", after(0, "B")))
+    assert result == ("A", "a")
+    assert hedger.hedged == 0
+
+
+def test_no_hedge_without_latency_history():
+    hedger = Hedger(enabled=True)
+    result = asyncio.run(hedger.run("a", after(0.05, "A"), "b", after(0, "B")))
+    assert result == ("A", "a")
+    assert hedger.hedged == 0
+
+
+def test_slow_primary_loses_to_hedge():
+    hedger = warmed(Hedger(enabled=True), "a")
+    result = asyncio.run(hedger.run("a", after(1, "A"), "b", after(0, "B")))
+    assert result == ("B", "b")
+    assert (hedger.hedged, hedger.hedge_wins, hedger.primary_wins) == (1, 1, 0)
+
+
+def test_primary_can_still_win_after_hedging():
+    hedger = warmed(Hedger(enabled=True), "a")
+    result = asyncio.run(hedger.run("a", after(0.05, "A"), "b", after(1, "B")))
+    assert result == ("A", "a")
+    assert (hedger.hedged, hedger.hedge_wins, hedger.primary_wins) == (1, 0, 1)
+
+
+def test_failed_hedge_falls_back_to_primary():
+    hedger = warmed(Hedger(enabled=True), "a")
+    result = asyncio.run(hedger.run("a", after(0.1, "A"), "b", after(0, error=RuntimeError("b down"))))
+    assert result == ("A", "a")
+
+
+def test_exhausted_budget_denies_hedges():
+    hedger = warmed(Hedger(enabled=True), "a")
+    hedger.budget = HedgeBudget(ratio=0, burst=1)
+
+    async def run():
+        return [await hedger.run("a", after(0.05, "A"), "b", after(0, "B")) for _ in range(3)]
+
+    assert asyncio.run(run()) == [("B", "b"), ("A", "a"), ("A", "a")]
+    assert (hedger.hedged, hedger.budget_denied) == (1, 2)
+
+
+@pytest.fixture
+def models(monkeypatch):
+    """Scripted run_on_model: model -> (seconds, error); records every call."""
+    script, calls = {}, []
+
+    async def run_on_model(prompt, model):
+        calls.append(model)
+        seconds, error = script[model]
+        await asyncio.sleep(seconds)
+        if error:
+            raise RuntimeError(f"{model} down")
+        return model.upper()
+
+    monkeypatch.setattr(main, "load_agent_class", lambda: object)
+    monkeypatch.setattr(main, "run_on_model", run_on_model)
+    monkeypatch.setattr(main, "hedger", warmed(Hedger(enabled=True), "a", "b", "c"))
+    return script, calls
+
+
+def test_chain_falls_back_in_order(models):
+    script, calls = models
+    script.update(a=(0, True), b=(0, True), c=(0, False))
+    assert asyncio.run(main.run_agent("p", ["a", "b", "c"])) == ("C", "c")
+    assert calls == ["a", "b", "c"]
+
+
+def test_failed_hedge_is_not_retried_as_the_next_model(models):
+    script, calls = models
+    # a is slow and fails; its hedge on b fails too
+    script.update(a=(0.1, True), b=(0, True), c=(0, False))
+    assert asyncio.run(main.run_agent("p", ["a", "b", "c"])) == ("C", "c")
+    assert calls == ["a", "b", "c"]
+
+
+def test_hedge_skips_models_already_tried(models):
+    script, calls = models
+    # a fails fast, b is slow: b's hedge goes to c, which wins
+    script.update(a=(0, True), b=(1, False), c=(0, False))
+    assert asyncio.run(main.run_agent("p", ["a", "b", "c"])) == ("C", "c")
+    assert calls == ["a", "b", "c"]
+    assert main.hedger.hedge_wins == 1
+
+
+def test_duplicate_chain_entries_are_called_once(models):
+    script, calls = models
+    script.update(a=(0, True), b=(0, False))
+    assert asyncio.run(main.run_agent("p", ["a", "a", "b"])) == ("B", "b")
+    assert calls == ["a", "b"]
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import HttpClientPool, get_http_client, http_pool
+
+
+class Echo(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self):
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def echo_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Echo)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_tool_in_worker_thread_uses_the_shared_pool(echo_url):
+    pool = HttpClientPool()
+
+    def search_tool(query: str) -> str:
+        return pool.request_sync("GET", f"{echo_url}/search", params={"q": query}).text
+
+    async def run():
+        await pool.start()
+        try:
+            # Tools run inside agent.run, in a worker thread
+            return [await asyncio.to_thread(search_tool, q) for q in ("a", "b", "c")]
+        finally:
+            await pool.close()
+
+    assert asyncio.run(run()) == ["/search?q=a", "/search?q=b", "/search?q=c"]
+    stats = pool.stats()
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 1  # Kept alive and reused
+
+
+def test_request_sync_needs_a_started_pool():
+    with pytest.raises(RuntimeError):
+        HttpClientPool().request_sync("GET", "http://127.0.0.1/")
+
+
+def test_dependency_returns_the_process_client():
+    async def run():
+        try:
+            return await get_http_client() is http_pool.client
+        finally:
+            await http_pool.close()
+
+    assert asyncio.run(run())
@@ -0,0 +1,58 @@
+import os
+import asyncio
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from job_backend import MemoryJobBackend  # noqa: E402
+
+KEY = {"Idempotency-Key": "order-1"}
+BODY = {"input_data": {"task": "hi"}}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = MemoryJobBackend(main.tenants, log_dir="")
+    monkeypatch.setattr(main, "job_backend", backend)
+    return backend
+
+
+def test_retry_returns_the_first_job(backend):
+    client = TestClient(main.app)
+    first = client.post("/start_job", json=BODY, headers=KEY)
+    retry = client.post("/start_job", json=BODY, headers=KEY)
+    assert retry.status_code == 200
+    assert retry.json()["job_id"] == first.json()["job_id"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+
+def test_failed_creation_releases_the_key(backend, monkeypatch):
+    create_job = backend.create_job
+    failures = [ConnectionError("store unavailable")]
+
+    async def flaky_create_job(job):
+        if failures:
+            raise failures.pop()
+        await create_job(job)
+
+    monkeypatch.setattr(backend, "create_job", flaky_create_job)
+    client = TestClient(main.app, raise_server_exceptions=False)
+    assert client.post("/start_job", json=BODY, headers=KEY).status_code == 500
+
+    # The retry creates the job instead of replaying one that never existed
+    retry = client.post("/start_job", json=BODY, headers=KEY)
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
+    assert asyncio.run(backend.get_job(retry.json()["job_id"])) is not None
+
+
+def test_key_of_a_missing_job_is_a_conflict(backend):
+    tenant = main.tenants.resolve({})
+    asyncio.run(backend.claim_idempotency_key(tenant, "order-1", "archived-job"))
+
+    response = TestClient(main.app).post("/start_job", json=BODY, headers=KEY)
+    assert response.status_code == 409
+    assert "archived-job" in response.json()["detail"]
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import asyncio
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import job_record  # noqa: E402
+import main  # noqa: E402
+from job_backend import MemoryJobBackend  # noqa: E402
+from job_record import JobRecord, iso, public_job, to_timestamp  # noqa: E402
+from tenancy import TenantRegistry  # noqa: E402
+
+CREATED = 1767225600.25  # 2026-01-01T00:00:00.250000 UTC
+FIELDS = {
+    "job_id": "job-1",
+    "tenant": "acme",
+    "status": "completed",
+    "created_at": CREATED,
+    "started_at": "2026-01-01T00:00:05",  # Older records store ISO strings
+    "completed_at": "2026-01-01T00:01:00+00:00",
+    "input_data": {"task": "résumé ✓", "numbers": [1, 2.5], "nested": {"ok": True}},
+    "result": "line 1\nline 2 — done",
+    "prompt_tokens": 120,
+    "priority": "high",  # Not a slot: kept in `extra`
+}
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "packed"])
+def packed(request, monkeypatch):
+    monkeypatch.setattr(job_record, "JOB_PACK_PAYLOADS", request.param)
+    return request.param
+
+
+def test_timestamps_round_trip():
+    assert iso(CREATED) == "2026-01-01T00:00:00.250000"
+    assert to_timestamp(iso(CREATED)) == CREATED
+    assert to_timestamp("2026-01-01T00:00:00.250000Z") == CREATED
+    assert to_timestamp("2026-01-01T01:00:00.250000+01:00") == CREATED
+    assert iso("2026-01-01T00:00:00") == "2026-01-01T00:00:00"
+    assert iso(None) is None and to_timestamp(None) is None
+    assert to_timestamp(5) == 5
+
+
+def test_record_stores_epoch_seconds(packed):
+    record = JobRecord.from_fields(FIELDS)
+    assert record.created_at == CREATED
+    assert record.started_at == CREATED - 0.25 + 5
+    assert record.completed_at == CREATED - 0.25 + 60
+
+
+def test_payloads_are_packed_only_when_enabled(packed):
+    record = JobRecord.from_fields(FIELDS)
+    assert isinstance(record._input_data, bytes) == packed
+    assert isinstance(record._result, bytes) == packed
+    assert record.input_data == FIELDS["input_data"]
+    assert record["result"] == FIELDS["result"]
+
+
+def test_public_job_round_trip(packed):
+    public = public_job(JobRecord.from_fields(FIELDS))
+
+    assert public["created_at"] == "2026-01-01T00:00:00.250000"
+    assert public["started_at"] == "2026-01-01T00:00:05"
+    assert public["completed_at"] == "2026-01-01T00:01:00"
+    assert public["input_data"] == FIELDS["input_data"]
+    assert public["result"] == FIELDS["result"]
+    assert public["priority"] == "high"
+    assert public["first_token_at"] is None
+    json.dumps(public)  # JSON-ready
+
+    # Feeding the public form back in yields the same record
+    assert public_job(JobRecord.from_fields(public)) == public
+
+
+def test_public_job_matches_for_dicts_and_records(packed):
+    record = JobRecord.from_fields(FIELDS)
+    as_dict = public_job(record.to_fields())
+    assert as_dict == public_job(record)
+
+
+def test_mapping_interface(packed):
+    record = JobRecord.from_fields({"job_id": "job-2"})
+    assert record["status"] == "queued" and record.get("attempts", 0) == 0
+    assert record.get("result", "none yet") == "none yet"
+    assert record.get("priority") is None
+    assert "priority" not in record and "result" in record
+    with pytest.raises(KeyError):
+        record["priority"]
+
+    record.update({"status": "running", "result": None})
+    assert record.status is sys.intern("running")
+    assert record.result is None and record._result is None
+
+
+def test_event_log_replay_round_trip(packed, tmp_path):
+    async def write():
+        backend = MemoryJobBackend(TenantRegistry(), str(tmp_path))
+        await backend.start()
+        await backend.create_job({**FIELDS, "status": "queued", "result": None})
+        await backend.update_job("job-1", status="completed", result=FIELDS["result"],
+                                 completed_at=FIELDS["completed_at"])
+        expected = public_job(await backend.get_job("job-1"))
+        await backend.close()
+        return expected
+
+    async def replay():
+        backend = MemoryJobBackend(TenantRegistry(), str(tmp_path))
+        await backend.start()
+        replayed = public_job(await backend.get_job("job-1"))
+        await backend.close()
+        return replayed
+
+    expected = asyncio.run(write())
+    assert expected["result"] == FIELDS["result"]
+    assert asyncio.run(replay()) == expected
+
+
+def test_status_endpoint(packed, monkeypatch):
+    backend = MemoryJobBackend(main.tenants, log_dir="")
+    monkeypatch.setattr(main, "job_backend", backend)
+    asyncio.run(backend.create_job(FIELDS))
+
+    status = TestClient(main.app).get("/status", params={"job_id": "job-1"}).json()
+    assert status["result"] == FIELDS["result"]
+    assert status["created_at"].startswith("2026-01-01T00:00:00.25")
+    assert status["started_at"].startswith("2026-01-01T00:00:05")
+    assert status["prompt_tokens"] == 120
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+import job_backend
+from job_backend import RedisJobBackend
+from tenancy import TenantQuota, TenantRegistry
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_backend(**quota):
+    registry = TenantRegistry(default_quota=TenantQuota(**quota)) if quota else TenantRegistry()
+    return RedisJobBackend(registry, client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_dequeue_alternates_between_tenants():
+    backend = make_backend()
+
+    async def scenario():
+        for i in range(6):
+            await backend.enqueue("busy", f"busy-{i}")
+        for i in range(2):
+            await backend.enqueue("quiet", f"quiet-{i}")
+        order = []
+        while (item := await backend.try_dequeue()) is not None:
+            order.append(item[0])
+            await backend.ack(*item)
+        return order
+
+    order = run(scenario())
+    assert len(order) == 8
+    # The quiet tenant is not stuck behind the busy tenant's backlog
+    assert order[:4].count("quiet") == 2
+
+
+def test_max_concurrent_holds_back_a_tenant():
+    backend = make_backend(max_concurrent=1)
+
+    async def scenario():
+        await backend.enqueue("acme", "a1")
+        await backend.enqueue("acme", "a2")
+        first = await backend.try_dequeue()
+        blocked = await backend.try_dequeue()
+        await backend.ack(*first)
+        return first, blocked, await backend.try_dequeue()
+
+    first, blocked, second = run(scenario())
+    assert first == ("acme", "a1")
+    assert blocked is None
+    assert second == ("acme", "a2")
+
+
+def test_expired_visibility_timeout_redelivers(monkeypatch):
+    backend = make_backend()
+
+    async def scenario():
+        await backend.create_job({"job_id": "j1", "status": "queued", "run_id": ""})
+        await backend.enqueue("acme", "j1")
+        monkeypatch.setattr(job_backend, "VISIBILITY_TIMEOUT", 60)
+        claimed = await backend.try_dequeue()
+        # Still within its deadline: nothing to reclaim
+        assert await backend.requeue_expired() == []
+
+        monkeypatch.setattr(job_backend, "VISIBILITY_TIMEOUT", -1)
+        await backend.extend("j1")  # The worker's last heartbeat, already in the past
+        reclaimed = await backend.requeue_expired()
+        return claimed, reclaimed, await backend.try_dequeue(), await backend.requeue_expired()
+
+    claimed, reclaimed, redelivered, again = run(scenario())
+    assert claimed == ("acme", "j1")
+    assert reclaimed == ["j1"]
+    assert redelivered == ("acme", "j1")
+    assert again == ["j1"]  # Redelivered with the patched deadline, so it expires again
+
+
+def test_update_with_stale_run_id_is_rejected():
+    backend = make_backend()
+
+    async def scenario():
+        await backend.create_job({"job_id": "j1", "status": "queued", "run_id": "r1"})
+        assert await backend.update_job("j1", guard_run_id="r1", progress=0.5)
+        # Another attempt takes the job over
+        assert await backend.update_job("j1", run_id="r2", status="running")
+        stale = await backend.update_job("j1", guard_run_id="r1", status="failed", error="late")
+        return stale, await backend.get_job("j1")
+
+    stale, job = run(scenario())
+    assert stale is False
+    assert job["status"] == "running" and job["run_id"] == "r2"
+    assert "error" not in job
+    assert job["progress"] == 0.5
+
+
+def test_update_of_missing_job_is_rejected():
+    backend = make_backend()
+    assert run(backend.update_job("nope", progress=1.0)) is False
+
+
+def test_claim_idempotency_key():
+    backend = make_backend()
+
+    async def scenario():
+        first = await backend.claim_idempotency_key("acme", "order-1", "j1")
+        repeat = await backend.claim_idempotency_key("acme", "order-1", "j2")
+        other_tenant = await backend.claim_idempotency_key("globex", "order-1", "j3")
+        return first, repeat, other_tenant, await backend.find_idempotent_job("acme", "order-1")
+
+    first, repeat, other_tenant, found = run(scenario())
+    assert first is None
+    assert repeat == "j1"
+    assert other_tenant is None
+    assert found == "j1"
+
+
+def test_release_idempotency_key_only_drops_its_own_claim():
+    backend = make_backend()
+
+    async def scenario():
+        await backend.claim_idempotency_key("acme", "order-1", "j1")
+        await backend.release_idempotency_key("acme", "order-1", "someone-else")
+        kept = await backend.find_idempotent_job("acme", "order-1")
+        await backend.release_idempotency_key("acme", "order-1", "j1")
+        return kept, await backend.find_idempotent_job("acme", "order-1")
+
+    assert run(scenario()) == ("j1", None)
@@ -0,0 +1,89 @@
+import os
+import asyncio
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+import result_store  # noqa: E402
+from job_backend import MemoryJobBackend  # noqa: E402
+from result_store import FileResultStore, RedisResultStore, result_metadata  # noqa: E402
+
+DATA = b"0123456789abcdefghij"  # 20 bytes, 5 chunks of 4
+
+
+@pytest.mark.parametrize("header,size", [
+    ("bytes=2-5", (2, 5)),
+    ("bytes=4-", (4, 19)),
+    ("bytes=-3", (17, 19)),
+    ("bytes=15-99", (15, 19)),
+    ("bytes=-50", (0, 19)),
+    ("bytes=-0", None),
+    ("bytes=20-", None),
+    ("bytes=6-2", None),
+])
+def test_parse_range(header, size):
+    assert main._parse_range(header, 20) == size
+
+
+@pytest.mark.parametrize("header", ["items=0-5", "bytes=0-1,4-5", "bytes=a-b", "bytes=-"])
+def test_parse_range_rejects_unsupported_headers(header):
+    with pytest.raises(ValueError):
+        main._parse_range(header, 20)
+
+
+@pytest.fixture(params=["file", "redis"])
+def client(request, monkeypatch, tmp_path):
+    if request.param == "file":
+        store = FileResultStore(str(tmp_path))
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        store = RedisResultStore(fakeredis.FakeAsyncRedis(decode_responses=True), "test:")
+    monkeypatch.setattr(result_store, "RESULT_CHUNK_SIZE", 4)
+    monkeypatch.setattr(main, "result_store", store)
+    backend = MemoryJobBackend(main.tenants, log_dir="")
+    monkeypatch.setattr(main, "job_backend", backend)
+
+    async def setup():
+        await store.save("job-1", DATA)
+        await backend.create_job({"job_id": "job-1", "status": "completed",
+                                  **result_metadata(DATA, "job-1")})
+
+    asyncio.run(setup())
+    return TestClient(main.app)
+
+
+def get(client, range_header=None):
+    headers = {"Range": range_header} if range_header else {}
+    return client.get("/result", params={"job_id": "job-1"}, headers=headers)
+
+
+@pytest.mark.parametrize("header,body,content_range", [
+    ("bytes=2-5", b"2345", "bytes 2-5/20"),
+    ("bytes=3-12", b"3456789abc", "bytes 3-12/20"),
+    ("bytes=-3", b"hij", "bytes 17-19/20"),
+    ("bytes=14-", b"efghij", "bytes 14-19/20"),
+])
+def test_range_request(client, header, body, content_range):
+    response = get(client, header)
+    assert response.status_code == 206
+    assert response.content == body
+    assert response.headers["Content-Range"] == content_range
+    assert response.headers["Content-Length"] == str(len(body))
+
+
+@pytest.mark.parametrize("header", ["bytes=-0", "bytes=20-", "bytes=25-30"])
+def test_unsatisfiable_range(client, header):
+    response = get(client, header)
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */20"
+
+
+@pytest.mark.parametrize("header", [None, "bytes=0-1,4-5", "bytes=a-b"])
+def test_full_result(client, header):
+    response = get(client, header)
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["Accept-Ranges"] == "bytes"
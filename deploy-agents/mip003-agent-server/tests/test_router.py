@@ -0,0 +1,90 @@
+import pytest
+
+import router
+from router import ModelRouter
+
+RULES = [
+    {"template": "research_assistant", "model": "deep"},
+    {"output_format": ["summary", "bullet_points"], "max_input_chars": 100,
+     "max_tokens": 1000, "model": "fast"},
+    {"min_tokens": 8000, "model": "long"},
+]
+
+
+@pytest.fixture(autouse=True)
+def chain(monkeypatch):
+    monkeypatch.setattr(router, "MODEL_NAME", "main")
+    monkeypatch.setattr(router, "MODEL_FAST", "")
+    monkeypatch.setattr(router, "MODEL_FALLBACKS", ["backup"])
+    monkeypatch.setattr(router, "MODEL_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(router, "MODEL_MAX_ERROR_RATE", 0.5)
+    monkeypatch.setattr(router, "MODEL_SLOW_SECONDS", 10)
+
+
+@pytest.mark.parametrize("template,input_data,model", [
+    ("research_assistant", {"topic": "x"}, "deep"),
+    ("general", {"task": "x", "output_format": "summary", "max_tokens": 500}, "fast"),
+    ("general", {"task": "x", "output_format": "summary", "max_tokens": "500"}, "fast"),
+    ("general", {"task": "x", "output_format": "summary", "max_tokens": 5000}, "main"),
+    ("general", {"task": "x" * 101, "output_format": "summary", "max_tokens": 500}, "main"),
+    ("general", {"task": "x", "output_format": "detailed", "max_tokens": 500}, "main"),
+    ("general", {"task": "x", "output_format": "summary"}, "main"),
+    ("general", {"task": "x", "max_tokens": 9000}, "long"),
+])
+def test_rules_select_the_model(template, input_data, model):
+    assert ModelRouter(RULES).select(template, input_data) == model
+
+
+@pytest.mark.parametrize("max_tokens", ["lots", "", None, [500], {"n": 1}])
+def test_non_numeric_max_tokens_does_not_match(max_tokens):
+    input_data = {"task": "x", "output_format": "summary", "max_tokens": max_tokens}
+    assert ModelRouter(RULES).select("general", input_data) == "main"
+
+
+def test_chain_starts_with_the_preferred_model():
+    model_router = ModelRouter(RULES)
+    assert model_router.route("research_assistant", {}) == ["deep", "main", "backup", "fast", "long"]
+    assert model_router.route("general", {}) == ["main", "backup", "deep", "fast", "long"]
+    assert model_router.routed["deep"] == 1 and model_router.routed["main"] == 1
+
+
+def test_error_rate_moves_a_model_to_the_back():
+    model_router = ModelRouter([])
+    for ok in (False, True, False):
+        model_router.record("main", 1.0, ok=ok)
+
+    health = model_router.health["main"]
+    assert health.error_rate.get() == pytest.approx(0.91)
+    assert not health.healthy()
+    assert model_router.route("general", {}) == ["backup", "main"]
+
+    for _ in range(20):
+        model_router.record("main", 1.0, ok=True)
+    assert health.error_rate.get() < 0.5
+    assert model_router.route("general", {}) == ["main", "backup"]
+
+
+def test_slow_model_is_unhealthy():
+    model_router = ModelRouter([])
+    model_router.record("main", 30.0, ok=True)
+    assert model_router.route("general", {}) == ["backup", "main"]
+    for _ in range(10):
+        model_router.record("main", 1.0, ok=True)
+    assert model_router.health["main"].latency.get() < 10
+    assert model_router.route("general", {}) == ["main", "backup"]
+
+
+def test_consecutive_failures_bench_a_model(monkeypatch):
+    monkeypatch.setattr(router, "MODEL_MAX_ERROR_RATE", 1.0)
+    model_router = ModelRouter([])
+    for _ in range(2):
+        model_router.record("main", 1.0, ok=False)
+    assert model_router.health["main"].healthy()
+
+    model_router.record("main", 1.0, ok=False)
+    stats = model_router.stats()["main"]
+    assert (stats["calls"], stats["failures"], stats["healthy"]) == (3, 3, False)
+    assert stats["benched_seconds"] > 0
+
+    model_router.health["main"].benched_until = 0
+    assert model_router.health["main"].healthy()
@@ -0,0 +1,59 @@
+import asyncio
+
+from scaling import AgentPool, ScalingMonitor
+
+
+def make_monitor(stats):
+    async def read():
+        return dict(stats)
+    return ScalingMonitor(read)
+
+
+def test_arrivals_come_from_the_backend_counter():
+    # A standalone worker never sees /start_job; the shared counter drives pre-warming
+    stats = {"queued": 0, "arrivals": 0}
+    monitor = make_monitor(stats)
+    pool = AgentPool(lambda: None, monitor)
+
+    asyncio.run(monitor.refresh())
+    assert pool.target_size() == 0
+    stats["arrivals"] = 50
+    asyncio.run(monitor.refresh())
+    assert monitor.arrivals.get() > 0
+    assert pool.target_size() > 0
+
+
+def test_snapshot_covers_every_worker():
+    # An API-only process: no local job slots, two hosts running two workers each
+    monitor = make_monitor({})
+    workers = [
+        {"worker_id": f"{host}-{pid}", "host": host, "concurrency": 4, "in_flight": 2,
+         "avg_run_seconds": run, "avg_queue_wait_seconds": 1.0, "completion_rate": 0.5}
+        for host, run in (("a", 10.0), ("b", 20.0)) for pid in (1, 2)
+    ]
+    snapshot = monitor.snapshot(queue_depth=32, workers=workers, default_slots_per_replica=4)
+
+    assert snapshot["worker_capacity"] == 16
+    assert snapshot["busy_workers"] == 8
+    assert snapshot["worker_saturation"] == 0.5
+    assert snapshot["replicas"] == 2
+    assert snapshot["avg_run_seconds"] == 15.0
+    assert snapshot["completion_rate_per_second"] == 2.0
+    # 16 slots at 15 s per job: 32 queued jobs drain in 30 s
+    assert snapshot["predicted_drain_seconds"] == 30.0
+
+
+def test_desired_replicas_use_slots_per_host():
+    monitor = make_monitor({})
+    monitor.arrivals.mark(1000)
+    workers = [{"worker_id": f"a-{pid}", "host": "a", "concurrency": 4, "avg_run_seconds": 10.0}
+               for pid in range(4)]
+    needed = monitor.arrivals.get() * 10.0
+    snapshot = monitor.snapshot(queue_depth=0, workers=workers, default_slots_per_replica=4)
+    assert snapshot["desired_replicas"] == -(-needed // 16)
+
+
+def test_no_workers():
+    monitor = make_monitor({})
+    assert monitor.snapshot(0, [], 4)["worker_saturation"] == 0.0
+    assert monitor.snapshot(3, [], 4)["worker_saturation"] == 1.0
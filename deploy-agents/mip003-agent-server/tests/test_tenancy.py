@@ -0,0 +1,90 @@
+import os
+import asyncio
+
+os.environ.setdefault("MOCK_LLM", "true")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from job_backend import MemoryJobBackend  # noqa: E402
+from job_queue import FairShareQueue  # noqa: E402
+from tenancy import API_KEY_HEADER, DEFAULT_TENANT, TENANT_HEADER, RateLimiter, TenantQuota, TenantRegistry  # noqa: E402
+
+
+def test_tenant_header_ignored_unless_trusted():
+    registry = TenantRegistry()
+    assert registry.resolve({TENANT_HEADER: "acme"}) == DEFAULT_TENANT
+    assert registry.resolve({API_KEY_HEADER: "made-up"}) == DEFAULT_TENANT
+
+    trusted = TenantRegistry(trust_tenant_header=True)
+    assert trusted.resolve({TENANT_HEADER: "acme"}) == "acme"
+
+
+def test_key_registry_requires_registered_key():
+    registry = TenantRegistry(api_keys={"secret": "acme"})
+    assert registry.resolve({API_KEY_HEADER: "secret"}) == "acme"
+    assert registry.resolve({API_KEY_HEADER: "guess"}) is None
+    assert registry.resolve({}) is None
+    assert registry.resolve({TENANT_HEADER: "acme"}) is None
+
+
+def test_idle_buckets_are_evicted():
+    limiter = RateLimiter(TenantRegistry(default_quota=TenantQuota(rate_per_minute=60, burst=2)))
+    for i in range(100):
+        limiter.check(f"tenant-{i}")
+    assert len(limiter) == 100
+
+    # Long enough for every bucket to refill
+    for bucket in limiter._buckets.values():
+        bucket.updated -= 10
+    limiter._swept -= RateLimiter.EVICT_INTERVAL
+    limiter.check("tenant-new")
+    assert len(limiter) == 1
+
+
+def test_eviction_keeps_drained_buckets():
+    limiter = RateLimiter(TenantRegistry(default_quota=TenantQuota(rate_per_minute=1, burst=1)))
+    assert limiter.check("acme")[0]
+    limiter._swept -= RateLimiter.EVICT_INTERVAL
+    limiter.check("other")
+    # Still empty: evicting it would hand out a fresh token early
+    assert not limiter.check("acme")[0]
+
+
+QUOTA_ENV = ("TENANT_MAX_CONCURRENT", "TENANT_MAX_QUEUED", "TENANT_RATE_PER_MINUTE",
+             "TENANT_BURST", "TENANT_QUOTAS", "TENANT_API_KEYS")
+
+
+def test_quotas_are_off_by_default(monkeypatch):
+    for name in QUOTA_ENV:
+        monkeypatch.delenv(name, raising=False)
+    quota = TenantRegistry.from_env().default_quota
+    assert (quota.max_concurrent, quota.max_queued, quota.rate_per_minute) == (0, 0, 0)
+
+    monkeypatch.setenv("TENANT_RATE_PER_MINUTE", "60")
+    quota = TenantRegistry.from_env().default_quota
+    assert (quota.max_concurrent, quota.rate_per_minute, quota.burst) == (2, 60, 10)
+
+
+def test_default_config_burst_is_accepted(monkeypatch):
+    for name in QUOTA_ENV:
+        monkeypatch.delenv(name, raising=False)
+    registry = TenantRegistry.from_env()
+    monkeypatch.setattr(main, "tenants", registry)
+    monkeypatch.setattr(main, "rate_limiter", RateLimiter(registry))
+    monkeypatch.setattr(main, "job_backend", MemoryJobBackend(registry, log_dir=""))
+
+    client = TestClient(main.app)
+    statuses = [client.post("/start_job", json={"input_data": {"task": f"t{i}"}}).status_code
+                for i in range(15)]
+    assert statuses == [200] * 15
+
+
+def test_unlimited_concurrency_runs_every_worker():
+    async def run():
+        queue = FairShareQueue(TenantRegistry())
+        for i in range(4):
+            await queue.put(DEFAULT_TENANT, f"j{i}")
+        return [await asyncio.wait_for(queue.get(), 1) for _ in range(4)]
+
+    assert len(asyncio.run(run())) == 4
@@ -0,0 +1,43 @@
+import pytest
+
+import tokens
+from tokens import count_tokens, get_encoder, warm_up_tokenizer
+
+tiktoken = pytest.importorskip("tiktoken")
+
+
+@pytest.fixture(autouse=True)
+def fresh_encoders():
+    get_encoder.cache_clear()
+    yield
+    get_encoder.cache_clear()
+
+
+def test_unloadable_encoder_falls_back_to_estimate(monkeypatch):
+    def offline(name):
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", offline)
+    monkeypatch.setattr(tiktoken, "get_encoding", offline)
+    monkeypatch.setattr(tokens, "CHARS_PER_TOKEN", 4)
+
+    assert warm_up_tokenizer(["gpt-4o-mini"]) is False
+    assert count_tokens("x" * 10, "gpt-4o-mini") == 3
+
+
+def test_warm_up_loads_each_encoder_once(monkeypatch):
+    class Encoder:
+        def encode(self, text, disallowed_special=()):
+            return text.split()
+
+    loaded = []
+
+    def encoding_for_model(model):
+        loaded.append(model)
+        return Encoder()
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", encoding_for_model)
+
+    assert warm_up_tokenizer(["a", "b", "a"]) is True
+    assert count_tokens("one two three", "a") == 3
+    assert loaded == ["a", "b"]
@@ -0,0 +1,66 @@
+import json
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from replay import Replayer
+from tenancy import API_KEY_HEADER, DEFAULT_TENANT, TENANT_HEADER, TenantRegistry
+from traffic import TrafficCaptureMiddleware, TrafficLog, anonymise
+
+
+def capture(tmp_path, registry, headers):
+    """Send one request through the capture middleware; return its trace line."""
+    app = FastAPI()
+
+    @app.get("/status")
+    def status(job_id: str):
+        return {"job_id": job_id}
+
+    log = TrafficLog(str(tmp_path / "traffic.jsonl"))
+    app.add_middleware(TrafficCaptureMiddleware, log=log, template="general",
+                       resolve_tenant=registry.resolve)
+    TestClient(app).get("/status", params={"job_id": "j1"}, headers=headers)
+    log.close()
+    [line] = (tmp_path / "traffic.jsonl").read_text().splitlines()
+    return json.loads(line)
+
+
+def test_tenant_is_hashed_not_the_api_key(tmp_path):
+    registry = TenantRegistry(api_keys={"secret-key": "acme"})
+    record = capture(tmp_path, registry, {API_KEY_HEADER: "secret-key"})
+    assert record["tn"] == anonymise("acme")
+    assert record["tn"] != anonymise("secret-key")
+
+
+def test_untrusted_tenant_header_is_not_recorded_as_tenant(tmp_path):
+    registry = TenantRegistry(trust_tenant_header=False)
+    record = capture(tmp_path, registry, {TENANT_HEADER: "spoofed"})
+    assert record["tn"] == anonymise(DEFAULT_TENANT)
+
+
+@pytest.mark.parametrize("headers", [{}, {API_KEY_HEADER: "wrong-key"}])
+def test_rejected_requests_have_no_tenant(tmp_path, headers):
+    registry = TenantRegistry(api_keys={"secret-key": "acme"})
+    assert "tn" not in capture(tmp_path, registry, headers)
+
+
+def test_replay_counts_429s_separately():
+    def handler(request):
+        return httpx.Response(429 if request.url.path == "/start_job" else 200, json={})
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            replayer = Replayer(client, None, 8, 1.0)
+            await replayer.run([
+                {"t": 0.0, "m": "POST", "r": "/start_job", "s": 200, "job": "a", "tn": "t1"},
+                {"t": 0.1, "m": "GET", "r": "/availability", "s": 200},
+            ])
+            return replayer
+
+    replayer = asyncio.run(run())
+    assert replayer.throttled == 1
+    assert sum(replayer.errors.values()) == 1
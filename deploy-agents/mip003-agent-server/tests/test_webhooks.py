@@ -0,0 +1,133 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import webhooks
+from http_client import HttpClientPool
+from webhooks import WebhookDispatcher, sign, validate_callback_url
+
+
+class Receiver:
+    """Local HTTP server answering webhook POSTs with scripted status codes."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.requests.append((dict(self.headers), body))
+                status = receiver.statuses.pop(0) if receiver.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def local_hooks(monkeypatch):
+    monkeypatch.setattr(webhooks, "WEBHOOK_ALLOW_PRIVATE", True)
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setattr(webhooks, "WEBHOOK_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(webhooks, "WEBHOOK_BACKOFF_BASE", 0.01)
+
+
+def deliver(receiver, until):
+    """Run a dispatcher against `receiver` until `until(dispatcher)` holds."""
+
+    async def run():
+        dispatcher = WebhookDispatcher(http=HttpClientPool(), workers=1)
+        dispatcher.start()
+        dispatcher.enqueue(receiver.url, {"event": "job.completed", "job_id": "j1"}, job_id="j1")
+        deadline = time.monotonic() + 5
+        while not until(dispatcher) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await dispatcher.stop(grace=1)
+        await dispatcher.http.close()
+        return dispatcher
+
+    try:
+        return asyncio.run(run())
+    finally:
+        receiver.close()
+
+
+def test_delivery_is_signed(local_hooks):
+    receiver = Receiver([200])
+    dispatcher = deliver(receiver, lambda d: d.delivered)
+
+    assert dispatcher.delivered == 1
+    headers, body = receiver.requests[0]
+    assert json.loads(body)["job_id"] == "j1"
+    assert headers["X-Webhook-Signature"] == sign(body, headers["X-Webhook-Timestamp"], "s3cret")
+
+
+def test_retryable_failures_are_retried(local_hooks):
+    receiver = Receiver([503, 429, 200])
+    dispatcher = deliver(receiver, lambda d: d.delivered)
+
+    assert dispatcher.delivered == 1
+    assert dispatcher.retried == 2
+    assert len({headers["X-Webhook-Id"] for headers, _ in receiver.requests}) == 1
+
+
+def test_exhausted_delivery_is_dead_lettered(local_hooks):
+    receiver = Receiver([500, 500, 500])
+    dispatcher = deliver(receiver, lambda d: d.failed)
+
+    assert len(receiver.requests) == 3
+    [dead] = dispatcher.dead_letter_list()
+    assert dead["attempts"] == 3 and dead["last_error"] == "HTTP 500"
+    assert dead["payload"]["job_id"] == "j1"
+
+
+def test_client_error_is_not_retried(local_hooks):
+    receiver = Receiver([404])
+    dispatcher = deliver(receiver, lambda d: d.failed)
+
+    assert len(receiver.requests) == 1
+    assert dispatcher.retried == 0
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/hook",
+    "http://localhost:8080/hook",
+    "http://10.0.0.5/hook",
+    "http://192.168.1.10/hook",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/hook",
+])
+def test_internal_callback_hosts_are_refused(url):
+    assert "non-public" in asyncio.run(validate_callback_url(url))
+
+
+def test_allow_list_and_scheme(monkeypatch):
+    assert asyncio.run(validate_callback_url("ftp://hooks.example.com/x")) is not None
+
+    monkeypatch.setattr(webhooks, "WEBHOOK_ALLOWED_HOSTS", {"internal-hooks"})
+    assert asyncio.run(validate_callback_url("http://internal-hooks/x")) is None
+    assert "not allowed" in asyncio.run(validate_callback_url("http://other/x"))
+
+
+def test_delivery_to_internal_host_is_dead_lettered():
+    receiver = Receiver([200])
+    dispatcher = deliver(receiver, lambda d: d.failed)
+
+    assert receiver.requests == []
+    assert "non-public" in dispatcher.dead_letter_list()[0]["last_error"]
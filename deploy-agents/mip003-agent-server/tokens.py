@@ -0,0 +1,148 @@
+"""
+Token Counting & Context Budgeting
+==================================
+Counts tokens with a locally cached tokenizer and fits each job's prompt into
+a token budget before it reaches the model, so an oversized `context` cannot
+silently inflate latency and cost.
+
+- Tokenizer: tiktoken when installed (one encoder per model, loaded once and
+  cached; models tiktoken does not know use o200k_base as an approximation),
+  otherwise an estimate of CHARS_PER_TOKEN characters per token. tiktoken
+  downloads its vocabulary on first use, so the encoder is loaded during the
+  agent warm-up rather than by the first job; when it cannot be loaded
+  (offline, no cache) counting falls back to the estimate for the life of
+  the process. Set TIKTOKEN_CACHE_DIR to a directory baked into the image to
+  keep startup offline.
+- Budget: TOKEN_BUDGET prompt tokens per job (TEMPLATE_TOKEN_BUDGETS JSON
+  overrides per template), further limited so that prompt + max_tokens fits
+  MODEL_CONTEXT_TOKENS.
+- Fitting: optional free-text fields, largest first, have their whitespace
+  compressed and are then truncated in the middle (keeping the beginning and
+  the end) until the prompt fits.
+"""
+
+import os
+import re
+import json
+import math
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Tuple
+
+TOKEN_BUDGET = int(os.getenv("TOKEN_BUDGET", 16000))
+TEMPLATE_TOKEN_BUDGETS: Dict[str, int] = json.loads(os.getenv("TEMPLATE_TOKEN_BUDGETS", "") or "{}")
+MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", 128000))
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", 4))
+
+_TRUNCATION_MARKER = "\n\n[... {omitted} tokens omitted to fit the context budget ...]\n\n"
+
+
+@lru_cache(maxsize=16)
+def get_encoder(model: str):
+    """The tiktoken encoder for `model`, or None to estimate from characters."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"Warning: tokenizer unavailable ({e}); estimating tokens from characters")
+        return None
+
+
+def warm_up_tokenizer(models: List[str]) -> bool:
+    """Load the encoders for `models` now; False if tokens will be estimated."""
+    return all([get_encoder(model) is not None for model in dict.fromkeys(models)])
+
+
+def count_tokens(text: str, model: str) -> int:
+    encoder = get_encoder(model)
+    if encoder is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def compress_whitespace(text: str) -> str:
+    """Drop trailing spaces, collapse runs of spaces/tabs and of blank lines."""
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def truncate_middle(text: str, max_tokens: int, model: str) -> str:
+    """Keep the first two thirds and the last third of `max_tokens` tokens."""
+    encoder = get_encoder(model)
+    total = count_tokens(text, model)
+    if total <= max_tokens:
+        return text
+    head_tokens = max_tokens * 2 // 3
+    tail_tokens = max_tokens - head_tokens
+    marker = _TRUNCATION_MARKER.format(omitted=total - max_tokens)
+    if encoder is None:
+        head_chars = int(head_tokens * CHARS_PER_TOKEN)
+        tail_chars = int(tail_tokens * CHARS_PER_TOKEN)
+        return text[:head_chars] + marker + (text[-tail_chars:] if tail_chars else "")
+    tokens = encoder.encode(text, disallowed_special=())
+    tail = encoder.decode(tokens[-tail_tokens:]) if tail_tokens else ""
+    return encoder.decode(tokens[:head_tokens]) + marker + tail
+
+
+def token_budget(template: str, max_tokens: Any = None) -> int:
+    """Prompt tokens a job may use: the template budget, minus room for the answer."""
+    budget = int(TEMPLATE_TOKEN_BUDGETS.get(template, TOKEN_BUDGET))
+    try:
+        answer = int(float(max_tokens)) if max_tokens is not None else 0
+    except (TypeError, ValueError):
+        answer = 0
+    return max(0, min(budget, MODEL_CONTEXT_TOKENS - answer))
+
+
+def fit_to_budget(
+    input_data: Dict[str, Any],
+    render: Callable[[Dict[str, Any]], str],
+    trimmable: List[str],
+    budget: int,
+    model: str,
+    fixed_tokens: int = 0,
+) -> Tuple[Dict[str, Any], str, int, List[str]]:
+    """
+    Shrink `trimmable` fields until render(input_data) plus `fixed_tokens`
+    (the system prompt) fits `budget`. Returns (input_data, prompt,
+    prompt_tokens, names of the fields that were changed).
+    """
+    prompt = render(input_data)
+    tokens = count_tokens(prompt, model) + fixed_tokens
+    if tokens <= budget:
+        return input_data, prompt, tokens, []
+
+    data = dict(input_data)
+    trimmed: List[str] = []
+    candidates = [n for n in trimmable if isinstance(data.get(n), str) and data[n]]
+    candidates.sort(key=lambda n: len(data[n]), reverse=True)
+
+    for name in candidates:
+        compressed = compress_whitespace(data[name])
+        if compressed != data[name]:
+            data[name] = compressed
+            trimmed.append(name)
+            prompt = render(data)
+            tokens = count_tokens(prompt, model) + fixed_tokens
+            if tokens <= budget:
+                return data, prompt, tokens, trimmed
+
+    for name in candidates:
+        excess = tokens - budget
+        field_tokens = count_tokens(data[name], model)
+        # Leave room for the truncation marker
+        data[name] = truncate_middle(data[name], max(field_tokens - excess - 24, 0), model)
+        if name not in trimmed:
+            trimmed.append(name)
+        prompt = render(data)
+        tokens = count_tokens(prompt, model) + fixed_tokens
+        if tokens <= budget:
+            break
+
+    return data, prompt, tokens, trimmed
@@ -0,0 +1,207 @@
+"""
+Traffic Capture
+===============
+Opt-in recorder of anonymised request traces, replayed by `python -m replay`
+to benchmark with the real mix of templates, input sizes and polling
+patterns. Enabled by setting TRAFFIC_CAPTURE_PATH.
+
+One compact JSON line per request:
+
+    {"t":1718000000.123,"m":"POST","r":"/start_job","s":200,"ms":4.1,
+     "in":5120,"out":96,"tn":"3f9a1c0b7d2e","job":"8c1d04e2b6aa",
+     "tpl":"general","f":{"task":120,"context":4980},"v":{"max_tokens":1000}}
+
+- t: arrival (epoch seconds), ms: time to the end of the response
+- in/out: request and response body bytes
+- tn / job: salted hashes of the tenant (as the server resolved it, never
+  the API key) and the job id, so polls of a job can be tied to its
+  submission without storing either
+- f: character length of each free-text input field (never its content);
+  v: values of fields with a fixed domain (numbers, options, booleans)
+
+Hashes are salted with TRAFFIC_CAPTURE_SALT (random per process when unset;
+set it when several processes capture into `{pid}`-named files). Lines are
+buffered and flushed every TRAFFIC_CAPTURE_FLUSH seconds. A fraction
+TRAFFIC_CAPTURE_SAMPLE of jobs is recorded, together with all their polls.
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "")
+TRAFFIC_CAPTURE_SALT = os.getenv("TRAFFIC_CAPTURE_SALT", "") or os.urandom(16).hex()
+TRAFFIC_CAPTURE_SAMPLE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", 1.0))
+TRAFFIC_CAPTURE_FLUSH = float(os.getenv("TRAFFIC_CAPTURE_FLUSH", 1.0))
+
+# Request bodies parsed for input sizes (others are only counted)
+_JOB_ROUTES = ("/start_job", "/provide_input")
+# Never recorded: introspection and the docs
+_SKIPPED_PREFIXES = ("/debug", "/docs", "/redoc", "/openapi.json")
+_MAX_PARSED_BODY = 8 * 1024 * 1024
+
+
+def anonymise(value: str, salt: str = TRAFFIC_CAPTURE_SALT) -> str:
+    return hashlib.sha256(f"{salt}:{value}".encode()).hexdigest()[:12]
+
+
+class TrafficLog:
+    """Buffered JSONL writer for traces."""
+
+    def __init__(self, path: str):
+        path = path.format(pid=os.getpid())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", buffering=1024 * 1024, encoding="utf-8")
+        self._flushed = time.monotonic()
+        self.records = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._file.closed:
+            return
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.records += 1
+        now = time.monotonic()
+        if now - self._flushed >= TRAFFIC_CAPTURE_FLUSH:
+            self._file.flush()
+            self._flushed = now
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+def create_traffic_log() -> Optional[TrafficLog]:
+    if not TRAFFIC_CAPTURE_PATH:
+        return None
+    log = TrafficLog(TRAFFIC_CAPTURE_PATH)
+    print(f"📼 Capturing traffic to {log.path}")
+    return log
+
+
+def input_profile(input_data: Any, value_fields: Iterable[str]) -> Dict[str, Any]:
+    """Split job input into free-text lengths (f) and fixed-domain values (v)."""
+    profile: Dict[str, Any] = {}
+    if not isinstance(input_data, dict):
+        return profile
+    value_fields = set(value_fields)
+    for name, value in input_data.items():
+        if name in value_fields and not isinstance(value, (dict, list)):
+            profile.setdefault("v", {})[name] = value
+        elif isinstance(value, str):
+            profile.setdefault("f", {})[name] = len(value)
+        else:
+            profile.setdefault("f", {})[name] = len(json.dumps(value, default=str))
+    return profile
+
+
+class TrafficCaptureMiddleware:
+    """ASGI middleware writing one anonymised trace line per request."""
+
+    def __init__(self, app, log: TrafficLog, template: str,
+                 resolve_tenant: Callable[[Headers], Optional[str]], value_fields: Iterable[str] = ()):
+        self.app = app
+        self.log = log
+        self.template = template
+        # Same resolution as the endpoints (TenantRegistry.resolve): None when
+        # the request carries no valid key and is rejected
+        self.resolve_tenant = resolve_tenant
+        self.value_fields = tuple(value_fields)
+        # Hashed ids of unsampled jobs, so their polls are skipped as well
+        self._unsampled: Dict[str, None] = {}
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith(_SKIPPED_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        started = time.time()
+        clock = time.perf_counter()
+        is_job_route = path in _JOB_ROUTES
+        request_body = []
+        request_size = 0
+        response_body = []
+        response_size = 0
+        status = 500
+
+        async def receive_wrapper():
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                request_size += len(chunk)
+                if is_job_route and request_size <= _MAX_PARSED_BODY:
+                    request_body.append(chunk)
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                response_size += len(chunk)
+                if path == "/start_job" and response_size <= 64 * 1024:
+                    response_body.append(chunk)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            record = self._record(scope, path, status, started, clock, request_size,
+                                  response_size, b"".join(request_body), b"".join(response_body))
+            if record is not None:
+                self.log.write(record)
+
+    def _record(self, scope, path: str, status: int, started: float, clock: float,
+                request_size: int, response_size: int, request_body: bytes,
+                response_body: bytes) -> Optional[Dict[str, Any]]:
+        record: Dict[str, Any] = {
+            "t": round(started, 3),
+            "m": scope["method"],
+            "r": path,
+            "s": status,
+            "ms": round((time.perf_counter() - clock) * 1000, 2),
+            "in": request_size,
+            "out": response_size,
+        }
+        tenant = self.resolve_tenant(Headers(scope=scope))
+        if tenant:
+            record["tn"] = anonymise(tenant)
+
+        job_id = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("job_id", [None])[0]
+        body: Dict[str, Any] = {}
+        if request_body:
+            try:
+                body = json.loads(request_body)
+            except ValueError:
+                body = {}
+        if path == "/start_job":
+            try:
+                job_id = json.loads(response_body).get("job_id") if response_body else None
+            except (ValueError, AttributeError):
+                job_id = None
+            record["tpl"] = self.template
+            if isinstance(body, dict):
+                record.update(input_profile(body.get("input_data"), self.value_fields))
+        elif path == "/provide_input" and isinstance(body, dict):
+            job_id = body.get("job_id") or job_id
+            record.update(input_profile(body.get("input_data"), self.value_fields))
+
+        if job_id:
+            ref = anonymise(str(job_id))
+            if ref in self._unsampled:
+                return None
+            if path == "/start_job" and random.random() >= TRAFFIC_CAPTURE_SAMPLE:
+                self._unsampled[ref] = None
+                if len(self._unsampled) > 100_000:
+                    self._unsampled.pop(next(iter(self._unsampled)))
+                return None
+            record["job"] = ref
+        return record
@@ -0,0 +1,225 @@
+"""
+Webhook Delivery
+================
+Jobs submitted with a `callback_url` are POSTed to that URL when they reach a
+terminal status, so clients do not have to poll /status.
+
+Deliveries go through an in-process queue served by WEBHOOK_WORKERS tasks
+using the shared outbound HTTP client pool (http_client.py). Failed deliveries (network errors, 429 and
+5xx responses) are retried with exponential backoff and jitter without
+blocking a worker; after WEBHOOK_MAX_ATTEMPTS they land in a bounded
+dead-letter list that admins can inspect and redeliver from.
+
+Callback hosts are resolved before the job is accepted and again before every
+attempt; loopback, private, link-local and other non-public addresses are
+refused (SSRF protection) unless listed in WEBHOOK_ALLOWED_HOSTS or
+WEBHOOK_ALLOW_PRIVATE=true.
+
+Every request carries:
+- X-Webhook-Id         delivery id, stable across retries (for deduplication)
+- X-Webhook-Timestamp  unix time the request was signed
+- X-Webhook-Signature  "sha256=" + HMAC-SHA256(WEBHOOK_SECRET, "<timestamp>.<body>")
+                       (only when WEBHOOK_SECRET is set)
+"""
+
+import os
+import json
+import time
+import hmac
+import uuid
+import random
+import asyncio
+import hashlib
+import ipaddress
+import socket
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+import httpx
+
+from http_client import HttpClientPool, http_pool
+
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 4))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 6))
+WEBHOOK_BACKOFF_BASE = float(os.getenv("WEBHOOK_BACKOFF_BASE", 2))
+WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", 300))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", 10))
+WEBHOOK_DEAD_LETTER_MAX = int(os.getenv("WEBHOOK_DEAD_LETTER_MAX", 1000))
+# Comma-separated hosts callbacks may target (empty: any public host)
+WEBHOOK_ALLOWED_HOSTS = {h.strip() for h in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()}
+# Allow callbacks to loopback/private/link-local addresses (local development only)
+WEBHOOK_ALLOW_PRIVATE = os.getenv("WEBHOOK_ALLOW_PRIVATE", "false").lower() == "true"
+
+
+async def validate_callback_url(url: str) -> Optional[str]:
+    """Return why `url` is not an acceptable callback URL, or None if it is."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return "callback_url must be an absolute http(s) URL"
+    host = parsed.hostname
+    if WEBHOOK_ALLOWED_HOSTS:
+        # An explicit allow-list is trusted as is, internal hosts included
+        return None if host in WEBHOOK_ALLOWED_HOSTS else f"callback_url host {host} is not allowed"
+    if WEBHOOK_ALLOW_PRIVATE:
+        return None
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, parsed.port or 443, type=socket.SOCK_STREAM
+        )
+    except (socket.gaierror, UnicodeError):
+        return f"callback_url host {host} does not resolve"
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            return f"callback_url host {host} resolves to a non-public address"
+    return None
+
+
+def sign(body: bytes, timestamp: str, secret: str = WEBHOOK_SECRET) -> str:
+    mac = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256)
+    return "sha256=" + mac.hexdigest()
+
+
+class WebhookDispatcher:
+    """Queue + worker pool delivering webhook POSTs with retries."""
+
+    def __init__(self, http: HttpClientPool = http_pool, workers: int = WEBHOOK_WORKERS):
+        self.http = http
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.dead_letters: Deque[Dict[str, Any]] = deque(maxlen=WEBHOOK_DEAD_LETTER_MAX)
+        self._tasks: List[asyncio.Task] = []
+        self._retry_timers: Set[asyncio.TimerHandle] = set()
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"webhook-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, grace: float = 10) -> None:
+        """Deliver what is queued (up to `grace` seconds), then shut down."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=grace)
+        except asyncio.TimeoutError:
+            print(f"Warning: {self.queue.qsize()} webhook(s) undelivered at shutdown")
+        if self._retry_timers:
+            print(f"Warning: {len(self._retry_timers)} webhook retr(ies) dropped at shutdown")
+        for timer in self._retry_timers:
+            timer.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, url: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        delivery = {
+            "id": uuid.uuid4().hex,
+            "job_id": job_id,
+            "url": url,
+            "body": json.dumps(payload, default=str).encode(),
+            "attempts": 0,
+            "last_error": None,
+        }
+        self.queue.put_nowait(delivery)
+        return delivery["id"]
+
+    def redeliver(self, delivery_id: str) -> bool:
+        """Move a dead letter back onto the queue with a fresh attempt budget."""
+        for delivery in self.dead_letters:
+            if delivery["id"] == delivery_id:
+                self.dead_letters.remove(delivery)
+                delivery["attempts"] = 0
+                self.queue.put_nowait(delivery)
+                return True
+        return False
+
+    async def _worker(self) -> None:
+        while True:
+            delivery = await self.queue.get()
+            try:
+                await self._attempt(delivery)
+            except Exception as e:
+                print(f"Warning: webhook worker error: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _attempt(self, delivery: Dict[str, Any]) -> None:
+        delivery["attempts"] += 1
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Id": delivery["id"],
+            "X-Webhook-Timestamp": timestamp,
+        }
+        if WEBHOOK_SECRET:
+            headers["X-Webhook-Signature"] = sign(delivery["body"], timestamp, WEBHOOK_SECRET)
+
+        # Re-check on every attempt: DNS may have changed since the job was accepted
+        problem = await validate_callback_url(delivery["url"])
+        if problem:
+            delivery["last_error"] = problem
+            self._dead_letter(delivery)
+            return
+
+        retryable = True
+        try:
+            response = await self.http.client.post(
+                delivery["url"], content=delivery["body"], headers=headers, timeout=WEBHOOK_TIMEOUT
+            )
+            if response.status_code < 300:
+                self.delivered += 1
+                return
+            delivery["last_error"] = f"HTTP {response.status_code}"
+            retryable = response.status_code == 429 or response.status_code >= 500
+        except httpx.HTTPError as e:
+            delivery["last_error"] = f"{type(e).__name__}: {e}"
+
+        if retryable and delivery["attempts"] < WEBHOOK_MAX_ATTEMPTS:
+            self.retried += 1
+            delay = min(WEBHOOK_BACKOFF_MAX, WEBHOOK_BACKOFF_BASE * 2 ** (delivery["attempts"] - 1))
+            self._schedule_retry(delivery, delay * random.uniform(0.5, 1.0))
+            return
+        self._dead_letter(delivery)
+
+    def _dead_letter(self, delivery: Dict[str, Any]) -> None:
+        self.failed += 1
+        delivery["failed_at"] = time.time()
+        self.dead_letters.append(delivery)
+        print(f"⚠️  Webhook for job {delivery['job_id']} dead-lettered: {delivery['last_error']}")
+
+    def _schedule_retry(self, delivery: Dict[str, Any], delay: float) -> None:
+        """Requeue after `delay` without holding a worker while waiting."""
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._retry_timers.discard(timer)
+            self.queue.put_nowait(delivery)
+
+        timer = loop.call_later(delay, requeue)
+        self._retry_timers.add(timer)
+
+    def dead_letter_list(self) -> List[Dict[str, Any]]:
+        return [
+            {k: v for k, v in d.items() if k != "body"} | {"payload": json.loads(d["body"])}
+            for d in self.dead_letters
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue.qsize(),
+            "scheduled_retries": len(self._retry_timers),
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead_lettered": self.failed,
+            "dead_letters": len(self.dead_letters),
+        }
@@ -0,0 +1,64 @@
+"""
+Standalone Job Worker
+=====================
+Executes agent jobs from the shared queue without serving HTTP, so the LLM
+work no longer competes with the API for its event loop and memory, and each
+tier scales on its own.
+
+    # API tier: accept jobs, answer /status
+    JOB_BACKEND=redis EMBEDDED_WORKERS=false uvicorn main:app
+
+    # Worker tier: run as many of these as needed
+    JOB_BACKEND=redis python -m worker --concurrency 8
+
+Workers send heartbeats while they run jobs. If a worker dies, its jobs'
+visibility timeout lapses and the next heartbeat of any live worker puts them
+back on the queue. On SIGTERM the worker drains: it stops taking jobs, lets
+running ones finish for up to SHUTDOWN_GRACE_SECONDS and hands the rest back.
+"""
+
+import os
+import signal
+import asyncio
+import argparse
+
+import main
+
+
+async def run(concurrency: int):
+    if not main.job_backend.shared:
+        raise SystemExit(
+            "A standalone worker needs a shared queue: set JOB_BACKEND=redis"
+        )
+
+    print(f"🛠️  Worker {main.WORKER_ID} starting ({concurrency} slots)")
+    print(f"   Model: {main.MODEL_NAME}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await main.job_backend.start()
+    await main.http_pool.start()
+    main.loop_monitor.start()
+    tasks = main.start_workers("worker", concurrency)
+    await stop.wait()
+
+    print(f"👋 Worker {main.WORKER_ID} shutting down")
+    await main.stop_workers(tasks)
+    await main.loop_monitor.stop()
+    await main.http_pool.close()
+    await main.job_backend.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run MIP-003 agent jobs from the shared queue")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("WORKER_CONCURRENCY", 4)),
+        help="Jobs executed at once by this process",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency))